@@ -5,11 +5,65 @@ Provides advanced statistics and conversion tracking
 
 from flask import jsonify
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import Integer, case, cast, func
 from collections import defaultdict
 
-def get_dashboard_analytics(db, Lead):
-    """Get comprehensive dashboard analytics"""
+def _count_where(condition):
+    """COUNT of rows matching condition, for use as a conditional aggregate"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def _day_bucket(db, column, start):
+    """Whole days elapsed between start and column, evaluated in SQL"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.floor(func.extract('epoch', column - start) / 86400)
+    return cast(func.julianday(column) - func.julianday(start), Integer)
+
+def _from_rollup_key(value):
+    """Rollups store NULL dimensions as ''"""
+    return None if value == '' else value
+
+def _live_breakdown(db, Lead, today_start, week_start, month_start):
+    """Overview counters per status/source/device/investment from raw leads"""
+    return db.session.query(
+        Lead.status,
+        Lead.source,
+        Lead.device_type,
+        Lead.investment,
+        func.count(Lead.id),
+        _count_where(Lead.created_at >= today_start),
+        _count_where(Lead.created_at >= week_start),
+        _count_where(Lead.created_at >= month_start),
+        func.coalesce(func.sum(case((Lead.quality_score > 0, Lead.quality_score), else_=0)), 0),
+        _count_where(Lead.quality_score > 0),
+        _count_where(Lead.quality_score >= 70)
+    ).group_by(Lead.status, Lead.source, Lead.device_type, Lead.investment).all()
+
+def _rollup_breakdown(db, Rollup, today_start, week_start, month_start):
+    """Same counters as _live_breakdown, summed from day-granular rollups"""
+    def count_since(start):
+        return func.coalesce(func.sum(case((Rollup.day >= start.date(), Rollup.lead_count), else_=0)), 0)
+    
+    rows = db.session.query(
+        Rollup.status,
+        Rollup.source,
+        Rollup.device_type,
+        Rollup.investment,
+        func.sum(Rollup.lead_count),
+        count_since(today_start),
+        count_since(week_start),
+        count_since(month_start),
+        func.sum(Rollup.quality_positive_sum),
+        func.sum(Rollup.quality_positive_count),
+        func.sum(Rollup.high_quality_count)
+    ).group_by(Rollup.status, Rollup.source, Rollup.device_type, Rollup.investment).all()
+    
+    return [
+        tuple(_from_rollup_key(v) for v in row[:4]) + tuple(row[4:])
+        for row in rows if row[4]
+    ]
+
+def get_dashboard_analytics(db, Lead, rollups=None):
+    """Get comprehensive dashboard analytics (from raw leads, or from rollups if given)"""
     
     # Time periods
     now = datetime.utcnow()
@@ -17,40 +71,56 @@ def get_dashboard_analytics(db, Lead):
     week_start = now - timedelta(days=7)
     month_start = now - timedelta(days=30)
     
-    # Total leads
-    total_leads = Lead.query.count()
-    
-    # Leads by time period
-    today_leads = Lead.query.filter(Lead.created_at >= today_start).count()
-    week_leads = Lead.query.filter(Lead.created_at >= week_start).count()
-    month_leads = Lead.query.filter(Lead.created_at >= month_start).count()
-    
-    # Leads by status
-    status_breakdown = db.session.query(
-        Lead.status,
-        func.count(Lead.id)
-    ).group_by(Lead.status).all()
+    # Overview counters and the low-cardinality breakdowns in one scan:
+    # conditional aggregates grouped by status/source/device/investment
+    if rollups is not None:
+        breakdown = _rollup_breakdown(db, rollups, today_start, week_start, month_start)
+    else:
+        breakdown = _live_breakdown(db, Lead, today_start, week_start, month_start)
     
-    status_stats = {status: count for status, count in status_breakdown}
+    total_leads = today_leads = week_leads = month_leads = 0
+    quality_sum = quality_count = high_quality_leads = 0
+    status_stats = defaultdict(int)
+    source_stats = defaultdict(int)
+    device_stats = defaultdict(int)
+    investment_stats = defaultdict(int)
+    for (status, source, device, investment, count, today, week, month,
+         group_quality_sum, group_quality_count, group_high_quality) in breakdown:
+        total_leads += count
+        today_leads += today
+        week_leads += week
+        month_leads += month
+        quality_sum += group_quality_sum
+        quality_count += group_quality_count
+        high_quality_leads += group_high_quality
+        status_stats[status] += count
+        source_stats[source] += count
+        investment_stats[investment] += count
+        if device is not None:
+            device_stats[device] += count
     
     # Conversion rates
     converted = status_stats.get('converted', 0)
     conversion_rate = (converted / total_leads * 100) if total_leads > 0 else 0
     
-    # Leads by source
-    source_breakdown = db.session.query(
-        Lead.source,
-        func.count(Lead.id)
-    ).group_by(Lead.source).all()
-    
-    source_stats = {source: count for source, count in source_breakdown}
+    # Average quality score
+    avg_quality_score = (quality_sum / quality_count) if quality_count else 0
     
     # UTM Campaign performance
-    campaign_breakdown = db.session.query(
-        Lead.utm_campaign,
-        func.count(Lead.id),
-        func.sum(Lead.conversion_value)
-    ).filter(Lead.utm_campaign.isnot(None)).group_by(Lead.utm_campaign).all()
+    if rollups is not None:
+        campaign_breakdown = db.session.query(
+            rollups.utm_campaign,
+            func.sum(rollups.lead_count),
+            func.sum(rollups.conversion_value_sum)
+        ).filter(rollups.utm_campaign != '').group_by(rollups.utm_campaign).having(
+            func.sum(rollups.lead_count) > 0
+        ).all()
+    else:
+        campaign_breakdown = db.session.query(
+            Lead.utm_campaign,
+            func.count(Lead.id),
+            func.sum(Lead.conversion_value)
+        ).filter(Lead.utm_campaign.isnot(None)).group_by(Lead.utm_campaign).all()
     
     campaign_stats = [
         {
@@ -61,40 +131,35 @@ def get_dashboard_analytics(db, Lead):
         for campaign, count, value in campaign_breakdown
     ]
     
-    # Device breakdown
-    device_breakdown = db.session.query(
-        Lead.device_type,
-        func.count(Lead.id)
-    ).filter(Lead.device_type.isnot(None)).group_by(Lead.device_type).all()
-    
-    device_stats = {device: count for device, count in device_breakdown}
-    
-    # Average quality score
-    avg_quality_score = db.session.query(
-        func.avg(Lead.quality_score)
-    ).filter(Lead.quality_score > 0).scalar() or 0
-    
-    # Leads by day (last 30 days)
-    daily_leads = []
-    for i in range(30):
-        day_start = now - timedelta(days=i)
-        day_end = day_start + timedelta(days=1)
-        day_count = Lead.query.filter(
-            Lead.created_at >= day_start,
-            Lead.created_at < day_end
-        ).count()
-        daily_leads.append({
-            'date': day_start.strftime('%Y-%m-%d'),
-            'count': day_count
-        })
-    
-    # Top investment ranges
-    investment_breakdown = db.session.query(
-        Lead.investment,
-        func.count(Lead.id)
-    ).group_by(Lead.investment).all()
+    # Leads by day (last 30 days), bucketed in a single GROUP BY
+    trend_start = now - timedelta(days=29)
+    if rollups is not None:
+        # Rollups are per calendar day
+        daily_counts = {
+            (day - trend_start.date()).days: count
+            for day, count in db.session.query(
+                rollups.day,
+                func.sum(rollups.lead_count)
+            ).filter(rollups.day >= trend_start.date()).group_by(rollups.day).all()
+        }
+    else:
+        # Rolling 24h windows starting at now - i days
+        bucket = _day_bucket(db, Lead.created_at, trend_start)
+        daily_counts = dict(db.session.query(
+            bucket,
+            func.count(Lead.id)
+        ).filter(
+            Lead.created_at >= trend_start,
+            Lead.created_at < now + timedelta(days=1)
+        ).group_by(bucket).all())
     
-    investment_stats = {inv: count for inv, count in investment_breakdown}
+    daily_trend = [
+        {
+            'date': (trend_start + timedelta(days=k)).strftime('%Y-%m-%d'),
+            'count': daily_counts.get(k, 0)
+        }
+        for k in range(30)
+    ]
     
     # Response time stats (mock for now)
     avg_response_time = "2.5 hours"  # This would be calculated from actual response data
@@ -108,27 +173,40 @@ def get_dashboard_analytics(db, Lead):
             'conversion_rate': round(conversion_rate, 2),
             'avg_quality_score': round(avg_quality_score, 1)
         },
-        'status': status_stats,
-        'sources': source_stats,
+        'status': dict(status_stats),
+        'sources': dict(source_stats),
         'campaigns': campaign_stats,
-        'devices': device_stats,
-        'investments': investment_stats,
-        'daily_trend': list(reversed(daily_leads)),
+        'devices': dict(device_stats),
+        'investments': dict(investment_stats),
+        'daily_trend': daily_trend,
         'performance': {
             'avg_response_time': avg_response_time,
-            'high_quality_leads': Lead.query.filter(Lead.quality_score >= 70).count(),
+            'high_quality_leads': high_quality_leads,
             'hot_leads': status_stats.get('hot', 0) + status_stats.get('qualified', 0)
         }
     }
 
-def get_conversion_funnel(db, Lead):
+def get_conversion_funnel(db, Lead, rollups=None):
     """Get conversion funnel statistics"""
     
-    total = Lead.query.count()
-    new = Lead.query.filter_by(status='new').count()
-    contacted = Lead.query.filter_by(status='contacted').count()
-    qualified = Lead.query.filter_by(status='qualified').count()
-    converted = Lead.query.filter_by(status='converted').count()
+    if rollups is not None:
+        def count_status(status):
+            return func.coalesce(func.sum(case((rollups.status == status, rollups.lead_count), else_=0)), 0)
+        total_count = func.coalesce(func.sum(rollups.lead_count), 0)
+        query = db.session.query(rollups)
+    else:
+        def count_status(status):
+            return _count_where(Lead.status == status)
+        total_count = func.count(Lead.id)
+        query = db.session.query(Lead)
+    
+    total, new, contacted, qualified, converted = query.with_entities(
+        total_count,
+        count_status('new'),
+        count_status('contacted'),
+        count_status('qualified'),
+        count_status('converted')
+    ).one()
     
     return {
         'stages': [
@@ -146,12 +224,21 @@ def get_conversion_funnel(db, Lead):
         }
     }
 
-def get_lead_quality_scores(db, Lead):
+def get_lead_quality_scores(db, Lead, rollups=None):
     """Calculate and return lead quality distribution"""
     
-    high = Lead.query.filter(Lead.quality_score >= 70).count()
-    medium = Lead.query.filter(Lead.quality_score >= 40, Lead.quality_score < 70).count()
-    low = Lead.query.filter(Lead.quality_score < 40).count()
+    if rollups is not None:
+        high, medium, low = db.session.query(
+            func.coalesce(func.sum(rollups.high_quality_count), 0),
+            func.coalesce(func.sum(rollups.medium_quality_count), 0),
+            func.coalesce(func.sum(rollups.low_quality_count), 0)
+        ).one()
+    else:
+        high, medium, low = db.session.query(
+            _count_where(Lead.quality_score >= 70),
+            _count_where((Lead.quality_score >= 40) & (Lead.quality_score < 70)),
+            _count_where(Lead.quality_score < 40)
+        ).one()
     
     total = high + medium + low
     
@@ -0,0 +1,144 @@
+"""
+Analytics Result Cache
+In-process TTL cache for analytics endpoints with single-flight
+recomputation and stale-while-revalidate
+"""
+
+import os
+import threading
+import time
+
+ANALYTICS_CACHE_TTL = float(os.getenv('ANALYTICS_CACHE_TTL', 30))
+ANALYTICS_CACHE_STALE_TTL = float(os.getenv('ANALYTICS_CACHE_STALE_TTL', 300))
+
+
+class _Entry:
+    def __init__(self, value, fresh_until, stale_until):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.refreshing = False
+
+
+class _Flight:
+    """One in-progress computation that concurrent misses wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """
+    Fresh entries are served directly. Expired or invalidated entries are
+    served stale (until stale_ttl runs out) while one background refresh
+    runs. Misses are computed once; concurrent callers wait for that result.
+    """
+
+    def __init__(self, app, ttl=ANALYTICS_CACHE_TTL, stale_ttl=ANALYTICS_CACHE_STALE_TTL):
+        self.app = app
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._flights = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'invalidations': 0,
+            'errors': 0
+        }
+
+    def get_or_compute(self, key, compute):
+        if self.ttl <= 0:
+            return compute()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now < entry.fresh_until:
+                self.counters['hits'] += 1
+                return entry.value
+            if entry and now < entry.stale_until:
+                self.counters['stale_hits'] += 1
+                if not entry.refreshing:
+                    entry.refreshing = True
+                    threading.Thread(
+                        target=self._refresh, args=(key, compute), name='analytics-cache-refresh', daemon=True
+                    ).start()
+                return entry.value
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.counters['misses'] += 1
+            else:
+                self.counters['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._compute_and_store(key, compute)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.counters['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _compute_and_store(self, key, compute):
+        generation = self._generation
+        value = compute()
+        now = time.monotonic()
+        with self._lock:
+            # A write landed while computing: keep the result, but only as stale
+            fresh_until = now + self.ttl if generation == self._generation else 0
+            self._entries[key] = _Entry(value, fresh_until, now + self.ttl + self.stale_ttl)
+        return value
+
+    def _refresh(self, key, compute):
+        try:
+            with self.app.app_context():
+                self._compute_and_store(key, compute)
+            with self._lock:
+                self.counters['refreshes'] += 1
+        except Exception as e:
+            print(f"Analytics cache refresh error: {e}")
+            with self._lock:
+                self.counters['errors'] += 1
+                entry = self._entries.get(key)
+                if entry:
+                    entry.refreshing = False
+
+    def invalidate(self):
+        """Mark every entry stale; the next read serves it and triggers a refresh"""
+        with self._lock:
+            self._generation += 1
+            self.counters['invalidations'] += 1
+            for entry in self._entries.values():
+                entry.fresh_until = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters['hits'] + self.counters['stale_hits'] + self.counters['misses'] + self.counters['coalesced']
+            return dict(
+                self.counters,
+                entries=len(self._entries),
+                hit_rate=round((lookups - self.counters['misses']) / lookups, 3) if lookups else 0,
+                ttl_seconds=self.ttl,
+                stale_ttl_seconds=self.stale_ttl
+            )
@@ -1,25 +1,55 @@
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for, send_file
+import time
+APP_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, request, jsonify, render_template, session, redirect, url_for, send_file, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-import csv
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hmac
+import importlib.util
 import json
 import os
-from io import StringIO, BytesIO
-import uuid
+
+from db_pool import PoolMetrics, engine_options, install_pool_events, install_sqlite_profile, max_lock_wait, pool_stats
+from http_pool import BreakerRegistry, HTTPSessionPool, call_with_breaker
+from rate_governor import RateGovernor
+from salesforce import SalesforceTokenCache, create_records, salesforce_config, upsert_records
+from outbox import OUTBOX_WORKERS, OutboxWorkerPool, enqueue_deliveries, enqueue_deliveries_bulk, get_outbox_stats, retry_dead_letters
+from lead_rollups import install_rollups
+from analytics_cache import ResultCache
+from lead_search import apply_lead_search, install_search_index
+from background_jobs import JOB_WORKERS, JobRunner, STATUS_COMPLETED, STATUS_EXPIRED, create_job
+from export_jobs import EXPORT_JOB_KIND, make_export_handler, purge_exports
+from webhook_sender import WEBHOOK_JOB_KIND, make_webhook_handler, send_leads_in_batches
+from sync_feed import (
+    SYNC_DEFAULT_LIMIT, WatermarkExpired, get_changes, purge_tombstones, record_tombstone, safety_lag
+)
+from pagination import after_cursor_desc, clamp_per_page, decode_cursor, encode_cursor
+from lead_ingest import (
+    LEAD_BATCH_MAX_ROWS, UPSERT_UPDATE_COLUMNS, build_lead_row, ingest_lead_batch, parse_batch_body,
+    upsert_by_email, validate_lead_payload
+)
 
 # Import analytics and email modules
 try:
     from analytics import get_dashboard_analytics, get_conversion_funnel, get_lead_quality_scores, calculate_lead_quality_score
-    from email_notifications import email_notifier
     ANALYTICS_ENABLED = True
-    EMAIL_ENABLED = True
 except ImportError:
     ANALYTICS_ENABLED = False
-    EMAIL_ENABLED = False
-    print("⚠️  Analytics and email modules not loaded")
+    print("⚠️  Analytics module not loaded")
+
+# Email (smtplib, MIME, compiled templates, dispatcher) is imported on the
+# first notification, not at startup; see email_notifier()
+EMAIL_ENABLED = importlib.util.find_spec('email_notifications') is not None
+if not EMAIL_ENABLED:
+    print("⚠️  Email module not loaded")
+
+
+def email_notifier():
+    """The shared EmailNotifier, imported and built on first use"""
+    from email_notifications import get_email_notifier
+    return get_email_notifier()
 
 # Serve frontend from parent directory
 app = Flask(__name__, 
@@ -35,10 +65,18 @@ if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
 
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL or 'sqlite:///leads.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool sized for this process's request threads plus outbox and job workers
+db_pool_metrics = PoolMetrics()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'], db_pool_metrics, background_threads=OUTBOX_WORKERS + JOB_WORKERS
+)
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 
 db = SQLAlchemy(app)
+with app.app_context():
+    install_pool_events(db.engine, db_pool_metrics)
+    install_sqlite_profile(db.engine, db_pool_metrics)
 
 # Manual CORS configuration
 @app.after_request
@@ -118,6 +156,13 @@ class Lead(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Keyset pagination order for GET /api/leads
+        db.Index('ix_lead_created_at_id', 'created_at', 'id'),
+        # Change feed order for GET /api/sync/changes
+        db.Index('ix_lead_updated_at_id', 'updated_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -150,7 +195,7 @@ class Lead(db.Model):
 class ContactSubmission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(200), nullable=False)
-    email = db.Column(db.String(200), nullable=False)
+    email = db.Column(db.String(200), nullable=False, unique=True)
     phone = db.Column(db.String(20), nullable=False)
     country = db.Column(db.String(100), nullable=False)
     experience = db.Column(db.String(50))
@@ -161,6 +206,11 @@ class ContactSubmission(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Change feed order for GET /api/sync/changes
+        db.Index('ix_contact_submission_updated_at_id', 'updated_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -177,6 +227,31 @@ class ContactSubmission(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class LeadDailyStats(db.Model):
+    """Per-day lead rollup, maintained by database triggers (see lead_rollups.py)"""
+    __tablename__ = 'lead_daily_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(50), nullable=False, default='')
+    source = db.Column(db.String(100), nullable=False, default='')
+    utm_campaign = db.Column(db.String(100), nullable=False, default='')
+    device_type = db.Column(db.String(50), nullable=False, default='')
+    investment = db.Column(db.String(50), nullable=False, default='')
+    lead_count = db.Column(db.Integer, nullable=False, default=0)
+    conversion_value_sum = db.Column(db.Float, nullable=False, default=0.0)
+    quality_positive_sum = db.Column(db.Integer, nullable=False, default=0)
+    quality_positive_count = db.Column(db.Integer, nullable=False, default=0)
+    high_quality_count = db.Column(db.Integer, nullable=False, default=0)
+    medium_quality_count = db.Column(db.Integer, nullable=False, default=0)
+    low_quality_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('day', 'status', 'source', 'utm_campaign', 'device_type', 'investment',
+                            name='uq_lead_daily_stats_key'),
+    )
+
+# Columns refreshed when a contact form is resubmitted with a known email
+CONTACT_UPSERT_UPDATE_COLUMNS = ['full_name', 'phone', 'country', 'experience', 'message', 'updated_at']
+
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -195,6 +270,80 @@ class CRMIntegration(db.Model):
     settings = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class CRMOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    integration_id = db.Column(db.Integer, db.ForeignKey('crm_integration.id'), nullable=False)
+    entity_type = db.Column(db.String(20), nullable=False)  # 'lead' or 'contact'
+    entity_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='pending', index=True)
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_error = db.Column(db.Text)
+    delivered_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SyncTombstone(db.Model):
+    """Delete marker for the delta sync feed (see sync_feed.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # 'lead' or 'contact'
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_sync_tombstone_deleted_at_id', 'deleted_at', 'id'),
+    )
+
+class BackgroundJob(db.Model):
+    """Long-running admin job (see background_jobs.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='queued', index=True)
+    params = db.Column(db.Text)  # JSON
+    rows_done = db.Column(db.Integer, default=0)
+    rows_total = db.Column(db.Integer)
+    file_path = db.Column(db.String(500))
+    file_name = db.Column(db.String(255))
+    file_size = db.Column(db.BigInteger)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    created_by = db.Column(db.String(80))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': json.loads(self.params) if self.params else {},
+            'rows_done': self.rows_done or 0,
+            'rows_total': self.rows_total,
+            'progress': round((self.rows_done or 0) / self.rows_total, 4) if self.rows_total else None,
+            'file_name': self.file_name,
+            'file_size': self.file_size,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+class SchemaVersion(db.Model):
+    """Schema revisions applied by bootstrap_database()"""
+    __tablename__ = 'schema_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Bump whenever models or upgrade_schema() change so the next deploy re-runs bootstrap
+SCHEMA_VERSION = 1
+
 # API Routes
 @app.route('/api/contact', methods=['POST'])
 def submit_contact():
@@ -207,119 +356,78 @@ def submit_contact():
             if not data.get(field):
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Check if submission already exists
-        existing = ContactSubmission.query.filter_by(email=data['email']).first()
-        if existing:
-            # Update existing submission
-            existing.full_name = data['fullName']
-            existing.phone = data['phone']
-            existing.country = data['country']
-            existing.experience = data.get('experience', '')
-            existing.message = data.get('message', '')
-            existing.updated_at = datetime.utcnow()
-            db.session.commit()
-            
+        # Stamp after checking out the connection (see sync_feed.safety_lag)
+        db.session.connection()
+        now = datetime.utcnow()
+        values = {
+            'full_name': data['fullName'],
+            'email': data['email'],
+            'phone': data['phone'],
+            'country': data['country'],
+            'experience': data.get('experience', ''),
+            'message': data.get('message', ''),
+            'source': 'education-page',
+            'status': 'new',
+            'created_at': now,
+            'updated_at': now
+        }
+        if contact_upsert_ready():
+            # Insert or update by email in a single statement
+            submission = upsert_by_email(db, ContactSubmission, values, CONTACT_UPSERT_UPDATE_COLUMNS)
+            # A conflicting row keeps its original created_at
+            created = submission.created_at == now
+        else:
+            submission, created = save_contact_by_lookup(values)
+        
+        if created:
+            # Queue CRM deliveries in the same transaction
+            trigger_contact_crm_integrations(submission)
+        submission_data = submission.to_dict()
+        db.session.commit()
+        
+        if not created:
             return jsonify({
                 'message': 'Contact submission updated successfully',
-                'submission': existing.to_dict()
+                'submission': submission_data
             }), 200
         
-        # Create new contact submission
-        submission = ContactSubmission(
-            full_name=data['fullName'],
-            email=data['email'],
-            phone=data['phone'],
-            country=data['country'],
-            experience=data.get('experience', ''),
-            message=data.get('message', ''),
-            source='education-page'
-        )
-        
-        db.session.add(submission)
-        db.session.commit()
-        
-        # Trigger CRM integrations
-        trigger_contact_crm_integrations(submission)
+        outbox_pool.wake()
         
         return jsonify({
             'message': 'Contact submission received successfully',
-            'submission': submission.to_dict()
+            'submission': submission_data
         }), 201
         
     except Exception as e:
         print(f"Contact submission error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def save_contact_by_lookup(values):
+    """
+    Insert or update a submission without ON CONFLICT, for databases where
+    upgrade_schema() could not add the unique index on email yet.
+    Returns (submission, created); the caller commits.
+    """
+    submission = ContactSubmission.query.filter_by(email=values['email']).order_by(ContactSubmission.id.desc()).first()
+    if submission is None:
+        submission = ContactSubmission(**values)
+        db.session.add(submission)
+        db.session.flush()
+        return submission, True
+    for column in CONTACT_UPSERT_UPDATE_COLUMNS:
+        setattr(submission, column, values[column])
+    db.session.flush()
+    return submission, False
+
 @app.route('/api/leads', methods=['POST'])
 def create_lead():
     try:
         data = request.get_json()
         
-        # Support multiple form formats
-        first_name = data.get('firstName', '')
-        last_name = data.get('lastName', '')
-        email = data.get('email', '')
-        phone = data.get('phone', '')
-        investment = data.get('investment', 'Not specified')
-        country = data.get('country', 'Not specified')
-        has_deposit = data.get('hasDeposit', 'unknown')
-        call_time = data.get('callTime', 'anytime')
-        experience = data.get('experience', '')
-        message = data.get('message', '')
-        
         # Validate required fields
-        if not email or not phone:
-            return jsonify({'error': 'Email and phone are required'}), 400
-        
-        if not first_name and not last_name:
-            return jsonify({'error': 'Name is required'}), 400
-        
-        # Check if lead already exists
-        existing_lead = Lead.query.filter_by(email=email).first()
-        if existing_lead:
-            # Build notes with all available information
-            notes_parts = [f"Country: {country}"]
-            if has_deposit != 'unknown':
-                notes_parts.append(f"Has Deposit: {has_deposit}")
-            if call_time != 'anytime':
-                notes_parts.append(f"Call Time: {call_time}")
-            if experience:
-                notes_parts.append(f"Experience: {experience}")
-            if message:
-                notes_parts.append(f"Message: {message}")
-            
-            notes = ", ".join(notes_parts)
-            
-            # Update existing lead with new information
-            existing_lead.first_name = first_name
-            existing_lead.last_name = last_name
-            existing_lead.phone = phone
-            existing_lead.investment = investment
-            existing_lead.source = data.get('source', 'website')
-            existing_lead.notes = notes
-            existing_lead.updated_at = datetime.utcnow()
-            db.session.commit()
-            
-            # Trigger CRM integrations for updated lead
-            trigger_crm_integrations(existing_lead)
-            
-            return jsonify({
-                'message': 'Lead updated successfully',
-                'lead': existing_lead.to_dict()
-            }), 200
-        
-        # Build notes with all available information
-        notes_parts = [f"Country: {country}"]
-        if has_deposit != 'unknown':
-            notes_parts.append(f"Has Deposit: {has_deposit}")
-        if call_time != 'anytime':
-            notes_parts.append(f"Call Time: {call_time}")
-        if experience:
-            notes_parts.append(f"Experience: {experience}")
-        if message:
-            notes_parts.append(f"Message: {message}")
-        
-        notes = ", ".join(notes_parts)
+        error = validate_lead_payload(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Get IP address
         ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
@@ -331,53 +439,116 @@ def create_lead():
         if ANALYTICS_ENABLED:
             quality_score = calculate_lead_quality_score(data)
         
-        # Create new lead with enhanced tracking
-        lead = Lead(
-            first_name=first_name,
-            last_name=last_name,
-            email=email,
-            phone=phone,
-            investment=investment,
-            source=data.get('source', 'website'),
-            notes=notes,
-            # Enhanced tracking
-            utm_source=data.get('utm_source'),
-            utm_medium=data.get('utm_medium'),
-            utm_campaign=data.get('utm_campaign'),
-            utm_term=data.get('utm_term'),
-            utm_content=data.get('utm_content'),
-            referrer=data.get('referrer'),
-            landing_page=data.get('landing_page'),
-            user_agent=data.get('user_agent'),
-            device_type=data.get('device_type'),
-            ip_address=ip_address,
-            quality_score=quality_score,
-            last_activity=datetime.utcnow()
+        # Insert or update by email in a single statement; an existing lead
+        # only gets its contact details and notes refreshed. Stamp after
+        # checking out the connection (see sync_feed.safety_lag)
+        db.session.connection()
+        now = datetime.utcnow()
+        lead = upsert_by_email(
+            db, Lead, build_lead_row(data, ip_address, quality_score, now), UPSERT_UPDATE_COLUMNS
         )
         
-        db.session.add(lead)
+        # A conflicting row keeps its original created_at
+        created = lead.created_at == now
+        # Queue CRM deliveries in the same transaction
+        trigger_crm_integrations(lead, created)
+        lead_data = lead.to_dict()
         db.session.commit()
+        outbox_pool.wake()
+        analytics_cache.invalidate()
+        
+        if not created:
+            return jsonify({
+                'message': 'Lead updated successfully',
+                'lead': lead_data
+            }), 200
         
         # Send email notifications
         if EMAIL_ENABLED:
             try:
-                email_notifier.notify_new_lead(lead.to_dict())
-                email_notifier.send_welcome_email(lead.to_dict())
+                email_notifier().notify_new_lead(lead_data)
+                email_notifier().send_welcome_email(lead_data)
             except Exception as e:
                 print(f"Email notification error: {e}")
         
-        # Trigger CRM integrations
-        trigger_crm_integrations(lead)
-        
         return jsonify({
             'message': 'Lead created successfully',
-            'lead': lead.to_dict()
+            'lead': lead_data
         }), 201
         
     except Exception as e:
         print(f"Lead creation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/leads/batch', methods=['POST'])
+def create_leads_batch():
+    """Bulk lead ingestion for partners: JSON array or NDJSON body"""
+    if not is_authenticated() and not api_key_matches(os.environ.get('LEAD_BATCH_API_KEY')):
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        try:
+            payloads = parse_batch_body(request.get_data(), request.content_type)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not payloads:
+            return jsonify({'error': 'No leads provided'}), 400
+        if len(payloads) > LEAD_BATCH_MAX_ROWS:
+            return jsonify({'error': f'Batch exceeds {LEAD_BATCH_MAX_ROWS} leads'}), 413
+        
+        notify = request.args.get('notify', 'false').lower() == 'true'
+        integrations = get_lead_integrations()
+        update_integrations = [i for i in integrations if receives_lead_updates(i)]
+        
+        def queue_chunk_deliveries(chunk_results):
+            # Outbox rows share the chunk's transaction with the leads
+            enqueue_deliveries_bulk(
+                db, CRMOutbox, integrations, 'lead', [r['id'] for r in chunk_results if r['status'] == 'created']
+            )
+            enqueue_deliveries_bulk(
+                db, CRMOutbox, update_integrations, 'lead', [r['id'] for r in chunk_results if r['status'] != 'created']
+            )
+        
+        results = ingest_lead_batch(
+            db, Lead, payloads,
+            score_lead=calculate_lead_quality_score if ANALYTICS_ENABLED else None,
+            on_chunk=queue_chunk_deliveries
+        )
+        outbox_pool.wake()
+        analytics_cache.invalidate()
+        
+        created_ids = [r['id'] for r in results if r['status'] == 'created']
+        if notify and EMAIL_ENABLED and created_ids:
+            for lead in Lead.query.filter(Lead.id.in_(created_ids)).all():
+                email_notifier().notify_new_lead(lead.to_dict())
+                email_notifier().send_welcome_email(lead.to_dict())
+        
+        summary = {status: 0 for status in ('created', 'updated', 'duplicate', 'error')}
+        for result in results:
+            summary[result['status']] += 1
+        
+        return jsonify({
+            'message': f'Processed {len(results)} leads',
+            'summary': summary,
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        print(f"Lead batch error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def approximate_lead_count():
+    """Cheap estimate of the unfiltered lead count (no table scan)"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        estimate = db.session.execute(db.text(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = 'lead'::regclass"
+        )).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    # Ids are never reused, so the highest id bounds the row count
+    return db.session.query(db.func.max(Lead.id)).scalar() or 0
+
 @app.route('/api/leads', methods=['GET'])
 def get_leads():
     if not is_authenticated():
@@ -385,7 +556,7 @@ def get_leads():
     
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
+        per_page = clamp_per_page(request.args.get('per_page', type=int))
         status = request.args.get('status')
         search = request.args.get('search')
         
@@ -394,18 +565,45 @@ def get_leads():
         if status:
             query = query.filter(Lead.status == status)
         
+        search_rank = None
         if search:
-            search_filter = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    Lead.first_name.like(search_filter),
-                    Lead.last_name.like(search_filter),
-                    Lead.email.like(search_filter),
-                    Lead.phone.like(search_filter)
-                )
-            )
+            query, search_rank = apply_lead_search(db, Lead, query, search)
         
-        query = query.order_by(Lead.created_at.desc())
+        # Cursor mode: keyset pagination on (created_at, id), no OFFSET and
+        # no COUNT unless asked for. Pass cursor= (empty) for the first page.
+        if 'cursor' in request.args:
+            filtered_query = query
+            if request.args['cursor']:
+                try:
+                    cursor = decode_cursor(request.args['cursor'])
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                query = query.filter(after_cursor_desc(Lead.created_at, Lead.id, cursor))
+            
+            rows = query.order_by(Lead.created_at.desc(), Lead.id.desc()).limit(per_page + 1).all()
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+            
+            total_mode = request.args.get('total', 'none')
+            total = None
+            if total_mode == 'exact':
+                total = filtered_query.order_by(None).count()
+            elif total_mode == 'approx' and not status and not search:
+                total = approximate_lead_count()
+            
+            return jsonify({
+                'leads': [lead.to_dict() for lead in rows],
+                'per_page': per_page,
+                'next_cursor': encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+                'total': total,
+                'total_is_estimate': total_mode == 'approx' and total is not None
+            })
+        
+        if search_rank is not None:
+            # Best matches first
+            query = query.order_by(search_rank, Lead.created_at.desc(), Lead.id.desc())
+        else:
+            query = query.order_by(Lead.created_at.desc(), Lead.id.desc())
         
         pagination = query.paginate(
             page=page, per_page=per_page, error_out=False
@@ -449,11 +647,12 @@ def update_lead(lead_id):
         lead.last_activity = datetime.utcnow()
         
         db.session.commit()
+        analytics_cache.invalidate()
         
         # Send status change notification
         if EMAIL_ENABLED and old_status != new_status:
             try:
-                email_notifier.notify_status_change(lead.to_dict(), old_status, new_status)
+                email_notifier().notify_status_change(lead.to_dict(), old_status, new_status)
             except Exception as e:
                 print(f"Status change email error: {e}")
         
@@ -473,7 +672,10 @@ def delete_lead(lead_id):
     try:
         lead = Lead.query.get_or_404(lead_id)
         db.session.delete(lead)
+        # Same transaction as the delete, so sync clients never miss it
+        record_tombstone(db, SyncTombstone, 'lead', lead_id)
         db.session.commit()
+        analytics_cache.invalidate()
         
         return jsonify({'message': 'Lead deleted successfully'})
         
@@ -488,48 +690,32 @@ def export_csv():
     
     try:
         # Get lead IDs from request if selective export
+        lead_ids = []
         if request.method == 'POST':
-            data = request.get_json()
+            data = request.get_json(silent=True) or {}
             lead_ids = data.get('lead_ids', [])
-            if lead_ids:
-                leads = Lead.query.filter(Lead.id.in_(lead_ids)).order_by(Lead.created_at.desc()).all()
-            else:
-                leads = Lead.query.order_by(Lead.created_at.desc()).all()
-        else:
-            leads = Lead.query.order_by(Lead.created_at.desc()).all()
-        
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Write headers
-        writer.writerow([
-            'ID', 'First Name', 'Last Name', 'Email', 'Phone', 
-            'Investment', 'Source', 'Status', 'Notes', 
-            'Created At', 'Updated At'
-        ])
         
-        # Write data
-        for lead in leads:
-            writer.writerow([
-                lead.id, lead.first_name, lead.last_name, lead.email,
-                lead.phone, lead.investment, lead.source, lead.status,
-                lead.notes or '', 
-                lead.created_at.strftime('%Y-%m-%d %H:%M:%S') if lead.created_at else '',
-                lead.updated_at.strftime('%Y-%m-%d %H:%M:%S') if lead.updated_at else ''
-            ])
+        from exports import EXPORT_CONTENT_TYPES, stream_export  # loaded with the first export, not at startup
         
-        # Create response
-        output.seek(0)
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
+        compress = request.args.get('gzip', 'false').lower() in ('1', 'true')
         
-        # Save to file
-        filename = f'leads_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        filepath = os.path.join('exports', filename)
-        os.makedirs('exports', exist_ok=True)
+        if request.args.get('async', 'false').lower() in ('1', 'true'):
+            return queue_export_job(export_format, lead_ids, compress)
         
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            f.write(output.getvalue())
+        filename = f'leads_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+        if compress:
+            filename += '.gz'
         
-        return send_file(filepath, as_attachment=True, download_name=filename)
+        # Stream rows to the client as they are read; nothing is buffered or written to disk
+        body = stream_export(db, Lead, export_format, lead_ids, compress)
+        return Response(
+            stream_with_context(body),
+            mimetype='application/gzip' if compress else EXPORT_CONTENT_TYPES[export_format],
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -541,48 +727,155 @@ def export_excel():
     
     try:
         # Get lead IDs from request if selective export
+        lead_ids = []
         if request.method == 'POST':
-            data = request.get_json()
+            data = request.get_json(silent=True) or {}
             lead_ids = data.get('lead_ids', [])
-            if lead_ids:
-                leads = Lead.query.filter(Lead.id.in_(lead_ids)).order_by(Lead.created_at.desc()).all()
-            else:
-                leads = Lead.query.order_by(Lead.created_at.desc()).all()
-        else:
-            leads = Lead.query.order_by(Lead.created_at.desc()).all()
-        
-        # Create DataFrame
-        data = []
-        for lead in leads:
-            data.append({
-                'ID': lead.id,
-                'First Name': lead.first_name,
-                'Last Name': lead.last_name,
-                'Email': lead.email,
-                'Phone': lead.phone,
-                'Investment': lead.investment,
-                'Source': lead.source,
-                'Status': lead.status,
-                'Notes': lead.notes or '',
-                'Created At': lead.created_at.strftime('%Y-%m-%d %H:%M:%S') if lead.created_at else '',
-                'Updated At': lead.updated_at.strftime('%Y-%m-%d %H:%M:%S') if lead.updated_at else ''
-            })
         
-        # Create CSV export instead of Excel
-        filename = f'leads_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        filepath = os.path.join('exports', filename)
-        os.makedirs('exports', exist_ok=True)
+        if request.args.get('async', 'false').lower() in ('1', 'true'):
+            return queue_export_job('xlsx', lead_ids)
         
-        # Write CSV file
-        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            if data:
-                fieldnames = data[0].keys()
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(data)
+        from exports import stream_xlsx_export  # loaded with the first export, not at startup
+        from xlsx_writer import XLSX_CONTENT_TYPE
         
-        return send_file(filepath, as_attachment=True, download_name=filename)
+        filename = f'leads_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
         
+        # Workbook is zipped row by row as leads are read; nothing is written to disk
+        body = stream_xlsx_export(db, Lead, lead_ids)
+        return Response(
+            stream_with_context(body),
+            mimetype=XLSX_CONTENT_TYPE,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Background export jobs
+def export_job_payload(job):
+    payload = job.to_dict()
+    if job.status == STATUS_COMPLETED:
+        payload['download_url'] = url_for('download_export_job', job_id=job.id)
+    return payload
+
+def queue_export_job(export_format, lead_ids=None, compress=False):
+    job = create_job(db, BackgroundJob, EXPORT_JOB_KIND, {
+        'format': export_format,
+        'lead_ids': lead_ids or [],
+        'gzip': compress
+    }, created_by=session.get('username'))
+    job_runner.wake()
+    return jsonify({
+        'message': 'Export job queued',
+        'job': export_job_payload(job),
+        'status_url': url_for('get_export_job', job_id=job.id)
+    }), 202
+
+@app.route('/api/export/jobs', methods=['POST'])
+def create_export_job():
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        from exports import EXPORT_JOB_FORMATS  # loaded with the first export, not at startup
+        
+        data = request.get_json(silent=True) or {}
+        export_format = data.get('format', 'csv')
+        if export_format not in EXPORT_JOB_FORMATS:
+            return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
+        return queue_export_job(export_format, data.get('lead_ids', []), bool(data.get('gzip', False)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/export/jobs', methods=['GET'])
+def list_export_jobs():
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        jobs = BackgroundJob.query.filter_by(kind=EXPORT_JOB_KIND).order_by(
+            BackgroundJob.created_at.desc()
+        ).limit(50).all()
+        return jsonify({'jobs': [export_job_payload(job) for job in jobs]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/export/jobs/<int:job_id>', methods=['GET'])
+def get_export_job(job_id):
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    job = BackgroundJob.query.filter_by(id=job_id, kind=EXPORT_JOB_KIND).first()
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    return jsonify(export_job_payload(job))
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of any background job (exports, webhook deliveries)"""
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(export_job_payload(job) if job.kind == EXPORT_JOB_KIND else job.to_dict())
+
+@app.route('/api/export/jobs/<int:job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    job = BackgroundJob.query.filter_by(id=job_id, kind=EXPORT_JOB_KIND).first()
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    if job.status == STATUS_EXPIRED or (job.status == STATUS_COMPLETED and not os.path.exists(job.file_path or '')):
+        return jsonify({'error': 'Export file has expired'}), 410
+    if job.status != STATUS_COMPLETED:
+        return jsonify({'error': f'Export job is {job.status}'}), 409
+    
+    # conditional=True serves Range requests (206) and ETag/If-Range, so downloads can resume
+    result = json.loads(job.result) if job.result else {}
+    return send_file(
+        job.file_path,
+        mimetype=result.get('content_type'),
+        as_attachment=True,
+        download_name=job.file_name,
+        conditional=True,
+        etag=True
+    )
+
+# Delta sync feed
+SYNC_SOURCES = [('lead', Lead), ('contact', ContactSubmission)]
+# Longer than any write can wait for a lock between stamping updated_at and commit
+SYNC_LAG_SECONDS = safety_lag(max_lock_wait(app.config['SQLALCHEMY_DATABASE_URI']))
+
+@app.route('/api/sync/changes', methods=['GET'])
+def get_sync_changes():
+    """Leads/contacts changed after the since watermark, plus deletes"""
+    if not is_authenticated() and not api_key_matches(os.environ.get('SYNC_API_KEY')):
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        types = request.args.get('types')
+        if types:
+            types = set(types.split(','))
+            unknown = types - {entity_type for entity_type, _ in SYNC_SOURCES}
+            if unknown:
+                return jsonify({'error': f"Unknown types: {', '.join(sorted(unknown))}"}), 400
+        
+        try:
+            return jsonify(get_changes(
+                db, SYNC_SOURCES, SyncTombstone,
+                since=request.args.get('since'),
+                limit=request.args.get('limit', SYNC_DEFAULT_LIMIT, type=int),
+                types=types,
+                lag=SYNC_LAG_SECONDS
+            ))
+        except WatermarkExpired as e:
+            return jsonify({'error': str(e), 'resync_required': True}), 410
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -592,50 +885,51 @@ def send_leads_webhook():
     if not is_authenticated():
         return jsonify({'error': 'Authentication required'}), 401
     
+    import requests  # loaded with the CRM/webhook code, not at startup
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         webhook_url = data.get('webhook_url')
         lead_ids = data.get('lead_ids', [])
         
         if not webhook_url:
             return jsonify({'error': 'Webhook URL is required'}), 400
         
-        # Get leads
-        if lead_ids:
-            leads = Lead.query.filter(Lead.id.in_(lead_ids)).all()
-        else:
-            leads = Lead.query.all()
-        
-        if not leads:
-            return jsonify({'error': 'No leads found'}), 404
-        
-        # Prepare payload
-        payload = {
-            'event': 'leads_export',
-            'timestamp': datetime.utcnow().isoformat(),
-            'count': len(leads),
-            'leads': [lead.to_dict() for lead in leads]
+        params = {
+            'webhook_url': webhook_url,
+            'lead_ids': lead_ids,
+            'batch_size': data.get('batch_size'),
+            'concurrency': data.get('concurrency')
         }
         
-        # Send to webhook
-        response = requests.post(
-            webhook_url,
-            json=payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=30
+        # Large sends can run as a background job; poll /api/jobs/<id> for progress
+        if data.get('async') or request.args.get('async', 'false').lower() in ('1', 'true'):
+            job = create_job(db, BackgroundJob, WEBHOOK_JOB_KIND, params, created_by=session.get('username'))
+            job_runner.wake()
+            return jsonify({
+                'message': 'Webhook delivery queued',
+                'job': job.to_dict(),
+                'status_url': url_for('get_job', job_id=job.id)
+            }), 202
+        
+        report = send_leads_in_batches(
+            db, Lead, webhook_url, lead_ids,
+            batch_size=params['batch_size'],
+            concurrency=params['concurrency']
         )
         
-        if response.status_code in [200, 201, 202]:
-            return jsonify({
-                'message': f'Successfully sent {len(leads)} leads to webhook',
-                'status_code': response.status_code,
-                'count': len(leads)
-            })
-        else:
-            return jsonify({
-                'error': f'Webhook returned status code {response.status_code}',
-                'response': response.text
-            }), 400
+        if not report['total']:
+            return jsonify({'error': 'No leads found'}), 404
+        
+        if not report['failed']:
+            return jsonify(dict(report, message=f"Successfully sent {report['sent']} leads to webhook", count=report['sent']))
+        
+        # 207: some batches were delivered, 502: none were
+        status = 207 if report['sent'] else 502
+        return jsonify(dict(
+            report,
+            error=f"{report['failed']} of {report['total']} leads could not be delivered",
+            count=report['sent']
+        )), status
         
     except requests.RequestException as e:
         return jsonify({'error': f'Failed to send webhook: {str(e)}'}), 500
@@ -715,103 +1009,313 @@ def force_init_db():
 def is_authenticated():
     return 'admin_id' in session
 
+def api_key_matches(expected):
+    """Constant-time check of the X-API-Key header; always False when no key is configured"""
+    if not expected:
+        return False
+    provided = request.headers.get('X-API-Key') or ''
+    return hmac.compare_digest(provided.encode(), expected.encode())
+
 # CRM Integration functions
+CRM_HTTP_TIMEOUT = float(os.environ.get('CRM_HTTP_TIMEOUT', 10))
+
+# Keep-alive sessions shared by all CRM calls, and one circuit breaker and
+# rate governor per integration
+crm_http = HTTPSessionPool()
+crm_breakers = BreakerRegistry()
+crm_rate_limits = RateGovernor()
+salesforce_tokens = SalesforceTokenCache(crm_http)
+
+def crm_request(integration, method, url, **kwargs):
+    """
+    Call a CRM API through the pooled session, guarded by the integration's
+    circuit breaker and then paced by its rate governor (an open circuit
+    fails without taking a token). A 429 raises RateLimited (the outbox
+    reschedules the row) and does not count against the breaker.
+    """
+    kwargs.setdefault('timeout', CRM_HTTP_TIMEOUT)
+    bucket = crm_rate_limits.get(integration)
+    return call_with_breaker(
+        crm_breakers.get(integration),
+        lambda: bucket.observe(crm_http.request(method, url, **kwargs)),
+        wait=bucket.acquire
+    )
+
+def crm_post(integration, url, **kwargs):
+    return crm_request(integration, 'POST', url, **kwargs)
+
+def crm_patch(integration, url, **kwargs):
+    return crm_request(integration, 'PATCH', url, **kwargs)
+
 def trigger_contact_crm_integrations(submission):
-    """Trigger all active CRM integrations for a new contact submission"""
-    try:
-        integrations = CRMIntegration.query.filter_by(is_active=True).all()
-        
-        for integration in integrations:
-            if integration.webhook_url:
-                # Send contact submission to webhook
-                try:
-                    data = submission.to_dict()
-                    requests.post(integration.webhook_url, json=data, timeout=10)
-                except Exception as e:
-                    print(f"Webhook integration error for contact: {e}")
-                
-    except Exception as e:
-        print(f"Error triggering contact CRM integrations: {e}")
+    """Queue delivery of a contact submission to all active webhook integrations"""
+    integrations = CRMIntegration.query.filter_by(is_active=True).all()
+    integrations = [i for i in integrations if i.webhook_url]
+    return enqueue_deliveries(db, CRMOutbox, integrations, 'contact', submission.id)
+
+def get_lead_integrations():
+    """Active integrations that receive leads"""
+    integrations = CRMIntegration.query.filter_by(is_active=True).all()
+    return [
+        i for i in integrations
+        if i.name.lower() in ('hubspot', 'salesforce', 'pipedrive') or i.webhook_url
+    ]
 
-def trigger_crm_integrations(lead):
-    """Trigger all active CRM integrations for a new lead"""
+def receives_lead_updates(integration):
+    """
+    Whether an updated lead is sent again. Salesforce without an
+    external_id_field can only insert, so a resend would duplicate the lead.
+    """
+    if integration.name.lower() == 'salesforce':
+        return bool(salesforce_config(integration)['external_id_field'])
+    return True
+
+def trigger_crm_integrations(lead, created=True):
+    """Queue delivery of a new or updated lead to the active CRM integrations"""
+    integrations = get_lead_integrations()
+    if not created:
+        integrations = [i for i in integrations if receives_lead_updates(i)]
+    return enqueue_deliveries(db, CRMOutbox, integrations, 'lead', lead.id)
+
+def deliver_outbox_message(message, integration):
+    """Deliver one outbox row; raises on failure so the worker can retry"""
+    if message.entity_type == 'contact':
+        submission = db.session.get(ContactSubmission, message.entity_id)
+        if submission is not None:
+            trigger_contact_webhook_integration(submission, integration)
+        return
+    
+    lead = db.session.get(Lead, message.entity_id)
+    if lead is None:
+        return  # Lead was deleted before delivery
+    
+    if integration.name.lower() == 'hubspot':
+        trigger_hubspot_integration(lead, integration)
+    elif integration.name.lower() == 'salesforce':
+        trigger_salesforce_integration(lead, integration)
+    elif integration.name.lower() == 'pipedrive':
+        trigger_pipedrive_integration(lead, integration)
+    elif integration.webhook_url:
+        trigger_webhook_integration(lead, integration)
+
+# API hosts; overridable per integration with settings.base_url (e.g. crm_emulator.py)
+HUBSPOT_API_BASE = os.environ.get('HUBSPOT_API_BASE', 'https://api.hubapi.com')
+PIPEDRIVE_API_BASE = os.environ.get('PIPEDRIVE_API_BASE', 'https://api.pipedrive.com')
+
+def crm_base_url(integration, default):
     try:
-        integrations = CRMIntegration.query.filter_by(is_active=True).all()
-        
-        for integration in integrations:
-            if integration.name.lower() == 'hubspot':
-                trigger_hubspot_integration(lead, integration)
-            elif integration.name.lower() == 'salesforce':
-                trigger_salesforce_integration(lead, integration)
-            elif integration.name.lower() == 'pipedrive':
-                trigger_pipedrive_integration(lead, integration)
-            elif integration.webhook_url:
-                trigger_webhook_integration(lead, integration)
-                
-    except Exception as e:
-        print(f"Error triggering CRM integrations: {e}")
+        settings = json.loads(integration.settings or '{}')
+    except ValueError:
+        settings = {}
+    base_url = settings.get('base_url') if isinstance(settings, dict) else None
+    return (base_url or default).rstrip('/')
+
+# CRMs with a bulk API; their outbox rows are micro-batched (see outbox.py)
+BATCHABLE_CRMS = ('hubspot', 'pipedrive', 'salesforce')
+CRM_BATCH_CONCURRENCY = int(os.environ.get('CRM_BATCH_CONCURRENCY', 4))
+
+class CRMItemError(Exception):
+    """A single record rejected inside a CRM batch call"""
+
+def is_batchable_integration(integration):
+    return integration.name.lower() in BATCHABLE_CRMS
+
+def deliver_outbox_batch(messages, integration):
+    """Deliver many lead rows with one bulk call; returns {message_id: error} for the failures"""
+    leads = Lead.query.filter(Lead.id.in_({m.entity_id for m in messages})).all()
+    if not leads:
+        return {}  # Leads were deleted before delivery
+    
+    if integration.name.lower() == 'hubspot':
+        errors = trigger_hubspot_batch(leads, integration)
+    elif integration.name.lower() == 'salesforce':
+        errors = trigger_salesforce_batch(leads, integration)
+    else:
+        errors = trigger_pipedrive_batch(leads, integration)
+    # The same lead can be queued more than once; all its rows share the outcome
+    return {m.id: errors[m.entity_id] for m in messages if m.entity_id in errors}
+
+def hubspot_properties(lead):
+    return {
+        'firstname': lead.first_name,
+        'lastname': lead.last_name,
+        'email': lead.email,
+        'phone': lead.phone,
+        'investment_amount': lead.investment,
+        'lead_source': lead.source
+    }
 
 def trigger_hubspot_integration(lead, integration):
     """Send lead to HubSpot CRM"""
-    try:
-        url = "https://api.hubapi.com/contacts/v1/contact"
-        headers = {
-            'Authorization': f'Bearer {integration.api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'properties': [
-                {'property': 'firstname', 'value': lead.first_name},
-                {'property': 'lastname', 'value': lead.last_name},
-                {'property': 'email', 'value': lead.email},
-                {'property': 'phone', 'value': lead.phone},
-                {'property': 'investment_amount', 'value': lead.investment},
-                {'property': 'lead_source', 'value': lead.source}
-            ]
+    url = f"{crm_base_url(integration, HUBSPOT_API_BASE)}/contacts/v1/contact"
+    headers = {
+        'Authorization': f'Bearer {integration.api_key}',
+        'Content-Type': 'application/json'
+    }
+    
+    data = {
+        'properties': [
+            {'property': name, 'value': value} for name, value in hubspot_properties(lead).items()
+        ]
+    }
+    
+    response = crm_post(integration, url, headers=headers, json=data)
+    print(f"HubSpot integration response: {response.status_code}")
+
+def trigger_hubspot_batch(leads, integration):
+    """Upsert up to 100 leads as HubSpot contacts (by email) in one call; returns {lead_id: error}"""
+    url = f"{crm_base_url(integration, HUBSPOT_API_BASE)}/crm/v3/objects/contacts/batch/upsert"
+    headers = {
+        'Authorization': f'Bearer {integration.api_key}',
+        'Content-Type': 'application/json'
+    }
+    data = {'inputs': [
+        {'idProperty': 'email', 'id': lead.email, 'properties': hubspot_properties(lead)}
+        for lead in leads
+    ]}
+    
+    response = crm_post(integration, url, headers=headers, json=data)
+    body = response.json() if response.content else {}
+    
+    # 207 Multi-Status: map each error back to its lead through the email in its context
+    by_email = {lead.email.lower(): lead.id for lead in leads}
+    errors = {}
+    for error in body.get('errors') or []:
+        for values in (error.get('context') or {}).values():
+            for value in (values if isinstance(values, list) else [values]):
+                lead_id = by_email.get(str(value).lower())
+                if lead_id is not None:
+                    errors[lead_id] = CRMItemError(f"HubSpot {error.get('category')}: {error.get('message')}")
+    if body.get('numErrors', 0) > len(errors):
+        # Errors we could not attribute: fail every lead missing from the results
+        succeeded = {
+            str((result.get('properties') or {}).get('email', '')).lower()
+            for result in body.get('results') or []
         }
-        
-        response = requests.post(url, headers=headers, json=data)
-        print(f"HubSpot integration response: {response.status_code}")
-        
-    except Exception as e:
-        print(f"HubSpot integration error: {e}")
+        for email, lead_id in by_email.items():
+            if email not in succeeded and lead_id not in errors:
+                errors[lead_id] = CRMItemError('HubSpot batch upsert reported an error for this contact')
+    
+    print(f"HubSpot batch response: {response.status_code} ({len(leads)} contacts, {len(errors)} errors)")
+    return errors
+
+def salesforce_lead(lead, config):
+    record = {
+        'FirstName': lead.first_name,
+        'LastName': lead.last_name,
+        'Email': lead.email,
+        'Phone': lead.phone,
+        'Company': config['company'],
+        'LeadSource': lead.source
+    }
+    if config['investment_field']:
+        record[config['investment_field']] = lead.investment
+    else:
+        record['Description'] = f"Investment amount: {lead.investment}"
+    if config['external_id_field']:
+        record[config['external_id_field']] = str(lead.id)
+    return record
 
 def trigger_salesforce_integration(lead, integration):
     """Send lead to Salesforce CRM"""
-    # Implement Salesforce API integration
-    pass
+    errors = trigger_salesforce_batch([lead], integration)
+    if errors:
+        raise errors[lead.id]
+
+def trigger_salesforce_batch(leads, integration):
+    """
+    Upsert leads in Salesforce on the integration's external_id_field (or
+    create them when none is set) through sObject Collections, 200 per
+    call; returns {lead_id: error}
+    """
+    config = salesforce_config(integration)
+    records = [salesforce_lead(lead, config) for lead in leads]
+    if config['external_id_field']:
+        results = upsert_records(
+            crm_patch, salesforce_tokens, integration, 'Lead', config['external_id_field'], records
+        )
+    else:
+        results = create_records(crm_post, salesforce_tokens, integration, 'Lead', records)
+    
+    # Results come back in request order
+    errors = {}
+    for index, lead in enumerate(leads):
+        result = results[index] if index < len(results) else {}
+        if not result.get('success'):
+            detail = '; '.join(
+                f"{e.get('statusCode')}: {e.get('message')}" for e in result.get('errors') or []
+            )
+            errors[lead.id] = CRMItemError(f"Salesforce {detail or 'rejected the record'}")
+    
+    print(f"Salesforce batch response: {len(leads) - len(errors)}/{len(leads)} leads "
+          f"{'upserted' if config['external_id_field'] else 'created'}")
+    return errors
+
+def pipedrive_person(lead):
+    return {
+        'name': f"{lead.first_name} {lead.last_name}",
+        'email': [lead.email],
+        'phone': [lead.phone],
+        'custom_fields': {
+            'investment_amount': lead.investment,
+            'lead_source': lead.source
+        }
+    }
 
 def trigger_pipedrive_integration(lead, integration):
     """Send lead to Pipedrive CRM"""
-    try:
-        url = f"https://api.pipedrive.com/v1/persons?api_token={integration.api_key}"
-        
-        data = {
-            'name': f"{lead.first_name} {lead.last_name}",
-            'email': [lead.email],
-            'phone': [lead.phone],
-            'custom_fields': {
-                'investment_amount': lead.investment,
-                'lead_source': lead.source
-            }
-        }
-        
-        response = requests.post(url, json=data)
-        print(f"Pipedrive integration response: {response.status_code}")
-        
-    except Exception as e:
-        print(f"Pipedrive integration error: {e}")
+    url = f"{crm_base_url(integration, PIPEDRIVE_API_BASE)}/v1/persons?api_token={integration.api_key}"
+    
+    response = crm_post(integration, url, json=pipedrive_person(lead))
+    print(f"Pipedrive integration response: {response.status_code}")
+
+def trigger_pipedrive_batch(leads, integration):
+    """
+    Pipedrive has no bulk person endpoint, so a batch is sent as concurrent
+    calls over the pooled keep-alive session; returns {lead_id: error}
+    """
+    url = f"{crm_base_url(integration, PIPEDRIVE_API_BASE)}/v1/persons?api_token={integration.api_key}"
+    payloads = {lead.id: pipedrive_person(lead) for lead in leads}
+    
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(CRM_BATCH_CONCURRENCY, len(payloads)))) as pool:
+        futures = {pool.submit(crm_post, integration, url, json=data): lead_id for lead_id, data in payloads.items()}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors[futures[future]] = e
+    
+    print(f"Pipedrive batch: {len(payloads) - len(errors)}/{len(payloads)} persons created")
+    return errors
 
 def trigger_webhook_integration(lead, integration):
     """Send lead to custom webhook"""
-    try:
-        data = lead.to_dict()
-        response = requests.post(integration.webhook_url, json=data, timeout=10)
-        print(f"Webhook integration response: {response.status_code}")
-        
-    except Exception as e:
-        print(f"Webhook integration error: {e}")
+    data = lead.to_dict()
+    response = crm_post(integration, integration.webhook_url, json=data)
+    print(f"Webhook integration response: {response.status_code}")
+
+def trigger_contact_webhook_integration(submission, integration):
+    """Send contact submission to custom webhook"""
+    data = submission.to_dict()
+    response = crm_post(integration, integration.webhook_url, json=data)
+    print(f"Contact webhook integration response: {response.status_code}")
+
+# Background workers draining the CRM outbox
+outbox_pool = OutboxWorkerPool(
+    app, db, CRMOutbox, CRMIntegration, deliver_outbox_message,
+    deliver_batch=deliver_outbox_batch,
+    batchable=is_batchable_integration
+)
+
+job_runner = JobRunner(
+    app, db, BackgroundJob,
+    handlers={
+        EXPORT_JOB_KIND: make_export_handler(db, Lead),
+        WEBHOOK_JOB_KIND: make_webhook_handler(db, Lead)
+    },
+    maintenance=lambda: (purge_exports(db, BackgroundJob), purge_tombstones(db, SyncTombstone))
+)
 
 # CRM Integration management
 @app.route('/api/integrations', methods=['GET'])
@@ -824,9 +1328,32 @@ def get_integrations():
         'id': i.id,
         'name': i.name,
         'is_active': i.is_active,
+        'circuit_state': (crm_breakers.snapshot(i.id) or {}).get('state', 'closed'),
         'created_at': i.created_at.isoformat() if i.created_at else None
     } for i in integrations])
 
+@app.route('/api/integrations/health', methods=['GET'])
+def get_integrations_health():
+    """Circuit breaker, rate governor and call latency per integration (this worker process)"""
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        integrations = CRMIntegration.query.all()
+        return jsonify({
+            'integrations': [{
+                'id': i.id,
+                'name': i.name,
+                'is_active': i.is_active,
+                'circuit': crm_breakers.snapshot(i.id) or {'state': 'closed', 'successes': 0, 'failures': 0},
+                'rate_limit': crm_rate_limits.get(i).snapshot()
+            } for i in integrations],
+            'http_pool': crm_http.stats(),
+            'pid': os.getpid()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/integrations', methods=['POST'])
 def create_integration():
     if not is_authenticated():
@@ -851,7 +1378,61 @@ def create_integration():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/outbox/stats', methods=['GET'])
+def get_outbox_status():
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        return jsonify(get_outbox_stats(db, CRMOutbox))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/outbox/retry-dead', methods=['POST'])
+def retry_outbox_dead_letters():
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        requeued = retry_dead_letters(db, CRMOutbox)
+        outbox_pool.wake()
+        return jsonify({'message': f'Requeued {requeued} dead-lettered deliveries', 'count': requeued})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/database/pool-stats', methods=['GET'])
+def get_database_pool_stats():
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        return jsonify(pool_stats(db.engine, db_pool_metrics))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/email/stats', methods=['GET'])
+def get_email_stats():
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    if not EMAIL_ENABLED:
+        return jsonify({'error': 'Email module not available'}), 503
+    
+    return jsonify(email_notifier().stats())
+
 # Analytics endpoints
+ANALYTICS_USE_ROLLUPS = os.environ.get('ANALYTICS_USE_ROLLUPS', 'false').lower() == 'true'
+
+def analytics_rollups():
+    """Rollup model to read analytics from, or None to aggregate raw leads"""
+    source = request.args.get('source')
+    if source == 'rollup' or (ANALYTICS_USE_ROLLUPS and source != 'live'):
+        return LeadDailyStats
+    return None
+
+# Cached analytics results, invalidated by lead writes in this process
+analytics_cache = ResultCache(app)
+
 @app.route('/api/analytics/dashboard', methods=['GET'])
 def get_analytics_dashboard():
     if not is_authenticated():
@@ -861,7 +1442,11 @@ def get_analytics_dashboard():
         return jsonify({'error': 'Analytics module not available'}), 503
     
     try:
-        analytics = get_dashboard_analytics(db, Lead)
+        rollups = analytics_rollups()
+        analytics = analytics_cache.get_or_compute(
+            ('dashboard_analytics', rollups is not None),
+            lambda: get_dashboard_analytics(db, Lead, rollups=rollups)
+        )
         return jsonify(analytics)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -875,7 +1460,11 @@ def get_analytics_funnel():
         return jsonify({'error': 'Analytics module not available'}), 503
     
     try:
-        funnel = get_conversion_funnel(db, Lead)
+        rollups = analytics_rollups()
+        funnel = analytics_cache.get_or_compute(
+            ('conversion_funnel', rollups is not None),
+            lambda: get_conversion_funnel(db, Lead, rollups=rollups)
+        )
         return jsonify(funnel)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -889,52 +1478,201 @@ def get_analytics_quality():
         return jsonify({'error': 'Analytics module not available'}), 503
     
     try:
-        quality = get_lead_quality_scores(db, Lead)
+        rollups = analytics_rollups()
+        quality = analytics_cache.get_or_compute(
+            ('lead_quality_scores', rollups is not None),
+            lambda: get_lead_quality_scores(db, Lead, rollups=rollups)
+        )
         return jsonify(quality)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Initialize database and create default admin
-def init_db():
+@app.route('/api/analytics/cache-stats', methods=['GET'])
+def get_analytics_cache_stats():
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify(analytics_cache.stats())
+
+def has_unique_email(table_name):
+    inspector = db.inspect(db.engine)
+    unique_columns = [c['column_names'] for c in inspector.get_unique_constraints(table_name)]
+    unique_columns += [i['column_names'] for i in inspector.get_indexes(table_name) if i['unique']]
+    return ['email'] in unique_columns
+
+_contact_upsert_ready = None
+
+def contact_upsert_ready():
+    """Whether contact_submission.email has the unique index ON CONFLICT needs (checked once per process)"""
+    global _contact_upsert_ready
+    if _contact_upsert_ready is None:
+        _contact_upsert_ready = has_unique_email('contact_submission')
+    return _contact_upsert_ready
+
+def remove_duplicate_contact_emails():
+    """
+    Keep only the newest submission per email (latest updated_at, then
+    highest id) so the unique index can be built; returns the rows removed
+    """
+    duplicated = db.session.query(ContactSubmission.email).group_by(ContactSubmission.email).having(db.func.count() > 1)
+    rows = db.session.query(
+        ContactSubmission.id, ContactSubmission.email, ContactSubmission.created_at, ContactSubmission.updated_at
+    ).filter(ContactSubmission.email.in_(duplicated)).all()
+    
+    newest = {}
+    for row in rows:
+        key = (row.updated_at or row.created_at or datetime.min, row.id)
+        if row.email not in newest or key > newest[row.email][0]:
+            newest[row.email] = (key, row.id)
+    keep = {row_id for _, row_id in newest.values()}
+    stale = [row.id for row in rows if row.id not in keep]
+    if stale:
+        ContactSubmission.query.filter(ContactSubmission.id.in_(stale)).delete(synchronize_session=False)
+        for submission_id in stale:
+            record_tombstone(db, SyncTombstone, 'contact', submission_id)
+        db.session.commit()
+    return len(stale)
+
+def upgrade_schema():
+    """
+    Add constraints that db.create_all() cannot add to existing tables.
+    Raises if a step fails, so bootstrap_database() does not record the
+    schema version and the next deploy runs it again.
+    """
+    global _contact_upsert_ready
+    _contact_upsert_ready = None
+    
+    # Contact upserts need a unique index on email (ON CONFLICT target)
+    if not has_unique_email('contact_submission'):
+        removed = remove_duplicate_contact_emails()
+        if removed:
+            print(f"🧹 Removed {removed} duplicate contact submissions (kept the newest per email)")
+        db.session.execute(db.text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS uq_contact_submission_email ON contact_submission (email)'
+        ))
+        db.session.commit()
+        print("✅ Added unique index on contact_submission.email")
+    
+    # Indexes declared on models after their tables were first created
+    db.session.execute(db.text('CREATE INDEX IF NOT EXISTS ix_lead_created_at_id ON lead (created_at, id)'))
+    db.session.execute(db.text('CREATE INDEX IF NOT EXISTS ix_lead_updated_at_id ON lead (updated_at, id)'))
+    db.session.execute(db.text(
+        'CREATE INDEX IF NOT EXISTS ix_contact_submission_updated_at_id ON contact_submission (updated_at, id)'
+    ))
+    db.session.commit()
+
+def get_schema_version():
+    """Version recorded by the last bootstrap; None for a new or unversioned database"""
+    try:
+        return db.session.execute(db.text('SELECT MAX(version) FROM schema_version')).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+def ensure_default_admin():
+    """Create the default admin on an empty admin table; existing admins are never touched"""
+    if Admin.query.first() is not None:
+        return
+    admin = Admin(
+        username='tradeadmin',
+        email='admin@tradegpt.sbs',
+        password_hash=generate_password_hash('adm1234'),
+        is_active=True
+    )
+    db.session.add(admin)
+    db.session.commit()
+    print("✅ Default admin created: tradeadmin / adm1234")
+    print("⚠️  IMPORTANT: Change the password after first login!")
+
+class BootstrapError(RuntimeError):
+    """A bootstrap step failed; the schema version was not recorded"""
+
+def bootstrap_database(force=False):
+    """
+    Create or upgrade the schema and the default admin. Runs once per deploy
+    (bootstrap.py, or gunicorn's master before it forks workers); a database
+    already at SCHEMA_VERSION costs a single query. Prints a cold-start
+    timing report and returns it.
+    
+    The schema version is only recorded when every step succeeded: a step
+    that raises makes this raise BootstrapError, and the next deploy runs
+    the steps again. Optional features that are unavailable on this
+    database (rollups, search index) print a warning and do not block it.
+    """
+    timings = {}
+    failed = []
+    
+    def timed(name, func, *args):
+        step_started = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception as e:
+            db.session.rollback()
+            failed.append(f'{name} ({e})')
+            result = None
+        timings[name] = round((time.perf_counter() - step_started) * 1000, 1)
+        return result
+    
+    started = time.perf_counter()
     with app.app_context():
         try:
-            db.create_all()
-            print("✅ Database tables created/verified")
-            
-            # Check if admin exists
-            existing_admin = Admin.query.filter_by(username='tradeadmin').first()
-            if not existing_admin:
-                admin = Admin(
-                    username='tradeadmin',
-                    email='admin@tradegpt.sbs',
-                    password_hash=generate_password_hash('adm1234'),
-                    is_active=True
-                )
-                db.session.add(admin)
-                db.session.commit()
-                print("✅ Default admin created: tradeadmin / adm1234")
-                print("⚠️  IMPORTANT: Change the password after first login!")
+            current = timed('version_check', get_schema_version)
+            if current is not None and current >= SCHEMA_VERSION and not force:
+                status = f'schema v{current} up to date'
             else:
-                # Update password for existing admin to ensure it's correct
-                existing_admin.password_hash = generate_password_hash('adm1234')
-                existing_admin.is_active = True
+                timed('create_all', db.create_all)
+                # Later steps need the tables and the unique indexes
+                if not failed:
+                    timed('upgrade_schema', upgrade_schema)
+                if not failed:
+                    timed('rollups', install_rollups, db)
+                    timed('search_index', install_search_index, db)
+                    timed('default_admin', ensure_default_admin)
+                if failed:
+                    raise BootstrapError(
+                        f"Bootstrap steps failed: {'; '.join(failed)}. Schema version v{SCHEMA_VERSION} not recorded"
+                    )
+                db.session.add(SchemaVersion(version=SCHEMA_VERSION))
                 db.session.commit()
-                print("✅ Admin user exists: tradeadmin (password reset to adm1234)")
-            
-            # List all tables
-            inspector = db.inspect(db.engine)
-            table_names = inspector.get_table_names()
-            print(f"✅ Database initialized with {len(table_names)} tables: {', '.join(table_names)}")
-            
-            if ANALYTICS_ENABLED:
-                print("✅ Analytics enabled")
-            if EMAIL_ENABLED:
-                print("✅ Email notifications enabled")
-                
-        except Exception as e:
-            print(f"❌ Database initialization error: {e}")
-            import traceback
-            traceback.print_exc()
+                status = f'schema v{current or 0} -> v{SCHEMA_VERSION}'
+                table_names = db.inspect(db.engine).get_table_names()
+                print(f"✅ Database initialized with {len(table_names)} tables: {', '.join(table_names)}")
+        finally:
+            db.session.remove()
+            # Forked workers must not inherit the bootstrap's pooled connections
+            db.engine.dispose()
+    
+    report = {
+        'app_import_ms': round(APP_IMPORT_SECONDS * 1000, 1),
+        'bootstrap_ms': round((time.perf_counter() - started) * 1000, 1),
+        'status': status,
+        'steps_ms': timings
+    }
+    steps = ', '.join(f'{name} {ms} ms' for name, ms in timings.items())
+    print(f"⏱️  Cold start: app import {report['app_import_ms']} ms, "
+          f"bootstrap {report['bootstrap_ms']} ms ({status}; {steps})")
+    return report
+
+def start_background_workers():
+    """Start this process's outbox and job threads (gunicorn: in each worker after fork)"""
+    outbox_pool.ensure_started()
+    job_runner.ensure_started()
+
+# Bootstrap and start workers in one go (python app.py, scripts, benchmarks)
+def init_db():
+    try:
+        bootstrap_database()
+        if ANALYTICS_ENABLED:
+            print("✅ Analytics enabled")
+        if EMAIL_ENABLED:
+            print("✅ Email notifications enabled")
+        
+        # Drain any CRM deliveries and jobs left over from a previous run
+        start_background_workers()
+    except Exception as e:
+        print(f"❌ Database initialization error: {e}")
+        import traceback
+        traceback.print_exc()
 
 # ========================================
 # FRONTEND ROUTES - Serve HTML Pages
@@ -982,17 +1720,7 @@ def terms():
     """Serve terms and conditions page"""
     return send_file('../frontend/terms-conditions.html')
 
-# Initialize database before first request
-@app.before_request
-def initialize_database():
-    """Initialize database on first request"""
-    if not hasattr(app, 'db_initialized'):
-        try:
-            init_db()
-            app.db_initialized = True
-        except Exception as e:
-            print(f"⚠️  Database initialization warning: {e}")
-            app.db_initialized = True  # Don't keep trying
+APP_IMPORT_SECONDS = time.perf_counter() - APP_IMPORT_STARTED
 
 if __name__ == '__main__':
     init_db()
@@ -0,0 +1,209 @@
+"""
+Background Jobs
+Runs long admin operations (large exports, bulk sends) outside the request.
+A job row is queued in the database, a worker thread claims and runs it,
+and progress is written back to the row so any process can report status.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+
+# Worker configuration - Set these in environment variables
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 1))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2.0))
+# A running job that has not reported progress for this long is considered
+# abandoned (worker process died) and is claimed again
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 600))
+JOB_MAINTENANCE_INTERVAL = float(os.getenv('JOB_MAINTENANCE_INTERVAL', 600))
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+STATUS_EXPIRED = 'expired'
+
+# Handler result keys that are stored on the job row rather than in result
+FILE_FIELDS = ('file_path', 'file_name', 'file_size', 'expires_at')
+
+
+def create_job(db, Job, kind, params=None, created_by=None):
+    """Queue a job (commits); returns the new row"""
+    now = datetime.utcnow()
+    job = Job(
+        kind=kind,
+        status=STATUS_QUEUED,
+        params=json.dumps(params or {}),
+        rows_done=0,
+        created_by=created_by,
+        created_at=now,
+        updated_at=now
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+class JobRunner:
+    """
+    Background threads that claim queued jobs and run the handler registered
+    for the job's kind. Handlers are called as handler(job, progress) and
+    return a dict; progress(rows_done, rows_total=None) records progress.
+    """
+
+    def __init__(self, app, db, Job, handlers=None, num_workers=None, maintenance=None):
+        self.app = app
+        self.db = db
+        self.Job = Job
+        self.handlers = dict(handlers or {})
+        self.maintenance = maintenance
+        self.num_workers = JOB_WORKERS if num_workers is None else num_workers
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_maintenance = 0
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def ensure_started(self):
+        """Start the worker threads once per process (safe to call after fork)"""
+        if self.num_workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = []
+            for i in range(self.num_workers):
+                thread = threading.Thread(
+                    target=self._run, name=f'job-worker-{i}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            print(f"✅ Background job workers started: {self.num_workers}")
+
+    def wake(self):
+        """Signal idle workers that a job was queued"""
+        self.ensure_started()
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def run_forever(self):
+        """Run jobs in the foreground (dedicated worker process)"""
+        print("✅ Background job worker running in foreground")
+        self._run()
+
+    def _run(self):
+        while not self._stop.is_set():
+            ran = False
+            try:
+                with self.app.app_context():
+                    self._maybe_run_maintenance()
+                    ran = self.run_next()
+            except Exception as e:
+                print(f"Background job worker error: {e}")
+            if not ran:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+
+    def _maybe_run_maintenance(self):
+        if self.maintenance is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._last_maintenance and now - self._last_maintenance < JOB_MAINTENANCE_INTERVAL:
+                return
+            self._last_maintenance = now
+        try:
+            self.maintenance()
+        except Exception as e:
+            self.db.session.rollback()
+            print(f"Background job maintenance error: {e}")
+
+    def run_next(self):
+        """Claim and run one job; returns True if a job was run"""
+        job_id = self._claim()
+        if job_id is None:
+            return False
+        self._execute(job_id)
+        return True
+
+    def _claim(self):
+        db, Job = self.db, self.Job
+        now = datetime.utcnow()
+        claimable = or_(
+            Job.status == STATUS_QUEUED,
+            # Lease expired: the worker running it stopped reporting progress
+            (Job.status == STATUS_RUNNING) & (Job.updated_at < now - timedelta(seconds=JOB_LEASE_SECONDS))
+        )
+        candidates = db.session.query(Job.id).filter(
+            claimable, Job.kind.in_(list(self.handlers))
+        ).order_by(Job.created_at).limit(5).all()
+
+        for (job_id,) in candidates:
+            # Conditional update so concurrent workers never claim the same job
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, claimable)
+                .values(status=STATUS_RUNNING, started_at=now, updated_at=now, error=None)
+            )
+            if result.rowcount:
+                db.session.commit()
+                return job_id
+        db.session.commit()
+        return None
+
+    def progress(self, job_id, rows_done, rows_total=None):
+        """Record progress (also renews the job's lease)"""
+        values = {'rows_done': rows_done, 'updated_at': datetime.utcnow()}
+        if rows_total is not None:
+            values['rows_total'] = rows_total
+        with self.db.engine.begin() as connection:
+            connection.execute(update(self.Job).where(self.Job.id == job_id).values(**values))
+
+    def _execute(self, job_id):
+        db = self.db
+        job = db.session.get(self.Job, job_id)
+        handler = self.handlers[job.kind]
+        try:
+            result = handler(job, lambda done, total=None: self.progress(job_id, done, total)) or {}
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(self.Job, job_id)
+            job.status = STATUS_FAILED
+            job.error = str(e)[:2000]
+            job.finished_at = job.updated_at = datetime.utcnow()
+            db.session.commit()
+            print(f"❌ Background job {job_id} ({job.kind}) failed: {e}")
+            return
+
+        db.session.rollback()  # drop anything the handler left in the session
+        job = db.session.get(self.Job, job_id)
+        for field in FILE_FIELDS:
+            if field in result:
+                setattr(job, field, result.pop(field))
+        if 'rows_done' in result:
+            job.rows_done = result.pop('rows_done')
+        job.result = json.dumps(result) if result else None
+        job.status = STATUS_COMPLETED
+        job.finished_at = job.updated_at = datetime.utcnow()
+        db.session.commit()
+        print(f"✅ Background job {job_id} ({job.kind}) completed")
+
+
+if __name__ == '__main__':
+    # Dedicated worker process: JOB_WORKERS=0 on the web service,
+    # then run `python background_jobs.py` as a separate worker service.
+    from app import job_runner
+    job_runner.run_forever()
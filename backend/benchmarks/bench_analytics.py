@@ -0,0 +1,122 @@
+"""
+Analytics Benchmark
+Seeds a throwaway database with synthetic leads and reports query count
+and latency for the dashboard, funnel and quality analytics
+
+Usage:
+  python benchmarks/bench_analytics.py [--leads 1000000] [--runs 5] [--database-url URL]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SOURCES = ['website', 'facebook', 'google', 'affiliate', 'education-page']
+STATUSES = ['new', 'contacted', 'qualified', 'converted', 'rejected', 'hot']
+INVESTMENTS = ['0-249', '250-999', '1000-1499', '1500+', 'Not specified']
+DEVICES = ['desktop', 'mobile', 'tablet', None]
+CAMPAIGNS = [f'campaign-{i}' for i in range(40)] + [None]
+
+
+def seed_leads(db, Lead, count, chunk_size=20000):
+    """Bulk insert synthetic leads spread over the last 180 days"""
+    from sqlalchemy import insert
+
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    for start in range(0, count, chunk_size):
+        rows = []
+        for i in range(start, min(start + chunk_size, count)):
+            created_at = now - timedelta(seconds=rng.randint(0, 180 * 86400))
+            rows.append({
+                'first_name': 'Bench',
+                'last_name': f'Lead{i}',
+                'email': f'bench{i}@example.com',
+                'phone': f'+1555{i:07d}',
+                'investment': rng.choice(INVESTMENTS),
+                'source': rng.choice(SOURCES),
+                'status': rng.choice(STATUSES),
+                'utm_campaign': rng.choice(CAMPAIGNS),
+                'device_type': rng.choice(DEVICES),
+                'conversion_value': rng.choice([0.0, 0.0, 250.0, 1000.0]),
+                'quality_score': rng.randint(0, 100),
+                'created_at': created_at,
+                'updated_at': created_at
+            })
+        db.session.execute(insert(Lead), rows)
+        db.session.commit()
+        print(f"  seeded {min(start + chunk_size, count):,} / {count:,}", end='\r')
+    print()
+
+
+def measure(db, func, runs):
+    """Run func(db) several times; return (query count per call, latencies in ms)"""
+    from sqlalchemy import event
+
+    queries = []
+    listener = lambda *args: queries.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    latencies = []
+    try:
+        for _ in range(runs):
+            queries.clear()
+            started = time.perf_counter()
+            func()
+            latencies.append((time.perf_counter() - started) * 1000)
+            db.session.rollback()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return len(queries), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analytics queries')
+    parser.add_argument('--leads', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database-url', help='Existing empty database (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    workdir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        workdir = tempfile.mkdtemp(prefix='tradegpt-bench-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault('OUTBOX_WORKERS', '0')
+
+    from app import app, db, Lead
+    from analytics import get_dashboard_analytics, get_conversion_funnel, get_lead_quality_scores
+
+    with app.app_context():
+        db.create_all()
+        existing = Lead.query.count()
+        if existing < args.leads:
+            print(f"Seeding {args.leads - existing:,} leads into {os.environ['DATABASE_URL']}")
+            seed_leads(db, Lead, args.leads - existing)
+
+        print(f"\n📊 Analytics benchmark ({Lead.query.count():,} leads, {args.runs} runs)")
+        print("-" * 70)
+        print(f"{'function':<28} {'queries':>8} {'median ms':>12} {'min ms':>10} {'max ms':>10}")
+        for name, func in [
+            ('get_dashboard_analytics', lambda: get_dashboard_analytics(db, Lead)),
+            ('get_conversion_funnel', lambda: get_conversion_funnel(db, Lead)),
+            ('get_lead_quality_scores', lambda: get_lead_quality_scores(db, Lead)),
+        ]:
+            query_count, latencies = measure(db, func, args.runs)
+            print(f"{name:<28} {query_count:>8} {statistics.median(latencies):>12.1f} "
+                  f"{min(latencies):>10.1f} {max(latencies):>10.1f}")
+
+    if workdir:
+        print(f"\nBenchmark database kept at {workdir} (delete when done)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+CRM Throughput Benchmark
+Runs the app and the CRM emulator in-process, posts leads to POST /api/leads
+from concurrent clients and waits until every lead has reached every CRM.
+Reports intake rate, end-to-end delivery rate and delivery latency
+percentiles per CRM (time from the lead POST to its arrival at the CRM).
+
+Usage:
+  python benchmarks/bench_crm_throughput.py [--leads 2000] [--concurrency 16] [--workers 2]
+      [--crms hubspot,pipedrive,webhook,salesforce] [--crm-rate N]
+      [--latency-ms 50] [--jitter-ms 20] [--error-rate 0.01] [--throttle-rate 0] [--rate-limit 0]
+      [--timeout 300] [--database-url URL]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CRMS = ('hubspot', 'pipedrive', 'webhook', 'salesforce')
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def serve(app):
+    """Run a WSGI app on a free local port in a daemon thread; returns (server, base_url)"""
+    import logging
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def create_integrations(db, CRMIntegration, crms, emulator_url, crm_rate):
+    rate_limit = {'rate_limit': {'per_second': crm_rate, 'burst': max(1, crm_rate)}} if crm_rate is not None else {}
+    for name in crms:
+        integration = CRMIntegration(name=name, api_key='bench-key', api_secret='bench-secret', is_active=True)
+        settings = dict(rate_limit, base_url=emulator_url)
+        if name == 'salesforce':
+            settings['login_url'] = emulator_url
+        if name == 'webhook':
+            integration.webhook_url = f'{emulator_url}/webhook/bench'
+        integration.settings = json.dumps(settings)
+        db.session.add(integration)
+    db.session.commit()
+
+
+def post_leads(app_url, count, concurrency):
+    """POST count leads; returns ({email: submitted_at}, request latencies in ms, failures)"""
+    import requests
+
+    local = threading.local()
+    submitted = {}
+    latencies = []
+    failures = Counter()
+    run_id = int(time.time())
+
+    def post(i):
+        if not hasattr(local, 'http'):
+            local.http = requests.Session()
+        email = f'bench{run_id}.{i}@example.com'
+        payload = {
+            'firstName': 'Bench',
+            'lastName': f'Lead{i}',
+            'email': email,
+            'phone': f'+1555{i:07d}',
+            'investment': '$250-$999',
+            'source': 'benchmark'
+        }
+        started = time.time()
+        try:
+            response = local.http.post(f'{app_url}/api/leads', json=payload, timeout=30)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        finished = time.time()
+        if status in (200, 201):
+            submitted[email] = started
+            latencies.append((finished - started) * 1000)
+        else:
+            failures[status] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(post, range(count)))
+    return submitted, latencies, failures
+
+
+def wait_for_deliveries(emulator_url, submitted, crms, timeout):
+    """Poll the emulator until every lead reached every CRM (or timeout); returns arrivals"""
+    import requests
+
+    expected = len(submitted) * len(crms)
+    deadline = time.time() + timeout
+    while True:
+        arrivals = requests.get(f'{emulator_url}/_deliveries', timeout=30).json()
+        done = sum(1 for crm in crms for email in submitted if email in arrivals.get(crm, {}))
+        print(f"  delivered {done:,} / {expected:,}", end='\r')
+        if done >= expected or time.time() > deadline:
+            print()
+            return arrivals
+        time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark lead intake and CRM delivery throughput')
+    parser.add_argument('--leads', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent POST /api/leads clients')
+    parser.add_argument('--workers', type=int, default=2, help='outbox worker threads (OUTBOX_WORKERS)')
+    parser.add_argument('--crms', default='hubspot,pipedrive,webhook')
+    parser.add_argument('--crm-rate', type=float, default=None,
+                        help='rate governor per_second for every CRM (0 = unlimited; default: CRM defaults)')
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--jitter-ms', type=float, default=20.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='emulator requests/second per CRM')
+    parser.add_argument('--timeout', type=float, default=300.0, help='seconds to wait for deliveries')
+    parser.add_argument('--database-url', help='Existing empty database (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    crms = [crm.strip() for crm in args.crms.split(',') if crm.strip()]
+    unknown = set(crms) - set(CRMS)
+    if unknown:
+        parser.error(f"unknown CRM(s): {', '.join(sorted(unknown))}")
+
+    import crm_emulator
+    emulator_server, emulator_url = serve(crm_emulator.create_app(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit
+    ))
+
+    workdir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        workdir = tempfile.mkdtemp(prefix='tradegpt-bench-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['OUTBOX_WORKERS'] = str(args.workers)
+    os.environ.setdefault('JOB_WORKERS', '0')
+    # Retry injected faults within the run instead of minutes later
+    os.environ.setdefault('OUTBOX_BACKOFF_BASE', '0.5')
+    os.environ.setdefault('OUTBOX_BACKOFF_MAX', '5')
+    os.environ['HUBSPOT_API_BASE'] = emulator_url
+    os.environ['PIPEDRIVE_API_BASE'] = emulator_url
+
+    import app as app_module
+    from app import app, db, CRMIntegration, CRMOutbox, init_db
+    from outbox import get_outbox_stats
+
+    app_module.EMAIL_ENABLED = False  # no SMTP traffic in the measurement
+    init_db()
+    with app.app_context():
+        create_integrations(db, CRMIntegration, crms, emulator_url, args.crm_rate)
+    app_server, app_url = serve(app)
+
+    print(f"\n🚀 CRM throughput benchmark: {args.leads:,} leads -> {', '.join(crms)}")
+    print(f"   clients={args.concurrency} outbox workers={args.workers} latency={args.latency_ms}±{args.jitter_ms}ms "
+          f"errors={args.error_rate:.1%} throttled={args.throttle_rate:.1%} rate limit={args.rate_limit or 'none'}")
+    print("-" * 70)
+
+    started = time.time()
+    submitted, post_latencies, failures = post_leads(app_url, args.leads, args.concurrency)
+    intake_seconds = time.time() - started
+    arrivals = wait_for_deliveries(emulator_url, submitted, crms, args.timeout)
+    finished = time.time()
+
+    print(f"{'intake':<12} {len(submitted):>8,} leads in {intake_seconds:7.2f}s = "
+          f"{len(submitted) / intake_seconds:8.1f} leads/s   "
+          f"POST p50 {percentile(post_latencies, 0.5) or 0:.1f}ms p95 {percentile(post_latencies, 0.95) or 0:.1f}ms")
+    if failures:
+        print(f"{'':<12} failed POSTs: {dict(failures)}")
+
+    fully_delivered = [
+        max(arrivals[crm][email] for crm in crms)
+        for email in submitted
+        if all(email in arrivals.get(crm, {}) for crm in crms)
+    ]
+    if fully_delivered:
+        end_to_end = max(fully_delivered) - started
+        print(f"{'end-to-end':<12} {len(fully_delivered):>8,} leads in {end_to_end:7.2f}s = "
+              f"{len(fully_delivered) / end_to_end:8.1f} leads/s (every CRM)")
+
+    print(f"\n{'crm':<12} {'delivered':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for crm in crms:
+        latencies = [
+            (arrivals[crm][email] - submitted_at) * 1000
+            for email, submitted_at in submitted.items()
+            if email in arrivals.get(crm, {})
+        ]
+        row = [percentile(latencies, p) for p in (0.5, 0.95, 0.99)] + [max(latencies) if latencies else None]
+        print(f"{crm:<12} {len(latencies):>10,} " + ' '.join(
+            f"{value:>10.1f}" if value is not None else f"{'-':>10}" for value in row
+        ))
+    if not any(arrivals.get(crm) for crm in crms):
+        print("No deliveries arrived; check the outbox status below")
+
+    import requests
+    emulator_stats = requests.get(f'{emulator_url}/_stats', timeout=30).json()
+    print(f"\nemulator requests: {emulator_stats['requests']}")
+    with app.app_context():
+        print(f"outbox: {get_outbox_stats(db, CRMOutbox)['status']}")
+    print(f"total wall time {finished - started:.2f}s, "
+          f"mean intake POST {statistics.mean(post_latencies) if post_latencies else 0:.1f}ms")
+
+    app_server.shutdown()
+    emulator_server.shutdown()
+    if workdir:
+        print(f"\nBenchmark database kept at {workdir} (delete when done)")
+
+
+if __name__ == '__main__':
+    main()
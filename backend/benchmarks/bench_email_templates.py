@@ -0,0 +1,118 @@
+"""
+Email Template Benchmark
+Reports the cost per message of the three notification emails: rendering
+the compiled templates, building the MIME message from them, and (for
+comparison) building the same message with fresh MIMEText parts
+
+Usage:
+  python benchmarks/bench_email_templates.py [--messages 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+LEAD = {
+    'first_name': 'Jane',
+    'last_name': "O'Connor <VIP>",
+    'email': 'jane.oconnor@example.com',
+    'phone': '+15551234567',
+    'investment': '$1000-$1499',
+    'source': 'facebook',
+    'utm_campaign': 'spring-launch',
+    'device_type': 'mobile',
+    'notes': 'Prefers a call after 5 pm & weekends'
+}
+
+
+def per_message_us(func, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def mimetext_message(sender, to, subject, html_content, text_content):
+    """The per-message MIMEText tree the notifier used to build"""
+    message = MIMEMultipart('alternative')
+    message['Subject'] = subject
+    message['From'] = sender
+    message['To'] = to
+    if text_content:
+        message.attach(MIMEText(text_content, 'plain'))
+    message.attach(MIMEText(html_content, 'html'))
+    return message
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark notification email rendering')
+    parser.add_argument('--messages', type=int, default=20000)
+    args = parser.parse_args()
+
+    from email_notifications import EmailNotifier, lead_context
+    from email_templates import FRAGMENTS, TEMPLATES
+
+    notifier = EmailNotifier()
+    sent = []
+    notifier.dispatcher.submit = lambda message: sent.append(message) or True  # measure without SMTP
+    sender, admin = 'support@example.com', 'admin@example.com'
+    now = datetime.now()
+
+    new_lead = lead_context(LEAD)
+    new_lead.update(
+        utm_campaign=LEAD['utm_campaign'],
+        device_type=LEAD['device_type'],
+        submitted=now.strftime('%B %d, %Y at %I:%M %p'),
+        notes_block=FRAGMENTS['new_lead_notes'].render(LEAD)
+    )
+    status_change = dict(
+        lead_context(LEAD), old_status='new', new_status='qualified', changed=now.strftime('%B %d, %Y at %I:%M %p')
+    )
+    cases = [
+        ('new_lead', new_lead, admin,
+         lambda: notifier._send_new_lead(dict(LEAD, notified_at=datetime.now()))),
+        ('welcome', lead_context(LEAD), LEAD['email'],
+         lambda: notifier.send_welcome_email(LEAD)),
+        ('status_change', status_change, admin,
+         lambda: notifier._send_status_change((LEAD, 'new', 'qualified', datetime.now()))),
+    ]
+
+    print(f"\n✉️  Email template benchmark ({args.messages:,} messages per measurement, µs per message)")
+    print("-" * 78)
+    print(f"{'template':<15} {'render':>9} {'message':>9} {'MIMEText':>9} {'notifier':>9} {'serialize':>10} {'bytes':>7}")
+    for name, context, to, notify in cases:
+        template = TEMPLATES[name]
+        render = per_message_us(lambda: template.html.render_bytes(context), args.messages)
+        build = per_message_us(lambda: template.build_message(sender, to, context), args.messages)
+
+        subject = template.subject.render(context)
+        html_content = template.html.render(context)
+        text_content = template.text.render(context) if template.text else None
+        baseline = per_message_us(
+            lambda: mimetext_message(sender, to, subject, html_content, text_content), args.messages
+        )
+        full = per_message_us(notify, args.messages)
+        sent.clear()
+
+        message = template.build_message(sender, to, context)
+        serialize_count = max(1, args.messages // 10)
+        serialize = per_message_us(message.as_bytes, serialize_count)
+        print(f"{name:<15} {render:>9.1f} {build:>9.1f} {baseline:>9.1f} {full:>9.1f} {serialize:>10.1f} "
+              f"{len(message.as_bytes()):>7,}")
+
+    print("\nrender    = HTML body from the compiled template")
+    print("message   = subject + bodies + MIME tree with cached part headers")
+    print("MIMEText  = same rendered bodies packed with fresh MIMEText parts (previous approach)")
+    print("notifier  = EmailNotifier call up to the dispatcher queue")
+    print("serialize = message.as_bytes(), done later by the SMTP sender thread")
+
+
+if __name__ == '__main__':
+    main()
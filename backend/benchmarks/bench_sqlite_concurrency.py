@@ -0,0 +1,257 @@
+"""
+SQLite Concurrency Benchmark
+Runs the app on a fresh SQLite file behind a threaded server and sends
+POST /api/leads from parallel writers at a target rate (open loop: requests
+are scheduled at a fixed pace, not sent as fast as responses come back).
+Alongside, readers page through GET /api/leads and exporters download the
+seeded table as a slowly read CSV stream, which keeps a read transaction
+open the way a large admin export over a slow connection does. Reports the
+achieved rate, latency percentiles and every failure, counting "database
+is locked" errors separately. Exits 1 if any request failed or the rate
+fell short.
+
+--no-profile disables the SQLite connection profile (journal_mode,
+synchronous, busy_timeout, mmap_size, cache_size) to compare with SQLite's
+defaults.
+
+Usage:
+  python benchmarks/bench_sqlite_concurrency.py [--rps 50] [--duration 20] [--writers 16]
+      [--readers 2] [--exporters 1] [--seed 20000] [--no-profile]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SQLITE_PROFILE_SETTINGS = (
+    'SQLITE_JOURNAL_MODE', 'SQLITE_SYNCHRONOUS', 'SQLITE_BUSY_TIMEOUT_MS', 'SQLITE_MMAP_SIZE', 'SQLITE_CACHE_SIZE'
+)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = Counter()
+        self.locked = 0
+        self.late = 0
+        self.samples = []
+
+    def record(self, latency_ms, status, body, late):
+        with self.lock:
+            self.statuses[status] += 1
+            if status in (200, 201):
+                self.latencies.append(latency_ms)
+            elif 'database is locked' in body:
+                self.locked += 1
+            if late:
+                self.late += 1
+            if status not in (200, 201) and len(self.samples) < 5:
+                self.samples.append(f'{status}: {body[:160]}')
+
+
+def run_writers(app_url, rps, duration, writers, results):
+    """Open-loop load: request i is due at start + i / rps, whichever writer is free sends it"""
+    import requests
+
+    total = int(rps * duration)
+    next_index = iter(range(total))
+    index_lock = threading.Lock()
+    run_id = int(time.time())
+    started = time.perf_counter() + 0.2
+
+    def writer():
+        http = requests.Session()
+        while True:
+            with index_lock:
+                i = next(next_index, None)
+            if i is None:
+                return
+            due = started + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            payload = {
+                'firstName': 'Load',
+                'lastName': f'Writer{i}',
+                'email': f'sqlite{run_id}.{i}@example.com',
+                'phone': f'+1555{i:07d}',
+                'investment': '$250-$999',
+                'source': 'benchmark'
+            }
+            sent = time.perf_counter()
+            try:
+                response = http.post(f'{app_url}/api/leads', json=payload, timeout=60)
+                status, body = response.status_code, response.text
+            except Exception as e:
+                status, body = type(e).__name__, str(e)
+            results.record((time.perf_counter() - sent) * 1000, status, body, late=sent - due > 0.25)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return total, time.perf_counter() - started
+
+
+def seed_leads(db, Lead, count, batch=5000):
+    from sqlalchemy import insert
+
+    for start in range(0, count, batch):
+        db.session.execute(insert(Lead), [
+            {
+                'first_name': 'Seed',
+                'last_name': f'Lead{i}',
+                'email': f'seed.{i}@example.com',
+                'phone': f'+1444{i:07d}',
+                'investment': '$1000-$1499',
+                'source': 'seed',
+                'status': 'new',
+                'notes': 'Seeded for the SQLite concurrency benchmark'
+            }
+            for i in range(start, min(count, start + batch))
+        ])
+        db.session.commit()
+
+
+def run_readers(app_url, readers, exporters, stop, results):
+    """
+    Admin traffic while the writers run: readers page through leads,
+    exporters read a CSV export at ~256 KB/s (the cursor stays open meanwhile)
+    """
+    import requests
+
+    def session():
+        http = requests.Session()
+        http.post(f'{app_url}/api/login', json={'username': 'tradeadmin', 'password': 'adm1234'}, timeout=30)
+        return http
+
+    def reader():
+        http = session()
+        while not stop.is_set():
+            sent = time.perf_counter()
+            try:
+                response = http.get(f'{app_url}/api/leads?per_page=50', timeout=60)
+                status, body = response.status_code, response.text
+            except Exception as e:
+                status, body = type(e).__name__, str(e)
+            results.record((time.perf_counter() - sent) * 1000, status, body, late=False)
+            time.sleep(0.05)
+
+    def exporter():
+        http = session()
+        while not stop.is_set():
+            sent = time.perf_counter()
+            try:
+                with http.get(f'{app_url}/api/export/csv', stream=True, timeout=60) as response:
+                    status, body = response.status_code, ''
+                    for _ in response.iter_content(16 * 1024):
+                        time.sleep(1 / 16)
+                        if stop.is_set():
+                            break
+            except Exception as e:
+                status, body = type(e).__name__, str(e)
+            results.record((time.perf_counter() - sent) * 1000, status, body, late=False)
+
+    threads = [threading.Thread(target=reader, daemon=True) for _ in range(readers)]
+    threads += [threading.Thread(target=exporter, daemon=True) for _ in range(exporters)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent lead writes on SQLite')
+    parser.add_argument('--rps', type=float, default=50.0, help='target POST /api/leads per second')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds of load')
+    parser.add_argument('--writers', type=int, default=16, help='concurrent writer clients')
+    parser.add_argument('--readers', type=int, default=2, help='concurrent GET /api/leads clients')
+    parser.add_argument('--exporters', type=int, default=1, help='concurrent slow CSV export downloads')
+    parser.add_argument('--seed', type=int, default=20000, help='leads in the table before the run')
+    parser.add_argument('--no-profile', action='store_true', help="use SQLite's defaults (no connection profile)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tradegpt-sqlite-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault('OUTBOX_WORKERS', '0')
+    os.environ.setdefault('JOB_WORKERS', '0')
+    # One request thread per client, as the pool is sized from WEB_THREADS
+    os.environ.setdefault('WEB_THREADS', str(args.writers + args.readers + args.exporters))
+    if args.no_profile:
+        for name in SQLITE_PROFILE_SETTINGS:
+            os.environ[name] = ''
+
+    import app as app_module
+    from app import app, db, db_pool_metrics, init_db, Lead
+    from db_pool import pool_stats, sqlite_profile
+    from bench_crm_throughput import serve
+
+    app_module.EMAIL_ENABLED = False  # no SMTP traffic in the measurement
+    init_db()
+    with app.app_context():
+        seed_leads(db, Lead, args.seed)
+    server, app_url = serve(app)
+
+    profile = sqlite_profile()
+    print(f"\n🗃️  SQLite concurrency benchmark: {args.rps:g} writes/s for {args.duration:g}s, "
+          f"{args.writers} writers, {args.readers} readers, {args.exporters} exporters, {args.seed:,} seeded leads")
+    print(f"   profile: {', '.join(f'{k}={v}' for k, v in profile.items()) or 'SQLite defaults'}")
+    print("-" * 70)
+
+    results, reads = Results(), Results()
+    stop = threading.Event()
+    reader_threads = run_readers(app_url, args.readers, args.exporters, stop, reads)
+    total, elapsed = run_writers(app_url, args.rps, args.duration, args.writers, results)
+    stop.set()
+    for thread in reader_threads:
+        thread.join(timeout=60)
+
+    writes = sum(results.statuses[s] for s in (200, 201))
+    failures = sum(
+        count for outcome in (results, reads) for status, count in outcome.statuses.items() if status not in (200, 201)
+    )
+    latencies = results.latencies
+    print(f"{'writes':<12} {writes:>8,} / {total:,} in {elapsed:6.2f}s = {writes / elapsed:8.1f}/s "
+          f"(target {args.rps:g}/s, {results.late:,} sent >250ms late)")
+    print(f"{'latency':<12} p50 {percentile(latencies, 0.5):.1f}ms  p95 {percentile(latencies, 0.95):.1f}ms  "
+          f"p99 {percentile(latencies, 0.99):.1f}ms  max {max(latencies, default=0):.1f}ms  "
+          f"mean {statistics.mean(latencies) if latencies else 0:.1f}ms")
+    print(f"{'reads':<12} {sum(reads.statuses.values()):>8,} lead pages and exports, "
+          f"p95 {percentile(reads.latencies, 0.95):.1f}ms")
+    print(f"{'statuses':<12} writes {dict(results.statuses)}, reads {dict(reads.statuses)}")
+    print(f"{'lock errors':<12} {results.locked + reads.locked:,}")
+    for sample in results.samples + reads.samples:
+        print(f"  {sample}")
+    with app.app_context():
+        stats = pool_stats(db.engine, db_pool_metrics)
+    print(f"{'pool':<12} checkouts {stats['checkouts']:,}, timeouts {stats['timeouts']}, "
+          f"wait p95 {stats['wait_ms']['p95']}ms, max {stats['wait_ms']['max']}ms")
+
+    server.shutdown()
+    print(f"\nBenchmark database kept at {workdir} (delete when done)")
+    if failures or writes / elapsed < args.rps * 0.95:
+        print("❌ Failed requests or target rate not reached")
+        return 1
+    print(f"✅ Zero lock errors at {args.rps:g} writes/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
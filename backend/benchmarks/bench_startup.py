@@ -0,0 +1,157 @@
+"""
+Startup Benchmark
+Cold start report for a fresh process: where `import app` spends its time
+(from python -X importtime, aggregated per module imported by app.py) and
+the time to first response, measured from process spawn until the first
+request has been answered by the Flask test client. The database is
+bootstrapped beforehand, as the release phase does on a deploy.
+
+With --check it exits non-zero if the median time to first response is
+over the budget, or if a lazily loaded subsystem (CRM HTTP, email,
+exports) was imported before it was needed. backend/tests/test_startup.py
+runs the same checks under pytest.
+
+Usage:
+  python benchmarks/bench_startup.py [--runs 5] [--path /] [--top 15]
+      [--check] [--budget-ms 1500] [--database-url URL]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Must not be imported by `import app` or by a request that does not use them
+LAZY_MODULES = (
+    'requests', 'urllib3', 'smtplib', 'email_notifications', 'email_templates', 'exports', 'xlsx_writer'
+)
+
+FIRST_RESPONSE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+answered_at = time.time()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'request_ms': (time.perf_counter() - imported) * 1000,
+    'answered_at': answered_at,
+    'status': response.status_code,
+    'eager': [name for name in sys.argv[2].split(',') if name in sys.modules]
+}))
+"""
+
+
+def child_env(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, OUTBOX_WORKERS='0', JOB_WORKERS='0')
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    return env
+
+
+def bootstrap(env):
+    """Create the schema first, as the release phase does, so startup does not pay for it"""
+    subprocess.run(
+        [sys.executable, 'bootstrap.py'], cwd=BACKEND_DIR, env=env, capture_output=True, check=True
+    )
+
+
+def import_profile(env):
+    """(total ms of `import app`, [(module, self ms, cumulative ms)] imported directly by app.py)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    # Lines are printed after each import finishes, children before their parent;
+    # the name is indented by 2 spaces per nesting level
+    children, modules, total = [], [], None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        entry = (name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000)
+        if level == 1:
+            children.append(entry)
+        elif level == 0:
+            if entry[0] == 'app':
+                modules, total = children, entry[2]
+            children = []
+    return total, sorted(modules, key=lambda m: m[2], reverse=True)
+
+
+def first_response(env, path):
+    started_at = time.time()
+    result = subprocess.run(
+        [sys.executable, '-c', FIRST_RESPONSE, path, ','.join(LAZY_MODULES)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    sample['total_ms'] = (sample.pop('answered_at') - started_at) * 1000
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report cold start import time and time to first response')
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes to time')
+    parser.add_argument('--path', default='/', help='first request (GET)')
+    parser.add_argument('--top', type=int, default=15, help='modules to list in the import profile')
+    parser.add_argument('--check', action='store_true', help='exit 1 if over budget or a lazy module was imported')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 1500)),
+                        help='time to first response budget for --check (default: STARTUP_BUDGET_MS or 1500)')
+    parser.add_argument('--database-url', help='Existing database (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    workdir = None
+    database_url = args.database_url
+    if not database_url:
+        workdir = tempfile.mkdtemp(prefix='tradegpt-startup-')
+        database_url = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    env = child_env(database_url)
+    bootstrap(env)
+
+    total, modules = import_profile(env)
+    print(f"\n🚀 Startup report (import app: {total:.1f}ms)")
+    print("-" * 60)
+    print(f"{'module imported by app.py':<34} {'self ms':>10} {'total ms':>12}")
+    for name, self_ms, cumulative_ms in modules[:args.top]:
+        print(f"{name:<34} {self_ms:>10.1f} {cumulative_ms:>12.1f}")
+    print(f"{'app (own module body)':<34} {total - sum(m[2] for m in modules):>10.1f}")
+
+    samples = [first_response(env, args.path) for _ in range(args.runs)]
+    print(f"\n{'GET ' + args.path:<20} {'median':>10} {'max':>10}   ({args.runs} fresh processes, "
+          f"status {samples[0]['status']})")
+    for key, label in (('import_ms', 'import app'), ('request_ms', 'first request'),
+                       ('total_ms', 'spawn -> response')):
+        values = [sample[key] for sample in samples]
+        print(f"{label:<20} {statistics.median(values):>8.1f}ms {max(values):>8.1f}ms")
+
+    eager = sorted({name for sample in samples for name in sample['eager']})
+    print(f"\nlazy modules loaded by startup: {', '.join(eager) or 'none'}")
+    if workdir:
+        print(f"Startup database kept at {workdir} (delete when done)")
+
+    if args.check:
+        median = statistics.median(sample['total_ms'] for sample in samples)
+        failures = []
+        if median > args.budget_ms:
+            failures.append(f"time to first response {median:.1f}ms is over the {args.budget_ms:.0f}ms budget")
+        if eager:
+            failures.append(f"imported at startup: {', '.join(eager)}")
+        for failure in failures:
+            print(f"❌ {failure}")
+        if failures:
+            return 1
+        print(f"✅ Time to first response {median:.1f}ms is within the {args.budget_ms:.0f}ms budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""
+Database Bootstrap
+Creates or upgrades the schema and the default admin once per deploy, so
+web workers never do it on a request. When the database is already at the
+current schema version this is a single query.
+
+Usage:
+  python bootstrap.py [--force]
+"""
+
+import argparse
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap the database schema')
+    parser.add_argument('--force', action='store_true', help='run every step even if the schema version is current')
+    args = parser.parse_args()
+
+    from app import bootstrap_database
+    try:
+        bootstrap_database(force=args.force)
+    except Exception as e:
+        print(f"❌ Database bootstrap failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+CRM Emulator
+Local stand-in for the CRM APIs the outbox delivers to, for development,
+testing and load tests without real accounts:
+
+    POST /contacts/v1/contact                            HubSpot contact
+    POST /crm/v3/objects/contacts/batch/upsert           HubSpot batch upsert
+    POST /v1/persons                                     Pipedrive person
+    POST /services/oauth2/token                          Salesforce OAuth
+    POST /services/data/<version>/composite/sobjects     Salesforce sObject Collections
+    PATCH /services/data/<version>/composite/sobjects/<sobject>/<field>
+                                                         Salesforce upsert on an External ID field
+    POST /webhook[/<name>]                               generic webhook
+    GET  /_stats                                         request, fault and record counters
+    GET  /_deliveries                                    first arrival time per service and email
+    POST /_config                                        change fault injection at runtime
+    POST /_reset                                         clear counters and records
+
+Faults (flags or /_config): latency with jitter, a 5xx error rate, a
+random 429 rate and a per-service requests-per-second limit answered with
+429 + Retry-After and X-RateLimit-* headers.
+
+Run:  python crm_emulator.py --port 5055 --latency-ms 80 --error-rate 0.01 --rate-limit 50
+Then set HUBSPOT_API_BASE / PIPEDRIVE_API_BASE (or settings.base_url) to
+http://127.0.0.1:5055, Salesforce settings.login_url to the same, and
+webhook_url to http://127.0.0.1:5055/webhook.
+"""
+
+import argparse
+import math
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+
+from flask import Flask, jsonify, request
+
+SALESFORCE_COLLECTION_SIZE = 200
+HUBSPOT_BATCH_SIZE = 100
+
+DEFAULT_CONFIG = {
+    'latency_ms': 0.0,
+    'jitter_ms': 0.0,
+    'error_rate': 0.0,
+    'throttle_rate': 0.0,
+    'rate_limit': 0.0,     # requests per second per service (0 = unlimited)
+    'retry_after': 1.0,    # seconds, for injected 429s
+    'token_ttl': None      # seconds before Salesforce tokens expire (None = never)
+}
+
+
+def service_for(path):
+    if path.startswith('/services/'):
+        return 'salesforce'
+    if path.startswith(('/contacts/', '/crm/')):
+        return 'hubspot'
+    if path.startswith('/v1/persons'):
+        return 'pipedrive'
+    if path.startswith('/webhook'):
+        return 'webhook'
+    return None
+
+
+class EmulatorState:
+    def __init__(self, **config):
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update({k: v for k, v in config.items() if v is not None})
+        self.lock = threading.Lock()
+        self.rng = random.Random()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.tokens = {}
+            self.counters = Counter()
+            self.records = Counter()
+            self.external_ids = {}  # (sobject, field, value) -> Salesforce id
+            self.deliveries = {}
+            self.windows = {}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def deliver(self, service, emails):
+        """Record the first arrival of each email at service"""
+        now = time.time()
+        with self.lock:
+            arrivals = self.deliveries.setdefault(service, {})
+            for email in emails:
+                if email:
+                    arrivals.setdefault(str(email).lower(), now)
+                    self.records[service] += 1
+
+    def take_slot(self, service):
+        """Fixed one-second window per service; returns (allowed, remaining, reset_seconds)"""
+        limit = self.config['rate_limit']
+        if not limit:
+            return True, None, None
+        now = time.monotonic()
+        with self.lock:
+            window, used = self.windows.get(service, (math.floor(now), 0))
+            if window != math.floor(now):
+                window, used = math.floor(now), 0
+            reset = round(window + 1 - now, 3)
+            if used >= limit:
+                return False, 0, reset
+            self.windows[service] = (window, used + 1)
+            return True, int(limit - used - 1), reset
+
+
+def create_app(**config):
+    """Keyword arguments override DEFAULT_CONFIG"""
+    app = Flask(__name__)
+    state = EmulatorState(**config)
+    app.config['EMULATOR_STATE'] = state
+
+    def salesforce_error(status, error_code, message):
+        return jsonify([{'errorCode': error_code, 'message': message}]), status
+
+    def valid_bearer():
+        token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        issued_at = state.tokens.get(token)
+        if issued_at is None:
+            return False
+        ttl = state.config['token_ttl']
+        return ttl is None or time.monotonic() - issued_at < ttl
+
+    @app.before_request
+    def inject_faults():
+        service = service_for(request.path)
+        if service is None or request.path.endswith('/oauth2/token'):
+            return None
+        config = state.config
+        state.count(f'{service}_requests')
+
+        delay = config['latency_ms'] + state.rng.uniform(-1, 1) * config['jitter_ms']
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        allowed, remaining, reset = state.take_slot(service)
+        request.environ['emulator.rate'] = (remaining, reset)
+        if not allowed:
+            state.count(f'{service}_429')
+            return jsonify({'message': 'Rate limit exceeded'}), 429, {
+                'Retry-After': str(max(1, math.ceil(reset))),
+                'X-RateLimit-Remaining': '0',
+                'X-RateLimit-Reset': str(reset)
+            }
+        if state.rng.random() < config['throttle_rate']:
+            state.count(f'{service}_429')
+            return jsonify({'message': 'Too many requests'}), 429, {'Retry-After': str(config['retry_after'])}
+        if state.rng.random() < config['error_rate']:
+            state.count(f'{service}_5xx')
+            return jsonify({'message': 'Injected server error'}), 503
+        return None
+
+    @app.after_request
+    def rate_headers(response):
+        remaining, reset = request.environ.get('emulator.rate', (None, None))
+        if remaining is not None and response.status_code != 429:
+            response.headers['X-RateLimit-Remaining'] = str(remaining)
+            response.headers['X-RateLimit-Reset'] = str(reset)
+        return response
+
+    # HubSpot
+    @app.post('/contacts/v1/contact')
+    def hubspot_contact():
+        body = request.get_json(silent=True) or {}
+        properties = {p.get('property'): p.get('value') for p in body.get('properties') or []}
+        if not properties.get('email'):
+            return jsonify({'status': 'error', 'message': 'Property "email" is required'}), 400
+        state.deliver('hubspot', [properties['email']])
+        return jsonify({'vid': state.rng.randint(1, 10 ** 9), 'is-new': True})
+
+    @app.post('/crm/v3/objects/contacts/batch/upsert')
+    def hubspot_batch_upsert():
+        inputs = (request.get_json(silent=True) or {}).get('inputs') or []
+        if len(inputs) > HUBSPOT_BATCH_SIZE:
+            return jsonify({'status': 'error', 'message': f'Batch size limit is {HUBSPOT_BATCH_SIZE}'}), 400
+        results, errors = [], []
+        for item in inputs:
+            email = item.get('id') or (item.get('properties') or {}).get('email')
+            if not email or 'invalid' in email:
+                errors.append({
+                    'status': 'error',
+                    'category': 'VALIDATION_ERROR',
+                    'message': f'Email address {email} is invalid',
+                    'context': {'ids': [email]}
+                })
+                continue
+            state.deliver('hubspot', [email])
+            results.append({
+                'id': str(state.rng.randint(1, 10 ** 9)),
+                'properties': dict(item.get('properties') or {}, email=email),
+                'new': True
+            })
+        body = {'status': 'COMPLETE', 'results': results}
+        if errors:
+            body.update(errors=errors, numErrors=len(errors))
+            return jsonify(body), 207
+        return jsonify(body)
+
+    # Pipedrive
+    @app.post('/v1/persons')
+    def pipedrive_person():
+        if not request.args.get('api_token'):
+            return jsonify({'success': False, 'error': 'You need to be authorized to make this request.'}), 401
+        body = request.get_json(silent=True) or {}
+        if not body.get('name'):
+            return jsonify({'success': False, 'error': 'Name must be given.'}), 400
+        emails = body.get('email') or []
+        state.deliver('pipedrive', emails if isinstance(emails, list) else [emails])
+        return jsonify({'success': True, 'data': {'id': state.rng.randint(1, 10 ** 9), 'name': body['name']}}), 201
+
+    # Generic webhook
+    @app.post('/webhook')
+    @app.post('/webhook/<path:name>')
+    def webhook(name=None):
+        body = request.get_json(silent=True)
+        items = body if isinstance(body, list) else (body or {}).get('leads') or [body or {}]
+        state.deliver('webhook', [item.get('email') for item in items if isinstance(item, dict)])
+        return jsonify({'status': 'ok'})
+
+    # Salesforce
+    @app.post('/services/oauth2/token')
+    def salesforce_token():
+        state.count('salesforce_token')
+        form = request.form
+        if form.get('grant_type') not in ('client_credentials', 'password'):
+            return jsonify({'error': 'unsupported_grant_type', 'error_description': 'grant type not supported'}), 400
+        if not form.get('client_id') or not form.get('client_secret'):
+            return jsonify({'error': 'invalid_client', 'error_description': 'invalid client credentials'}), 400
+        token = secrets.token_urlsafe(24)
+        with state.lock:
+            state.tokens[token] = time.monotonic()
+        return jsonify({
+            'access_token': token,
+            'instance_url': request.host_url.rstrip('/'),
+            'token_type': 'Bearer',
+            'issued_at': str(int(time.time() * 1000))
+        })
+
+    def salesforce_record_error(record):
+        missing = [f for f in ('LastName', 'Company') if not record.get(f)]
+        if missing:
+            return {'success': False, 'errors': [{
+                'statusCode': 'REQUIRED_FIELD_MISSING',
+                'message': f"Required fields are missing: {missing}",
+                'fields': missing
+            }]}
+        if 'invalid' in (record.get('Email') or ''):
+            return {'success': False, 'errors': [{
+                'statusCode': 'INVALID_EMAIL_ADDRESS',
+                'message': f"Email: invalid email address: {record['Email']}",
+                'fields': ['Email']
+            }]}
+        return None
+
+    def salesforce_records():
+        """(records, error response) for an sObject Collections request"""
+        if not valid_bearer():
+            state.count('salesforce_401')
+            return None, salesforce_error(401, 'INVALID_SESSION_ID', 'Session expired or invalid')
+        records = (request.get_json(silent=True) or {}).get('records') or []
+        if len(records) > SALESFORCE_COLLECTION_SIZE:
+            return None, salesforce_error(400, 'EXCEEDED_ID_LIMIT', f'record limit is {SALESFORCE_COLLECTION_SIZE}')
+        return records, None
+
+    @app.post('/services/data/<version>/composite/sobjects')
+    def salesforce_collections(version):
+        records, error = salesforce_records()
+        if error:
+            return error
+
+        results = []
+        for record in records:
+            failure = salesforce_record_error(record)
+            if failure:
+                results.append(failure)
+            else:
+                state.deliver('salesforce', [record.get('Email')])
+                results.append({'success': True, 'id': '00Q' + secrets.token_hex(6).upper(), 'errors': []})
+        return jsonify(results)
+
+    @app.patch('/services/data/<version>/composite/sobjects/<sobject>/<field>')
+    def salesforce_upsert(version, sobject, field):
+        records, error = salesforce_records()
+        if error:
+            return error
+
+        results = []
+        for record in records:
+            failure = salesforce_record_error(record)
+            if failure:
+                results.append(failure)
+                continue
+            if not record.get(field):
+                results.append({'success': False, 'errors': [{
+                    'statusCode': 'MISSING_ARGUMENT',
+                    'message': f'{field} not specified',
+                    'fields': [field]
+                }]})
+                continue
+            key = (sobject, field, str(record[field]))
+            with state.lock:
+                created = key not in state.external_ids
+                record_id = state.external_ids.setdefault(key, '00Q' + secrets.token_hex(6).upper())
+            if created:
+                state.deliver('salesforce', [record.get('Email')])
+            else:
+                state.count('salesforce_updates')
+            results.append({'success': True, 'id': record_id, 'created': created, 'errors': []})
+        return jsonify(results)
+
+    # Control endpoints
+    @app.get('/_stats')
+    def stats():
+        with state.lock:
+            return jsonify({
+                'requests': dict(state.counters),
+                'records': dict(state.records),
+                'config': state.config
+            })
+
+    @app.get('/_deliveries')
+    def deliveries():
+        with state.lock:
+            return jsonify({service: dict(arrivals) for service, arrivals in state.deliveries.items()})
+
+    @app.post('/_config')
+    def configure():
+        updates = {k: v for k, v in (request.get_json(silent=True) or {}).items() if k in DEFAULT_CONFIG}
+        with state.lock:
+            state.config.update(updates)
+        return jsonify(state.config)
+
+    @app.post('/_reset')
+    def reset():
+        state.reset()
+        return jsonify({'status': 'reset'})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local CRM and webhook emulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='added latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='+/- random latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='requests per second per service (0 = unlimited)')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds for injected 429s')
+    parser.add_argument('--token-ttl', type=float, default=None,
+                        help='seconds before Salesforce tokens expire (default: never)')
+    args = parser.parse_args()
+
+    app = create_app(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        token_ttl=args.token_ttl
+    )
+    print(f"🧪 CRM emulator listening on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Database Connection Pool
+Engine options per dialect from environment configuration, and a QueuePool
+that records checkout wait times so pool pressure can be read from the
+admin metrics endpoint.
+
+Each web worker process has its own pool. By default it holds one
+connection per thread that uses the database (web threads, outbox workers,
+job workers), with the same number again as overflow for bursts.
+DB_MAX_CONNECTIONS caps the total for the whole service, split across
+WEB_CONCURRENCY worker processes, to stay under the server's limit.
+
+SQLite connections get a tuning profile when they are opened: WAL journal
+(readers no longer block the writer), synchronous=NORMAL, a busy timeout so
+concurrent writers queue instead of failing with "database is locked", and
+larger mmap and page caches. PostgreSQL connections get a lock_timeout
+(DB_LOCK_TIMEOUT_MS), so no write waits for a lock indefinitely.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+DB_POOL_SIZE = os.getenv('DB_POOL_SIZE')                  # default: database threads per process
+DB_MAX_OVERFLOW = os.getenv('DB_MAX_OVERFLOW')            # default: DB_POOL_SIZE
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+# Server-side idle timeouts (and Render maintenance) drop connections; recycle well before that
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING')          # default: true except for SQLite
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 0))  # whole service, 0 = no cap
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+WEB_THREADS = int(os.getenv('WEB_THREADS', 1))
+DB_POOL_WAIT_WINDOW = int(os.getenv('DB_POOL_WAIT_WINDOW', 1000))
+# PostgreSQL: longest a statement waits for a lock before failing (0 = no limit);
+# bounds how late a write commits after stamping updated_at (see sync_feed.safety_lag)
+DB_LOCK_TIMEOUT_MS = int(os.getenv('DB_LOCK_TIMEOUT_MS', 10000))
+
+# SQLite profile, applied to every new connection (empty = keep SQLite's default)
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = os.getenv('SQLITE_BUSY_TIMEOUT_MS', '10000')
+SQLITE_MMAP_SIZE = os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = os.getenv('SQLITE_CACHE_SIZE', '-65536')  # negative = KiB, so 64 MiB
+
+
+def _is_memory_sqlite(database_url):
+    return database_url in ('sqlite://', 'sqlite:///') or (
+        database_url.startswith('sqlite') and ':memory:' in database_url
+    )
+
+
+def _flag(value, default):
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def pool_sizing(threads, max_connections=DB_MAX_CONNECTIONS, processes=WEB_CONCURRENCY):
+    """(pool_size, max_overflow) for one process running threads database threads"""
+    pool_size = int(DB_POOL_SIZE) if DB_POOL_SIZE else max(1, threads)
+    max_overflow = int(DB_MAX_OVERFLOW) if DB_MAX_OVERFLOW else pool_size
+    if max_connections:
+        per_process = max(1, max_connections // max(1, processes))
+        pool_size = min(pool_size, per_process)
+        max_overflow = max(0, min(max_overflow, per_process - pool_size))
+        if per_process < threads:
+            print(f"⚠️  DB_MAX_CONNECTIONS={max_connections} leaves {per_process} connections per process "
+                  f"for {threads} database threads; expect checkout waits")
+    return pool_size, max_overflow
+
+
+def engine_options(database_url, metrics, background_threads=0):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for database_url, sized for WEB_THREADS request
+    threads plus background_threads; checkouts are recorded in metrics
+    """
+    is_sqlite = database_url.startswith('sqlite')
+    if _is_memory_sqlite(database_url):
+        return {}  # one shared in-memory connection (Flask-SQLAlchemy uses StaticPool)
+
+    pool_size, max_overflow = pool_sizing(WEB_THREADS + background_threads)
+    options = {
+        'poolclass': instrumented_pool_class(metrics),
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': _flag(DB_POOL_PRE_PING, default=not is_sqlite)
+    }
+    if not is_sqlite:
+        options.update(
+            pool_recycle=DB_POOL_RECYCLE,
+            # Reuse the most recent connection so surplus ones sit idle and get recycled
+            pool_use_lifo=True
+        )
+    if database_url.startswith('postgresql') and DB_LOCK_TIMEOUT_MS:
+        options['connect_args'] = {'options': f'-c lock_timeout={DB_LOCK_TIMEOUT_MS}'}
+    metrics.settings = {
+        key.removeprefix('pool_'): value for key, value in options.items() if key != 'poolclass'
+    }
+    return options
+
+
+class PoolMetrics:
+    """Checkout counters and a sliding window of checkout wait times"""
+
+    def __init__(self, window=DB_POOL_WAIT_WINDOW):
+        self.settings = {}
+        self._waits = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.counters = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'connects': 0,
+            'invalidations': 0
+        }
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, seconds):
+        with self._lock:
+            self.counters['checkouts'] += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._waits.append(seconds)
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts = self.counters['checkouts']
+            return dict(
+                self.counters,
+                settings=self.settings,
+                wait_ms={
+                    'mean': round(self.total_wait / checkouts * 1000, 3) if checkouts else 0,
+                    'p50': round(waits[len(waits) // 2] * 1000, 3) if waits else 0,
+                    'p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 3) if waits else 0,
+                    'max': round(self.max_wait * 1000, 3),
+                    'window': len(waits)
+                }
+            )
+
+
+def instrumented_pool_class(metrics):
+    """
+    QueuePool subclass timing connect(): the wait for a free connection,
+    opening a new one and the pre-ping. engine.dispose() recreates the
+    same class, so the metrics survive it.
+    """
+
+    class InstrumentedQueuePool(QueuePool):
+        pool_metrics = metrics
+
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                self.pool_metrics.count('timeouts')
+                raise
+            self.pool_metrics.record_checkout(time.perf_counter() - started)
+            return connection
+
+    return InstrumentedQueuePool
+
+
+def install_pool_events(engine, metrics):
+    """Count new and invalidated (e.g. failed pre-ping) connections"""
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        metrics.count('connects')
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.count('invalidations')
+
+
+def sqlite_profile():
+    """PRAGMA name -> value for new SQLite connections, in the order they are set"""
+    pragmas = (
+        ('journal_mode', SQLITE_JOURNAL_MODE),
+        ('synchronous', SQLITE_SYNCHRONOUS),
+        ('busy_timeout', SQLITE_BUSY_TIMEOUT_MS),
+        ('mmap_size', SQLITE_MMAP_SIZE),
+        ('cache_size', SQLITE_CACHE_SIZE)
+    )
+    return {name: value for name, value in pragmas if value}
+
+
+def install_sqlite_profile(engine, metrics):
+    """Apply sqlite_profile() on connect; no-op for other databases and in-memory SQLite"""
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+    pragmas = sqlite_profile()
+    metrics.settings['sqlite'] = pragmas
+
+    @event.listens_for(engine, 'connect')
+    def apply_profile(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+                # journal_mode answers with the mode in effect (WAL needs a local filesystem)
+                if name == 'journal_mode' and cursor.fetchone()[0].lower() != value.lower():
+                    print(f"⚠️  SQLite journal_mode={value} is not available for {engine.url.database}")
+        finally:
+            cursor.close()
+
+
+def max_lock_wait(database_url):
+    """
+    Seconds a write can wait for locks before it fails, as configured for
+    database_url; None when there is no limit
+    """
+    if _is_memory_sqlite(database_url):
+        return 0.0  # a single shared connection never waits
+    if database_url.startswith('sqlite'):
+        # pysqlite waits 5 s when no busy_timeout is set
+        busy = int(SQLITE_BUSY_TIMEOUT_MS) / 1000 if SQLITE_BUSY_TIMEOUT_MS else 5.0
+        # Outside WAL the commit can wait for readers again
+        return busy if SQLITE_JOURNAL_MODE.upper() == 'WAL' else busy * 2
+    if database_url.startswith('postgresql'):
+        return DB_LOCK_TIMEOUT_MS / 1000 if DB_LOCK_TIMEOUT_MS else None
+    return None
+
+
+def pool_stats(engine, metrics):
+    """Current pool occupancy plus checkout metrics, for this process"""
+    pool = engine.pool
+    stats = {
+        'pid': os.getpid(),
+        'dialect': engine.dialect.name,
+        'pool_class': type(pool).__name__
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # overflow() counts up from -pool_size; positive once connections beyond pool_size are open
+            overflow=max(0, pool.overflow())
+        )
+    stats.update(metrics.stats())
+    return stats
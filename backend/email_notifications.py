@@ -4,10 +4,299 @@ Sends automated emails to admin and leads
 """
 
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from collections import deque
+import atexit
 import os
+import queue
+import threading
+import time
+
+from email_templates import FRAGMENTS, TEMPLATES, build_message
+
+# Dispatcher configuration - Set these in environment variables
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 2))
+SMTP_QUEUE_SIZE = int(os.getenv('SMTP_QUEUE_SIZE', 10000))
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 30))
+SMTP_IDLE_TIMEOUT = float(os.getenv('SMTP_IDLE_TIMEOUT', 60))
+SMTP_SEND_RETRIES = int(os.getenv('SMTP_SEND_RETRIES', 2))
+# Admin notifications after the first one in a window are folded into a digest (0 = off)
+EMAIL_DIGEST_WINDOW_SECONDS = float(os.getenv('EMAIL_DIGEST_WINDOW_SECONDS', 60))
+EMAIL_DIGEST_MAX_SIZE = int(os.getenv('EMAIL_DIGEST_MAX_SIZE', 100))
+
+class ThroughputCounter:
+    """Sliding-window event counter used to report messages per second"""
+    
+    def __init__(self, window_seconds=60):
+        self.window_seconds = window_seconds
+        self._events = deque()
+        self._lock = threading.Lock()
+    
+    def record(self):
+        now = time.monotonic()
+        with self._lock:
+            self._events.append(now)
+            self._trim(now)
+    
+    def rate(self):
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            return len(self._events) / self.window_seconds
+    
+    def _trim(self, now):
+        cutoff = now - self.window_seconds
+        while self._events and self._events[0] < cutoff:
+            self._events.popleft()
+
+class SMTPConnection:
+    """A long-lived authenticated SMTP session that reconnects on demand"""
+    
+    def __init__(self, server, port, username, password):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self._smtp = None
+        self._last_used = 0.0
+        self.reconnects = 0
+    
+    def _connect(self):
+        self.close()
+        smtp = smtplib.SMTP(self.server, self.port, timeout=SMTP_TIMEOUT)
+        smtp.starttls()
+        smtp.login(self.username, self.password)
+        self._smtp = smtp
+        self.reconnects += 1
+    
+    def _ensure_alive(self):
+        if self._smtp is None:
+            self._connect()
+        elif time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT:
+            # Servers drop idle sessions; probe before reusing one
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._connect()
+            except (smtplib.SMTPException, OSError):
+                self._connect()
+    
+    def send(self, message):
+        self._ensure_alive()
+        self._smtp.send_message(message)
+        self._last_used = time.monotonic()
+    
+    @property
+    def is_open(self):
+        return self._smtp is not None
+    
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+class EmailDispatcher:
+    """In-process queue drained by a small pool of persistent SMTP connections"""
+    
+    def __init__(self, server, port, username, password, pool_size=SMTP_POOL_SIZE):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size
+        self._queue = queue.Queue(maxsize=SMTP_QUEUE_SIZE)
+        self._connections = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.throughput = ThroughputCounter()
+        atexit.register(self.flush)
+    
+    def ensure_started(self):
+        """Start the sender threads once per process (safe to call after fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._connections = []
+            for i in range(self.pool_size):
+                connection = SMTPConnection(self.server, self.port, self.username, self.password)
+                self._connections.append(connection)
+                thread = threading.Thread(
+                    target=self._run, args=(connection,), name=f'smtp-sender-{i}', daemon=True
+                )
+                thread.start()
+    
+    def submit(self, message):
+        """Queue a message for delivery; returns False if the queue is full"""
+        self.ensure_started()
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"Email queue full, dropping message to {message['To']}")
+            return False
+    
+    def flush(self, timeout=10):
+        """Wait (bounded) for queued messages to be sent, e.g. at shutdown"""
+        deadline = time.monotonic() + timeout
+        while self._pid == os.getpid() and self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+    
+    def _run(self, connection):
+        while True:
+            message = self._queue.get()
+            try:
+                self._deliver(connection, message)
+            finally:
+                self._queue.task_done()
+    
+    def _deliver(self, connection, message):
+        for attempt in range(SMTP_SEND_RETRIES + 1):
+            try:
+                connection.send(message)
+                self.sent += 1
+                self.throughput.record()
+                return
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                # Broken session: drop it and reconnect on the next attempt
+                connection.close()
+                error = e
+            except smtplib.SMTPRecipientsRefused as e:
+                error = e
+                break
+            except smtplib.SMTPException as e:
+                connection.close()
+                error = e
+        self.failed += 1
+        print(f"Error sending email: {error}")
+    
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'messages_per_second': round(self.throughput.rate(), 3),
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'pool_size': self.pool_size,
+            'open_connections': sum(1 for c in self._connections if c.is_open),
+            'connects': sum(c.reconnects for c in self._connections)
+        }
+
+class NotificationCoalescer:
+    """
+    Sends the first notification of a quiet period at once and collects the
+    ones that follow within window_seconds into a single digest, sent when
+    the window ends or as soon as max_size are pending. While notifications
+    keep arriving the windows keep rolling, so a burst costs one email per
+    window instead of one per event.
+    """
+    
+    def __init__(self, name, send_one, send_digest, window_seconds=EMAIL_DIGEST_WINDOW_SECONDS,
+                 max_size=EMAIL_DIGEST_MAX_SIZE):
+        self.name = name
+        self.send_one = send_one
+        self.send_digest = send_digest
+        self.window_seconds = window_seconds
+        self.max_size = max(1, max_size)
+        self._pending = []
+        self._window_end = 0.0
+        self._timer = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.sent_individually = 0
+        self.digests_sent = 0
+        self.coalesced = 0
+        atexit.register(self.flush)
+    
+    def add(self, item):
+        """Send item now or queue it for the next digest"""
+        if self.window_seconds <= 0:
+            self.sent_individually += 1
+            return self.send_one(item)
+        
+        batch = None
+        with self._lock:
+            if self._pid != os.getpid():
+                # Timers and pending items do not survive a fork
+                self._pid = os.getpid()
+                self._pending = []
+                self._window_end = 0.0
+                self._timer = None
+            now = time.monotonic()
+            immediate = now >= self._window_end and not self._pending
+            if immediate:
+                self._open_window(now)
+            else:
+                self._pending.append(item)
+                self.coalesced += 1
+                if len(self._pending) >= self.max_size:
+                    batch, self._pending = self._pending, []
+        
+        if immediate:
+            self.sent_individually += 1
+            return self.send_one(item)
+        if batch:
+            self._send(batch)
+        return True
+    
+    def _open_window(self, now):
+        self._window_end = now + self.window_seconds
+        self._timer = threading.Timer(self.window_seconds, self._on_window_end)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _on_window_end(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            batch, self._pending = self._pending, []
+            if batch:
+                # Still busy: keep collecting for another window
+                self._open_window(time.monotonic())
+            else:
+                self._window_end = 0.0
+                self._timer = None
+        if batch:
+            self._send(batch)
+    
+    def _send(self, batch):
+        try:
+            if len(batch) == 1:
+                self.sent_individually += 1
+                self.send_one(batch[0])
+            else:
+                self.digests_sent += 1
+                self.send_digest(batch)
+        except Exception as e:
+            print(f"Error sending {self.name} digest: {e}")
+    
+    def flush(self):
+        """Send whatever is pending now, e.g. at shutdown"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            batch, self._pending = self._pending, []
+        if batch:
+            self._send(batch)
+    
+    def stats(self):
+        return {
+            'window_seconds': self.window_seconds,
+            'max_size': self.max_size,
+            'pending': len(self._pending),
+            'sent_individually': self.sent_individually,
+            'digests_sent': self.digests_sent,
+            'coalesced': self.coalesced
+        }
 
 class EmailNotifier:
     def __init__(self):
@@ -17,243 +306,134 @@ class EmailNotifier:
         self.sender_email = os.getenv('SENDER_EMAIL', '')
         self.sender_password = os.getenv('SENDER_PASSWORD', '')
         self.admin_email = os.getenv('ADMIN_EMAIL', 'admin@tradegpt.com')
+        self.dispatcher = EmailDispatcher(
+            self.smtp_server, self.smtp_port, self.sender_email, self.sender_password
+        )
+        self.new_lead_digest = NotificationCoalescer(
+            'new lead', self._send_new_lead, self._send_new_lead_digest
+        )
+        self.status_change_digest = NotificationCoalescer(
+            'status change', self._send_status_change, self._send_status_change_digest
+        )
         
     def send_email(self, to_email, subject, html_content, text_content=None):
-        """Send an email with HTML and plain text versions"""
+        """Queue an email with HTML and plain text versions for background delivery"""
         try:
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = self.sender_email
-            message['To'] = to_email
-            
-            # Add plain text version (fallback)
-            if text_content:
-                text_part = MIMEText(text_content, 'plain')
-                message.attach(text_part)
-            
-            # Add HTML version
-            html_part = MIMEText(html_content, 'html')
-            message.attach(html_part)
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(message)
-                
-            return True
+            message = build_message(self.sender_email, to_email, subject, html_content, text_content)
+            # Hand off to the pooled dispatcher; HTTP handlers never touch SMTP
+            return self.dispatcher.submit(message)
+        except Exception as e:
+            print(f"Error queueing email: {e}")
+            return False
+    
+    def send_template(self, template_name, to_email, context, text_context=None):
+        """Render a template from templates/email and queue it for background delivery"""
+        try:
+            message = TEMPLATES[template_name].build_message(self.sender_email, to_email, context, text_context)
+            return self.dispatcher.submit(message)
         except Exception as e:
-            print(f"Error sending email: {e}")
+            print(f"Error queueing {template_name} email: {e}")
             return False
     
+    def stats(self):
+        """Dispatcher throughput and queue depth, plus digest coalescing counters"""
+        return dict(
+            self.dispatcher.stats(),
+            digests={
+                'new_lead': self.new_lead_digest.stats(),
+                'status_change': self.status_change_digest.stats()
+            }
+        )
+    
     def notify_new_lead(self, lead):
+        """Notify admin of a new lead; during bursts leads are batched into a digest"""
+        return self.new_lead_digest.add(dict(lead, notified_at=datetime.now()))
+    
+    def _send_new_lead(self, lead):
         """Send notification to admin when new lead is received"""
-        subject = f"🎯 New Lead: {lead['first_name']} {lead['last_name']}"
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                          color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .content {{ background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px; }}
-                .info-box {{ background: white; padding: 20px; margin: 15px 0; border-radius: 8px; 
-                            border-left: 4px solid #667eea; }}
-                .label {{ font-weight: bold; color: #667eea; }}
-                .value {{ color: #333; }}
-                .btn {{ display: inline-block; padding: 12px 24px; background: #667eea; 
-                       color: white; text-decoration: none; border-radius: 6px; margin-top: 20px; }}
-                .footer {{ text-align: center; padding: 20px; color: #666; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎯 New Lead Received!</h1>
-                    <p>A new potential customer has signed up</p>
-                </div>
-                <div class="content">
-                    <div class="info-box">
-                        <p><span class="label">Name:</span> <span class="value">{lead['first_name']} {lead['last_name']}</span></p>
-                        <p><span class="label">Email:</span> <span class="value">{lead['email']}</span></p>
-                        <p><span class="label">Phone:</span> <span class="value">{lead['phone']}</span></p>
-                        <p><span class="label">Investment Range:</span> <span class="value">{lead['investment']}</span></p>
-                    </div>
-                    
-                    <div class="info-box">
-                        <h3>📊 Lead Details</h3>
-                        <p><span class="label">Source:</span> <span class="value">{lead.get('source', 'Unknown')}</span></p>
-                        <p><span class="label">UTM Campaign:</span> <span class="value">{lead.get('utm_campaign', 'Direct')}</span></p>
-                        <p><span class="label">Device:</span> <span class="value">{lead.get('device_type', 'Unknown')}</span></p>
-                        <p><span class="label">Submitted:</span> <span class="value">{datetime.now().strftime('%B %d, %Y at %I:%M %p')}</span></p>
-                    </div>
-                    
-                    {f'<div class="info-box"><h3>📝 Notes</h3><p>{lead.get("notes", "")}</p></div>' if lead.get('notes') else ''}
-                    
-                    <div style="text-align: center;">
-                        <a href="https://admin.tradegpt.sbs" class="btn">View in Admin Dashboard</a>
-                    </div>
-                </div>
-                <div class="footer">
-                    <p>TradeGPT Lead Management System</p>
-                    <p>This is an automated notification. Please do not reply to this email.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_content = f"""
-        New Lead Received!
-        
-        Name: {lead['first_name']} {lead['last_name']}
-        Email: {lead['email']}
-        Phone: {lead['phone']}
-        Investment: {lead['investment']}
-        Source: {lead.get('source', 'Unknown')}
-        Time: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
-        
-        View in admin dashboard: https://admin.tradegpt.sbs
-        """
-        
-        return self.send_email(self.admin_email, subject, html_content, text_content)
+        context = lead_context(lead)
+        context.update(
+            utm_campaign=lead.get('utm_campaign') or 'Direct',
+            device_type=lead.get('device_type') or 'Unknown',
+            submitted=lead['notified_at'].strftime('%B %d, %Y at %I:%M %p'),
+            notes_block=FRAGMENTS['new_lead_notes'].render(lead) if lead.get('notes') else ''
+        )
+        return self.send_template('new_lead', self.admin_email, context)
+    
+    def _send_new_lead_digest(self, leads):
+        """One admin email listing the leads received during a burst"""
+        rows = []
+        for lead in leads:
+            row = lead_context(lead)
+            row['time'] = lead['notified_at'].strftime('%I:%M:%S %p')
+            rows.append(row)
+        first, last = leads[0]['notified_at'], leads[-1]['notified_at']
+        context = {
+            'count': len(leads),
+            'first_time': first.strftime('%I:%M %p'),
+            'last_time': last.strftime('%I:%M %p'),
+            'first_received': first.strftime('%B %d, %Y at %I:%M %p'),
+            'rows': ''.join(FRAGMENTS['new_lead_digest_row'].render(row) for row in rows)
+        }
+        # The text part lists the same rows as plain lines
+        text_context = dict(
+            context, rows=''.join(FRAGMENTS['new_lead_digest_line'].render(row) for row in rows)
+        )
+        return self.send_template('new_lead_digest', self.admin_email, context, text_context)
     
     def send_welcome_email(self, lead):
         """Send welcome email to the new lead"""
-        subject = f"Welcome to TradeGPT, {lead['first_name']}!"
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                          color: white; padding: 40px 20px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .content {{ background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px; }}
-                .highlight {{ background: white; padding: 20px; margin: 20px 0; border-radius: 8px; 
-                             border-left: 4px solid #10b981; }}
-                .btn {{ display: inline-block; padding: 15px 30px; background: #667eea; 
-                       color: white; text-decoration: none; border-radius: 8px; margin: 20px 0; 
-                       font-weight: bold; }}
-                .footer {{ text-align: center; padding: 20px; color: #666; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🚀 Welcome to TradeGPT!</h1>
-                    <p>Your AI Trading Journey Starts Here</p>
-                </div>
-                <div class="content">
-                    <p>Hi {lead['first_name']},</p>
-                    
-                    <p>Thank you for your interest in TradeGPT! We're excited to help you start your automated trading journey.</p>
-                    
-                    <div class="highlight">
-                        <h3>✅ What Happens Next?</h3>
-                        <ol style="padding-left: 20px;">
-                            <li><strong>Account Review:</strong> Our team will review your registration within 2-4 hours</li>
-                            <li><strong>Setup Call:</strong> A specialist will contact you at {lead['phone']} to explain the platform</li>
-                            <li><strong>Account Activation:</strong> We'll help you set up your trading account and AI strategies</li>
-                            <li><strong>Start Trading:</strong> Begin earning with AI-powered automation</li>
-                        </ol>
-                    </div>
-                    
-                    <div class="highlight">
-                        <h3>📚 While You Wait</h3>
-                        <p>Learn more about TradeGPT:</p>
-                        <ul style="padding-left: 20px;">
-                            <li>How our AI analyzes market conditions 24/7</li>
-                            <li>Risk management and stop-loss features</li>
-                            <li>Compatible trading platforms and brokers</li>
-                            <li>Success stories from our users</li>
-                        </ul>
-                    </div>
-                    
-                    <div style="text-align: center;">
-                        <a href="https://tradegpt.sbs/education.html" class="btn">Learn More</a>
-                    </div>
-                    
-                    <p style="margin-top: 30px;">If you have any questions, feel free to reply to this email or call us at +1 (234) 567-890.</p>
-                    
-                    <p>Best regards,<br>
-                    <strong>The TradeGPT Team</strong></p>
-                </div>
-                <div class="footer">
-                    <p>⚠️ Trading involves risk. Please ensure you understand the risks before investing.</p>
-                    <p>TradeGPT | support@tradegpt.sbs</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_content = f"""
-        Welcome to TradeGPT, {lead['first_name']}!
-        
-        Thank you for your interest in TradeGPT!
-        
-        What Happens Next?
-        1. Account Review - Our team will review your registration within 2-4 hours
-        2. Setup Call - A specialist will contact you at {lead['phone']}
-        3. Account Activation - We'll help you set up your trading account
-        4. Start Trading - Begin earning with AI automation
-        
-        If you have any questions, contact us at support@tradegpt.com or +1 (234) 567-890.
-        
-        Best regards,
-        The TradeGPT Team
-        
-        ⚠️ Trading involves risk. Please ensure you understand the risks before investing.
-        """
-        
-        return self.send_email(lead['email'], subject, html_content, text_content)
+        return self.send_template('welcome', lead['email'], lead_context(lead))
     
     def notify_status_change(self, lead, old_status, new_status):
+        """Notify admin when lead status changes; during bursts changes are batched into a digest"""
+        return self.status_change_digest.add((lead, old_status, new_status, datetime.now()))
+    
+    def _send_status_change(self, change):
         """Notify admin when lead status changes"""
-        subject = f"📊 Lead Status Update: {lead['first_name']} {lead['last_name']}"
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #667eea; color: white; padding: 20px; text-align: center; }}
-                .content {{ background: #f8f9fa; padding: 20px; }}
-                .status-box {{ background: white; padding: 15px; margin: 15px 0; border-radius: 8px; }}
-                .old-status {{ color: #f59e0b; font-weight: bold; }}
-                .new-status {{ color: #10b981; font-weight: bold; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h2>Lead Status Changed</h2>
-                </div>
-                <div class="content">
-                    <div class="status-box">
-                        <p><strong>Lead:</strong> {lead['first_name']} {lead['last_name']}</p>
-                        <p><strong>Email:</strong> {lead['email']}</p>
-                        <p><strong>Status Change:</strong> 
-                           <span class="old-status">{old_status}</span> → 
-                           <span class="new-status">{new_status}</span>
-                        </p>
-                        <p><strong>Time:</strong> {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(self.admin_email, subject, html_content)
+        lead, old_status, new_status, changed_at = change
+        context = lead_context(lead)
+        context.update(
+            old_status=old_status,
+            new_status=new_status,
+            changed=changed_at.strftime('%B %d, %Y at %I:%M %p')
+        )
+        return self.send_template('status_change', self.admin_email, context)
+    
+    def _send_status_change_digest(self, changes):
+        """One admin email listing the status changes made during a burst"""
+        rows = []
+        for lead, old_status, new_status, changed_at in changes:
+            row = lead_context(lead)
+            row.update(old_status=old_status, new_status=new_status, time=changed_at.strftime('%I:%M:%S %p'))
+            rows.append(FRAGMENTS['status_change_digest_row'].render(row))
+        return self.send_template('status_change_digest', self.admin_email, {
+            'count': len(changes),
+            'rows': ''.join(rows)
+        })
+
+def lead_context(lead):
+    """Template fields shared by the lead emails"""
+    return {
+        'first_name': lead['first_name'],
+        'last_name': lead['last_name'],
+        'email': lead['email'],
+        'phone': lead['phone'],
+        'investment': lead['investment'],
+        'source': lead.get('source') or 'Unknown',
+        'notes': lead.get('notes')
+    }
+
+# Built on first use, so importing this module starts no dispatcher
+_email_notifier = None
+_email_notifier_lock = threading.Lock()
+
 
-# Initialize email notifier
-email_notifier = EmailNotifier()
+def get_email_notifier():
+    """The process-wide EmailNotifier"""
+    global _email_notifier
+    if _email_notifier is None:
+        with _email_notifier_lock:
+            if _email_notifier is None:
+                _email_notifier = EmailNotifier()
+    return _email_notifier
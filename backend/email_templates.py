@@ -0,0 +1,134 @@
+"""
+Email Templates
+Notification emails are rendered from the files in templates/email, loaded
+and compiled once at import. A compiled template is a list of static
+segments, already UTF-8 encoded, with slots for the dynamic fields, so a
+render only escapes and encodes the fields and joins bytes.
+
+Placeholders are {{ name }} (HTML-escaped in .html files) and
+{{ name|raw }} for fragments that were rendered by another template.
+"""
+
+import base64
+import html
+import os
+import re
+from email.message import Message
+from email.mime.multipart import MIMEMultipart
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'email')
+
+PLACEHOLDER = re.compile(r'\{\{\s*(\w+)(\|raw)?\s*\}\}')
+
+# Headers of the text/plain and text/html parts never change
+PART_HEADERS = {
+    subtype: (
+        ('Content-Type', f'text/{subtype}; charset="utf-8"'),
+        ('MIME-Version', '1.0'),
+        ('Content-Transfer-Encoding', 'base64')
+    )
+    for subtype in ('plain', 'html')
+}
+
+
+class CompiledTemplate:
+    """A template split once into encoded static segments and field slots"""
+
+    def __init__(self, source, autoescape):
+        self.segments = []
+        self.fields = []  # (segment index, name, escape)
+        position = 0
+        for match in PLACEHOLDER.finditer(source):
+            self.segments.append(source[position:match.start()].encode('utf-8'))
+            self.fields.append((len(self.segments), match.group(1), autoescape and not match.group(2)))
+            self.segments.append(None)
+            position = match.end()
+        self.segments.append(source[position:].encode('utf-8'))
+
+    def render_bytes(self, context):
+        out = self.segments[:]
+        for index, name, escape in self.fields:
+            value = context[name]
+            value = '' if value is None else str(value)
+            out[index] = (html.escape(value) if escape else value).encode('utf-8')
+        return b''.join(out)
+
+    def render(self, context):
+        return self.render_bytes(context).decode('utf-8')
+
+
+def load_template(filename, directory=TEMPLATE_DIR):
+    with open(os.path.join(directory, filename), encoding='utf-8') as f:
+        return CompiledTemplate(f.read(), autoescape=filename.endswith('.html'))
+
+
+class EmailTemplate:
+    """Subject plus HTML and optional plain text bodies of one email"""
+
+    def __init__(self, subject, html_file, text_file=None, directory=TEMPLATE_DIR):
+        self.subject = CompiledTemplate(subject, autoescape=False)
+        self.html = load_template(html_file, directory)
+        self.text = load_template(text_file, directory) if text_file else None
+
+    def build_message(self, sender, to, context, text_context=None):
+        """
+        Render into a ready-to-send multipart/alternative message; text_context
+        replaces context for the plain text body (e.g. unescaped fragments)
+        """
+        message = MIMEMultipart('alternative')
+        message['Subject'] = self.subject.render(context)
+        message['From'] = sender
+        message['To'] = to
+        if self.text:
+            message.attach(encoded_part('plain', self.text.render_bytes(text_context or context)))
+        message.attach(encoded_part('html', self.html.render_bytes(context)))
+        return message
+
+
+def encoded_part(subtype, body):
+    """
+    text/<subtype> part with a base64 body; same output as MIMEText(..., 'utf-8')
+    without re-deriving the headers and charset handling per message
+    """
+    part = Message()
+    for name, value in PART_HEADERS[subtype]:
+        part[name] = value
+    part.set_payload(base64.encodebytes(body).decode('ascii'))
+    return part
+
+
+def build_message(sender, to, subject, html_content, text_content=None):
+    """Message from already rendered strings (same layout as EmailTemplate.build_message)"""
+    message = MIMEMultipart('alternative')
+    message['Subject'] = subject
+    message['From'] = sender
+    message['To'] = to
+    if text_content:
+        message.attach(encoded_part('plain', text_content.encode('utf-8')))
+    message.attach(encoded_part('html', html_content.encode('utf-8')))
+    return message
+
+
+# Loaded and compiled once per process
+TEMPLATES = {
+    'new_lead': EmailTemplate('🎯 New Lead: {{ first_name }} {{ last_name }}', 'new_lead.html', 'new_lead.txt'),
+    'welcome': EmailTemplate('Welcome to TradeGPT, {{ first_name }}!', 'welcome.html', 'welcome.txt'),
+    'status_change': EmailTemplate(
+        '📊 Lead Status Update: {{ first_name }} {{ last_name }}', 'status_change.html'
+    ),
+    'new_lead_digest': EmailTemplate(
+        '🎯 {{ count }} New Leads ({{ first_time }} - {{ last_time }})',
+        'new_lead_digest.html', 'new_lead_digest.txt'
+    ),
+    'status_change_digest': EmailTemplate('📊 {{ count }} Lead Status Updates', 'status_change_digest.html')
+}
+
+FRAGMENTS = {
+    name: load_template(filename)
+    for name, filename in (
+        ('new_lead_notes', 'new_lead_notes.html'),
+        ('new_lead_digest_row', 'new_lead_digest_row.html'),
+        ('new_lead_digest_line', 'new_lead_digest_row.txt'),
+        ('status_change_digest_row', 'status_change_digest_row.html')
+    )
+}
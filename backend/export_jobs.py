@@ -0,0 +1,156 @@
+"""
+Export Jobs
+Background export handler (writes the export file with progress reporting)
+and the retention policy that expires finished export files by age and by
+total size
+
+Usage:
+  python export_jobs.py purge   - Apply the retention policy now
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from background_jobs import STATUS_COMPLETED, STATUS_EXPIRED
+
+EXPORT_DIR = os.getenv('EXPORT_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+EXPORT_RETENTION_HOURS = float(os.getenv('EXPORT_RETENTION_HOURS', 24))
+EXPORT_RETENTION_MAX_MB = float(os.getenv('EXPORT_RETENTION_MAX_MB', 1024))
+EXPORT_PROGRESS_EVERY = int(os.getenv('EXPORT_PROGRESS_EVERY', 5000))
+
+EXPORT_JOB_KIND = 'lead_export'
+
+
+def export_file_name(export_format, compress=False, when=None):
+    """Download name for an export, e.g. leads_export_20240101_120000.csv.gz"""
+    stamp = (when or datetime.now()).strftime('%Y%m%d_%H%M%S')
+    name = f'leads_export_{stamp}.{export_format}'
+    if compress and export_format != 'xlsx':
+        name += '.gz'
+    return name
+
+
+def _counted(rows, progress, every=EXPORT_PROGRESS_EVERY):
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % every == 0:
+            progress(done)
+
+
+def write_export_file(chunks, path):
+    """Write byte chunks to path atomically (via a .part file); returns the size"""
+    partial = path + '.part'
+    with open(partial, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(partial, path)
+    return os.path.getsize(path)
+
+
+def make_export_handler(db, Lead, export_dir=EXPORT_DIR):
+    """Background job handler that writes a lead export to export_dir"""
+
+    def run_export(job, progress):
+        # The export writers (csv, zipfile) load with the first export, not at startup
+        from exports import (
+            EXPORT_JOB_FORMATS, XLSX_ZIP64_ROWS, count_export_rows, export_body, iter_export_rows_paged
+        )
+
+        params = json.loads(job.params or '{}')
+        export_format = params.get('format', 'csv')
+        if export_format not in EXPORT_JOB_FORMATS:
+            raise ValueError(f'Unsupported export format: {export_format}')
+        lead_ids = params.get('lead_ids') or None
+        compress = bool(params.get('gzip')) and export_format != 'xlsx'
+
+        total = count_export_rows(db, Lead, lead_ids)
+        db.session.commit()
+        progress(0, total)
+
+        file_name = export_file_name(export_format, compress)
+        os.makedirs(export_dir, exist_ok=True)
+        path = os.path.join(export_dir, f'job_{job.id}_{file_name}')
+
+        rows = _counted(iter_export_rows_paged(db, Lead, lead_ids), progress)
+        size = write_export_file(
+            export_body(rows, export_format, compress, zip64=total > XLSX_ZIP64_ROWS), path
+        )
+        return {
+            'file_path': path,
+            'file_name': file_name,
+            'file_size': size,
+            'expires_at': datetime.utcnow() + timedelta(hours=EXPORT_RETENTION_HOURS),
+            'rows_done': total,
+            'content_type': 'application/gzip' if compress else EXPORT_JOB_FORMATS[export_format]
+        }
+
+    return run_export
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def purge_exports(db, Job, export_dir=EXPORT_DIR, now=None):
+    """
+    Expire export files older than EXPORT_RETENTION_HOURS, then the oldest
+    files beyond EXPORT_RETENTION_MAX_MB in total. Files in export_dir that
+    no job owns (e.g. from the old synchronous exports) are removed once
+    they are older than the retention window.
+    """
+    now = now or datetime.utcnow()
+    budget = EXPORT_RETENTION_MAX_MB * 1024 * 1024
+    retained_bytes = 0
+    retained_paths = set()
+    expired = 0
+
+    jobs = db.session.query(Job).filter(
+        Job.status == STATUS_COMPLETED, Job.file_path.isnot(None)
+    ).order_by(Job.finished_at.desc()).all()
+    for job in jobs:
+        size = job.file_size or 0
+        too_old = job.expires_at is not None and job.expires_at <= now
+        if too_old or retained_bytes + size > budget or not os.path.exists(job.file_path):
+            _remove(job.file_path)
+            job.status = STATUS_EXPIRED
+            job.file_path = None
+            job.updated_at = now
+            expired += 1
+        else:
+            retained_bytes += size
+            retained_paths.add(os.path.abspath(job.file_path))
+    db.session.commit()
+
+    orphans = 0
+    if os.path.isdir(export_dir):
+        cutoff = time.time() - EXPORT_RETENTION_HOURS * 3600
+        for name in os.listdir(export_dir):
+            path = os.path.abspath(os.path.join(export_dir, name))
+            if path in retained_paths or not os.path.isfile(path):
+                continue
+            if os.path.getmtime(path) < cutoff:
+                _remove(path)
+                orphans += 1
+
+    if expired or orphans:
+        print(f"✅ Export retention: expired {expired} job files, removed {orphans} orphaned files")
+    return {'expired_jobs': expired, 'orphans_removed': orphans, 'retained_bytes': retained_bytes}
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'purge':
+        from app import app, db, BackgroundJob
+        with app.app_context():
+            print(purge_exports(db, BackgroundJob))
+    else:
+        print("Usage:")
+        print("  python export_jobs.py purge   - Apply the retention policy now")
@@ -0,0 +1,193 @@
+"""
+Lead Export Streaming
+Streams lead exports as CSV, NDJSON or XLSX in constant memory: rows come
+from a server-side cursor as plain tuples and are written out in chunks
+"""
+
+import csv
+import json
+import os
+import zlib
+from io import StringIO
+
+from sqlalchemy import select
+
+from pagination import after_cursor_desc
+from xlsx_writer import XLSX_CONTENT_TYPE, stream_xlsx
+
+EXPORT_YIELD_PER = int(os.getenv('EXPORT_YIELD_PER', 2000))
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 500))
+XLSX_MAX_SHARED_STRINGS = int(os.getenv('XLSX_MAX_SHARED_STRINGS', 100000))
+# Above this many rows the worksheet entry is written with Zip64 headers (>4 GiB safe)
+XLSX_ZIP64_ROWS = int(os.getenv('XLSX_ZIP64_ROWS', 1000000))
+
+# (header, Lead attribute) in export column order
+EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('First Name', 'first_name'),
+    ('Last Name', 'last_name'),
+    ('Email', 'email'),
+    ('Phone', 'phone'),
+    ('Investment', 'investment'),
+    ('Source', 'source'),
+    ('Status', 'status'),
+    ('Notes', 'notes'),
+    ('Created At', 'created_at'),
+    ('Updated At', 'updated_at')
+]
+
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+
+# Excel column widths, matching EXPORT_COLUMNS
+XLSX_COLUMN_WIDTHS = [8, 16, 16, 30, 18, 14, 16, 12, 40, 20, 20]
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+# Formats available to background export jobs
+EXPORT_JOB_FORMATS = dict(EXPORT_CONTENT_TYPES, xlsx=XLSX_CONTENT_TYPE)
+
+
+def export_statement(Lead, lead_ids=None):
+    """SELECT of the export columns (no ORM hydration), newest first"""
+    stmt = select(*[getattr(Lead, attribute) for _, attribute in EXPORT_COLUMNS])
+    if lead_ids:
+        stmt = stmt.where(Lead.id.in_(lead_ids))
+    return stmt.order_by(Lead.created_at.desc(), Lead.id.desc())
+
+
+def iter_export_rows(db, Lead, lead_ids=None):
+    """Yield raw export tuples through a server-side cursor"""
+    result = db.session.execute(
+        export_statement(Lead, lead_ids).execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER)
+    )
+    try:
+        for row in result:
+            yield tuple(row)
+    finally:
+        result.close()
+
+
+def iter_export_rows_paged(db, Lead, lead_ids=None, page_size=EXPORT_YIELD_PER):
+    """
+    Yield export tuples in keyset pages, each read in its own short
+    transaction, so a long export never holds a read lock open (progress
+    writes from background jobs stay unblocked on SQLite)
+    """
+    cursor = None
+    while True:
+        stmt = export_statement(Lead, lead_ids)
+        if cursor is not None:
+            stmt = stmt.where(after_cursor_desc(Lead.created_at, Lead.id, cursor))
+        rows = db.session.execute(stmt.limit(page_size)).all()
+        db.session.commit()
+        for row in rows:
+            yield tuple(row)
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1][9], rows[-1][0])
+
+
+def count_export_rows(db, Lead, lead_ids=None):
+    stmt = select(db.func.count(Lead.id))
+    if lead_ids:
+        stmt = stmt.where(Lead.id.in_(lead_ids))
+    return db.session.execute(stmt).scalar()
+
+
+def _format_timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def format_export_row(row):
+    """Display values for one export tuple (same formatting as the legacy CSV)"""
+    values = list(row)
+    values[8] = values[8] or ''
+    values[9] = _format_timestamp(values[9])
+    values[10] = _format_timestamp(values[10])
+    return values
+
+
+def csv_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Encode rows as CSV text, yielding one chunk per chunk_rows rows"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    pending = 0
+    for row in rows:
+        writer.writerow(format_export_row(row))
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Encode rows as newline-delimited JSON objects keyed by column name"""
+    keys = [attribute for _, attribute in EXPORT_COLUMNS]
+    lines = []
+    for row in rows:
+        record = dict(zip(keys, row))
+        for key in ('created_at', 'updated_at'):
+            record[key] = record[key].isoformat() if record[key] else None
+        lines.append(json.dumps(record))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def xlsx_rows(rows):
+    """Cell values for the workbook; timestamps stay datetimes so Excel gets real date cells"""
+    for row in rows:
+        values = list(row)
+        values[8] = values[8] or ''
+        yield values
+
+
+def encode_chunks(chunks, compress=False):
+    """UTF-8 encode text chunks, optionally as a gzip stream"""
+    if not compress:
+        for chunk in chunks:
+            if chunk:
+                yield chunk.encode('utf-8')
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_body(rows, export_format='csv', compress=False, zip64=False):
+    """Byte chunks of a complete export of rows in the requested format"""
+    if export_format == 'xlsx':
+        return stream_xlsx(
+            EXPORT_HEADERS, xlsx_rows(rows),
+            sheet_name='Leads',
+            column_widths=XLSX_COLUMN_WIDTHS,
+            max_shared_strings=XLSX_MAX_SHARED_STRINGS,
+            zip64=zip64,
+            flush_every=EXPORT_CHUNK_ROWS
+        )
+    chunks = ndjson_chunks(rows) if export_format == 'ndjson' else csv_chunks(rows)
+    return encode_chunks(chunks, compress)
+
+
+def stream_export(db, Lead, export_format='csv', lead_ids=None, compress=False):
+    """Byte chunks of a complete CSV/NDJSON export"""
+    return export_body(iter_export_rows(db, Lead, lead_ids), export_format, compress)
+
+
+def stream_xlsx_export(db, Lead, lead_ids=None):
+    """Byte chunks of a complete .xlsx workbook, written row by row"""
+    zip64 = count_export_rows(db, Lead, lead_ids) > XLSX_ZIP64_ROWS
+    return export_body(iter_export_rows(db, Lead, lead_ids), 'xlsx', zip64=zip64)
@@ -0,0 +1,35 @@
+"""
+Gunicorn Configuration
+Usage: gunicorn app:app -c gunicorn.conf.py
+
+The app is imported once in the master (preload_app) and the database is
+bootstrapped there before any worker is forked, so no request ever pays for
+schema setup. Each worker then only starts its own background threads.
+"""
+
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+# More than one thread switches to the gthread worker; db_pool sizes each worker's pool from it
+threads = int(os.getenv('WEB_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+
+def when_ready(server):
+    """Master is up, workers not yet forked: bootstrap once per deploy"""
+    from app import bootstrap_database
+    try:
+        bootstrap_database()
+    except Exception as e:
+        # Do not fork workers onto a half-upgraded schema
+        server.log.error(f"Database bootstrap failed: {e}")
+        sys.exit(1)
+
+
+def post_fork(server, worker):
+    """Threads do not survive fork; start the outbox and job workers in each worker"""
+    from app import start_background_workers
+    start_background_workers()
@@ -0,0 +1,238 @@
+"""
+CRM HTTP Layer
+Pooled keep-alive HTTP sessions (one requests.Session per host, so TCP and
+TLS are set up once and reused) and a circuit breaker per CRM integration
+that stops calling an endpoint after repeated failures and probes it again
+after a cool-down
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from outbox import DeliveryDeferred
+
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 10))
+HTTP_POOL_BLOCK = os.getenv('HTTP_POOL_BLOCK', 'false').lower() == 'true'
+CRM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CRM_BREAKER_FAILURE_THRESHOLD', 5))
+CRM_BREAKER_RESET_SECONDS = float(os.getenv('CRM_BREAKER_RESET_SECONDS', 30))
+CRM_BREAKER_LATENCY_WINDOW = int(os.getenv('CRM_BREAKER_LATENCY_WINDOW', 200))
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(DeliveryDeferred):
+    """Raised instead of calling an integration whose breaker is open"""
+
+
+class HTTPSessionPool:
+    """One pooled requests.Session per (scheme, host, port)"""
+
+    def __init__(self, pool_maxsize=HTTP_POOL_MAXSIZE, pool_block=HTTP_POOL_BLOCK):
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._requests = {}
+
+    def session_for(self, url):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                # requests (with urllib3 and certifi) is loaded by the first CRM call, not at startup
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                # Retries are handled by the outbox, not by urllib3
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=self.pool_block,
+                    max_retries=0
+                )
+                session.mount(f'{parts.scheme}://', adapter)
+                self._sessions[key] = session
+                self._requests[key] = 0
+            # Outbox workers and batch threads call this concurrently
+            self._requests[key] += 1
+        return session
+
+    def request(self, method, url, **kwargs):
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def stats(self):
+        with self._lock:
+            hosts = []
+            for (scheme, host, port), count in self._requests.items():
+                hosts.append({'host': f'{scheme}://{host}' + (f':{port}' if port else ''), 'requests': count})
+            return {'hosts': hosts, 'pool_maxsize': self.pool_maxsize}
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through; failure_threshold consecutive failures open it.
+    open: calls are refused until reset_seconds have passed.
+    half_open: one probe call is let through; success closes, failure reopens.
+    """
+
+    def __init__(self, name, failure_threshold=CRM_BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds=CRM_BREAKER_RESET_SECONDS, latency_window=CRM_BREAKER_LATENCY_WINDOW):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.counters = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+        self._probe_in_flight = False
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                remaining = self.opened_at + self.reset_seconds - time.monotonic()
+                if remaining > 0:
+                    self.counters['rejected'] += 1
+                    raise CircuitOpenError(f'Circuit open for {self.name}: {self.last_error}', delay=remaining)
+                self.state = STATE_HALF_OPEN
+            if self.state == STATE_HALF_OPEN:
+                if self._probe_in_flight:
+                    self.counters['rejected'] += 1
+                    raise CircuitOpenError(f'Circuit half-open for {self.name}; probe in flight', delay=1)
+                self._probe_in_flight = True
+
+    def record_success(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            self.counters['successes'] += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            if self.state != STATE_CLOSED:
+                print(f"✅ Circuit closed for {self.name}")
+            self.state = STATE_CLOSED
+
+    def release(self):
+        """Call ended without telling us anything about the endpoint"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, latency, error):
+        with self._lock:
+            self._latencies.append(latency)
+            self.counters['failures'] += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)[:500]
+            self._probe_in_flight = False
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    self.counters['opened'] += 1
+                    print(f"⚠️  Circuit opened for {self.name} after {self.consecutive_failures} failures: {error}")
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            retry_in = None
+            if self.state == STATE_OPEN:
+                retry_in = round(max(0, self.opened_at + self.reset_seconds - time.monotonic()), 1)
+
+            def percentile(p):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+            return dict(
+                self.counters,
+                state=self.state,
+                consecutive_failures=self.consecutive_failures,
+                retry_in_seconds=retry_in,
+                last_error=self.last_error,
+                latency_ms={
+                    'samples': len(latencies),
+                    'avg': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                    'p50': percentile(0.5),
+                    'p95': percentile(0.95),
+                    'max': round(latencies[-1] * 1000, 1) if latencies else None
+                }
+            )
+
+
+class BreakerRegistry:
+    """Circuit breaker per CRM integration id (per process)"""
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, integration):
+        breaker = self._breakers.get(integration.id)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    integration.id, CircuitBreaker(f'{integration.name} #{integration.id}')
+                )
+        return breaker
+
+    def snapshot(self, integration_id):
+        breaker = self._breakers.get(integration_id)
+        return breaker.snapshot() if breaker else None
+
+
+def is_breaker_failure(response):
+    """Server-side trouble counts against the breaker; other 4xx mean the endpoint is up"""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+def call_with_breaker(breaker, send, wait=None):
+    """
+    Run send() (which returns a requests.Response) under breaker and return
+    the response; raises for HTTP errors like response.raise_for_status().
+    wait() (e.g. a rate limiter) runs only once the breaker admitted the
+    call, so an open circuit fails fast, and is not timed as latency.
+    """
+    import requests
+
+    breaker.before_call()
+    if wait is not None:
+        try:
+            wait()
+        except Exception:
+            breaker.release()
+            raise
+    started = time.monotonic()
+    try:
+        response = send()
+    except requests.RequestException as e:
+        breaker.record_failure(time.monotonic() - started, e)
+        raise
+    except Exception:
+        # Not a transport failure; let the breaker admit the next call
+        breaker.release()
+        raise
+    latency = time.monotonic() - started
+    if is_breaker_failure(response):
+        breaker.record_failure(latency, f'HTTP {response.status_code}')
+    else:
+        breaker.record_success(latency)
+    response.raise_for_status()
+    return response
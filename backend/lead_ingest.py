@@ -0,0 +1,213 @@
+"""
+Lead Ingestion Helpers
+Shared validation for lead submissions and chunked multi-row upserts
+used by the single-lead form endpoint and the partner batch API
+"""
+
+import importlib
+import json
+import os
+from datetime import datetime
+
+
+LEAD_BATCH_MAX_ROWS = int(os.getenv('LEAD_BATCH_MAX_ROWS', 10000))
+LEAD_BATCH_CHUNK_SIZE = int(os.getenv('LEAD_BATCH_CHUNK_SIZE', 500))
+
+# Columns refreshed when a submission matches an existing lead's email
+# (mirrors what the form endpoint has always updated)
+UPSERT_UPDATE_COLUMNS = ['first_name', 'last_name', 'phone', 'investment', 'source', 'notes', 'updated_at']
+
+
+def validate_lead_payload(data):
+    """Return an error message for an invalid form payload, or None"""
+    if not isinstance(data, dict):
+        return 'Lead must be a JSON object'
+    if not data.get('email') or not data.get('phone'):
+        return 'Email and phone are required'
+    if not isinstance(data['email'], str):
+        return 'Email must be a string'
+    if not data.get('firstName') and not data.get('lastName'):
+        return 'Name is required'
+    return None
+
+
+def build_lead_notes(data):
+    """Build the notes string with all available form information"""
+    country = data.get('country', 'Not specified')
+    has_deposit = data.get('hasDeposit', 'unknown')
+    call_time = data.get('callTime', 'anytime')
+    experience = data.get('experience', '')
+    message = data.get('message', '')
+
+    notes_parts = [f"Country: {country}"]
+    if has_deposit != 'unknown':
+        notes_parts.append(f"Has Deposit: {has_deposit}")
+    if call_time != 'anytime':
+        notes_parts.append(f"Call Time: {call_time}")
+    if experience:
+        notes_parts.append(f"Experience: {experience}")
+    if message:
+        notes_parts.append(f"Message: {message}")
+
+    return ", ".join(notes_parts)
+
+
+def build_lead_row(data, ip_address, quality_score, now):
+    """Column values for a new lead built from a form payload"""
+    return {
+        'first_name': data.get('firstName', ''),
+        'last_name': data.get('lastName', ''),
+        'email': data.get('email', ''),
+        'phone': data.get('phone', ''),
+        'investment': data.get('investment', 'Not specified'),
+        'source': data.get('source', 'website'),
+        'status': 'new',
+        'notes': build_lead_notes(data),
+        'utm_source': data.get('utm_source'),
+        'utm_medium': data.get('utm_medium'),
+        'utm_campaign': data.get('utm_campaign'),
+        'utm_term': data.get('utm_term'),
+        'utm_content': data.get('utm_content'),
+        'referrer': data.get('referrer'),
+        'landing_page': data.get('landing_page'),
+        'user_agent': data.get('user_agent'),
+        'device_type': data.get('device_type'),
+        'ip_address': ip_address,
+        'conversion_value': 0.0,
+        'quality_score': quality_score,
+        'last_activity': now,
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+def parse_batch_body(raw_body, content_type=''):
+    """Parse a JSON array or NDJSON body into a list of payloads"""
+    text = raw_body.decode('utf-8') if isinstance(raw_body, bytes) else raw_body
+    stripped = text.lstrip()
+    if 'ndjson' not in (content_type or '') and stripped.startswith('['):
+        rows = json.loads(stripped)
+        if not isinstance(rows, list):
+            raise ValueError('Body must be a JSON array of leads')
+        return rows
+
+    rows = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f'Invalid JSON on line {line_number}: {e.msg}')
+    return rows
+
+
+def dialect_insert(db, table):
+    """INSERT construct supporting ON CONFLICT for the active database"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        raise NotImplementedError(f'Upsert is not supported on {dialect}')
+    # The engine has already imported its own dialect; importing both up front cost ~50 ms of cold start
+    return importlib.import_module(f'sqlalchemy.dialects.{dialect}').insert(table)
+
+
+def upsert_by_email(db, Model, values, update_columns):
+    """
+    Insert or update one row keyed on email with a single
+    INSERT ... ON CONFLICT (email) DO UPDATE ... RETURNING statement.
+    Returns the ORM object built from the RETURNING row; the caller commits.
+    """
+    stmt = dialect_insert(db, Model).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['email'],
+        set_={column: stmt.excluded[column] for column in update_columns}
+    ).returning(Model)
+    return db.session.scalars(stmt, execution_options={'populate_existing': True}).one()
+
+
+def upsert_leads(db, Lead, rows, now):
+    """
+    Insert or update leads keyed on email in one multi-row statement.
+    Returns {email: (id, created)}; the caller commits.
+    """
+    if not rows:
+        return {}
+    table = Lead.__table__
+    stmt = dialect_insert(db, table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.email],
+        set_={column: stmt.excluded[column] for column in UPSERT_UPDATE_COLUMNS}
+    ).returning(table.c.id, table.c.email, table.c.created_at)
+
+    results = {}
+    for lead_id, email, created_at in db.session.execute(stmt):
+        # Rows that hit the conflict keep their original created_at
+        results[email] = (lead_id, created_at == now)
+    return results
+
+
+def ingest_lead_batch(db, Lead, payloads, score_lead=None, on_chunk=None):
+    """
+    Validate, score and upsert a batch of form payloads in chunks.
+    on_chunk(results) runs inside each chunk's transaction before commit.
+    Returns per-row results in input order.
+
+    Each chunk is stamped just before its upsert, so a row's updated_at is
+    never older than the transaction that commits it by more than a lock
+    wait (the sync feed's safety lag relies on this).
+    """
+    results = [None] * len(payloads)
+
+    # Last occurrence of an email wins; earlier ones are reported as duplicates
+    last_index = {}
+    for index, data in enumerate(payloads):
+        error = validate_lead_payload(data)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+            continue
+        if data['email'] in last_index:
+            results[last_index[data['email']]] = {'index': last_index[data['email']], 'status': 'duplicate'}
+        last_index[data['email']] = index
+
+    pending = sorted(last_index.values())
+    for start in range(0, len(pending), LEAD_BATCH_CHUNK_SIZE):
+        chunk = pending[start:start + LEAD_BATCH_CHUNK_SIZE]
+        scores = [score_lead(payloads[index]) if score_lead else 50 for index in chunk]
+
+        try:
+            # Check the connection out first: a pool wait must not sit between stamp and commit
+            db.session.connection()
+            now = datetime.utcnow()
+            rows = [
+                build_lead_row(payloads[index], payloads[index].get('ip_address'), quality_score, now)
+                for index, quality_score in zip(chunk, scores)
+            ]
+            upserted = upsert_leads(db, Lead, rows, now)
+            chunk_results = []
+            for index in chunk:
+                lead_id, created = upserted[payloads[index]['email']]
+                result = {
+                    'index': index,
+                    'status': 'created' if created else 'updated',
+                    'id': lead_id,
+                    'email': payloads[index]['email']
+                }
+                results[index] = result
+                chunk_results.append(result)
+            if on_chunk:
+                on_chunk(chunk_results)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Lead batch chunk error: {e}")
+            for index in chunk:
+                results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+
+    # Point duplicates at the lead they were merged into
+    for index, result in enumerate(results):
+        if result['status'] == 'duplicate':
+            merged = results[last_index[payloads[index]['email']]]
+            result['id'] = merged.get('id')
+            result['email'] = payloads[index]['email']
+
+    return results
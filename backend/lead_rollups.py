@@ -0,0 +1,170 @@
+"""
+Lead Daily Rollups
+Maintains lead_daily_stats (day x status x source x campaign x device x
+investment) with database triggers, so every write to the lead table -
+ORM updates, upserts and batch inserts alike - adjusts the rollup in the
+same transaction. Analytics can then read rollups instead of scanning leads.
+
+Usage:
+  python lead_rollups.py rebuild   - Recompute rollups from the lead table (backfill)
+"""
+
+# Rollup dimensions; NULLs are stored as '' so they can be part of the unique key
+DIMENSIONS = ['status', 'source', 'utm_campaign', 'device_type', 'investment']
+
+MEASURES = [
+    'lead_count',
+    'conversion_value_sum',
+    'quality_positive_sum',
+    'quality_positive_count',
+    'high_quality_count',
+    'medium_quality_count',
+    'low_quality_count'
+]
+
+KEY_COLUMNS = ['day'] + DIMENSIONS
+
+
+def _row_values(row, sign, day_expression):
+    """SQL expressions for one lead row's contribution (+1 or -1)"""
+    q = f'{row}.quality_score'
+    return [day_expression.format(row=row)] + [
+        f"COALESCE({row}.{dimension}, '')" for dimension in DIMENSIONS
+    ] + [
+        f'{sign}1',
+        f'{sign}COALESCE({row}.conversion_value, 0)',
+        f'{sign}(CASE WHEN {q} > 0 THEN {q} ELSE 0 END)',
+        f'{sign}(CASE WHEN {q} > 0 THEN 1 ELSE 0 END)',
+        f'{sign}(CASE WHEN {q} >= 70 THEN 1 ELSE 0 END)',
+        f'{sign}(CASE WHEN {q} >= 40 AND {q} < 70 THEN 1 ELSE 0 END)',
+        f'{sign}(CASE WHEN {q} < 40 THEN 1 ELSE 0 END)'
+    ]
+
+
+def _apply_sql(row, sign, day_expression):
+    """Upsert that adds one row's contribution into lead_daily_stats"""
+    columns = KEY_COLUMNS + MEASURES
+    return (
+        f"INSERT INTO lead_daily_stats ({', '.join(columns)}) "
+        f"VALUES ({', '.join(_row_values(row, sign, day_expression))}) "
+        f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET "
+        + ', '.join(f'{m} = lead_daily_stats.{m} + excluded.{m}' for m in MEASURES)
+    )
+
+
+def _changed_condition():
+    tracked = DIMENSIONS + ['created_at', 'conversion_value', 'quality_score']
+    return ' OR '.join(f'OLD.{c} IS NOT NEW.{c}' for c in tracked)
+
+
+def sqlite_trigger_statements():
+    day = "COALESCE(date({row}.created_at), date('now'))"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS lead_daily_stats_insert AFTER INSERT ON lead BEGIN "
+        f"{_apply_sql('NEW', '', day)}; END",
+        f"CREATE TRIGGER IF NOT EXISTS lead_daily_stats_delete AFTER DELETE ON lead BEGIN "
+        f"{_apply_sql('OLD', '-', day)}; END",
+        f"CREATE TRIGGER IF NOT EXISTS lead_daily_stats_update AFTER UPDATE ON lead "
+        f"WHEN {_changed_condition()} BEGIN "
+        f"{_apply_sql('OLD', '-', day)}; {_apply_sql('NEW', '', day)}; END"
+    ]
+
+
+def postgresql_trigger_statements():
+    day = "COALESCE({row}.created_at::date, CURRENT_DATE)"
+    changed = _changed_condition().replace(' IS NOT ', ' IS DISTINCT FROM ')
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION lead_daily_stats_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NOT ({changed}) THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                {_apply_sql('OLD', '-', day)};
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                {_apply_sql('NEW', '', day)};
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS lead_daily_stats_sync ON lead",
+        "CREATE TRIGGER lead_daily_stats_sync AFTER INSERT OR UPDATE OR DELETE ON lead "
+        "FOR EACH ROW EXECUTE FUNCTION lead_daily_stats_sync()"
+    ]
+
+
+def _triggers_installed(db, dialect):
+    if dialect == 'postgresql':
+        sql = "SELECT 1 FROM pg_trigger WHERE tgname = 'lead_daily_stats_sync'"
+    else:
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'lead_daily_stats_insert'"
+    return db.session.execute(db.text(sql)).first() is not None
+
+
+def install_rollups(db):
+    """Create the rollup triggers; backfills the first time they are installed"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statements = postgresql_trigger_statements()
+    elif dialect == 'sqlite':
+        statements = sqlite_trigger_statements()
+    else:
+        print(f"⚠️  Lead rollups not supported on {dialect}")
+        return False
+
+    first_install = not _triggers_installed(db, dialect)
+    for statement in statements:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+
+    if first_install:
+        rebuilt = rebuild_rollups(db)
+        print(f"✅ Lead rollup triggers installed ({rebuilt} rollup rows backfilled)")
+    return True
+
+
+def rebuild_rollups(db):
+    """Recompute lead_daily_stats from scratch; returns the number of rollup rows"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Block lead writes so triggers cannot race the recompute
+        db.session.execute(db.text('LOCK TABLE lead IN SHARE MODE'))
+        day = 'COALESCE(created_at::date, CURRENT_DATE)'
+    else:
+        day = "COALESCE(date(created_at), date('now'))"
+
+    dimensions = [f"COALESCE({d}, '')" for d in DIMENSIONS]
+    db.session.execute(db.text('DELETE FROM lead_daily_stats'))
+    db.session.execute(db.text(
+        f"INSERT INTO lead_daily_stats ({', '.join(KEY_COLUMNS + MEASURES)}) "
+        f"SELECT {day}, {', '.join(dimensions)}, "
+        "COUNT(*), "
+        "COALESCE(SUM(conversion_value), 0), "
+        "SUM(CASE WHEN quality_score > 0 THEN quality_score ELSE 0 END), "
+        "SUM(CASE WHEN quality_score > 0 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN quality_score >= 70 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN quality_score >= 40 AND quality_score < 70 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN quality_score < 40 THEN 1 ELSE 0 END) "
+        f"FROM lead GROUP BY {day}, {', '.join(dimensions)}"
+    ))
+    count = db.session.execute(db.text('SELECT COUNT(*) FROM lead_daily_stats')).scalar()
+    db.session.commit()
+    return count
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        from app import app, db
+        with app.app_context():
+            db.create_all()
+            install_rollups(db)
+            rows = rebuild_rollups(db)
+            print(f"✅ Rebuilt lead_daily_stats: {rows} rollup rows")
+    else:
+        print("Usage:")
+        print("  python lead_rollups.py rebuild   - Recompute rollups from the lead table")
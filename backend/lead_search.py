@@ -0,0 +1,184 @@
+"""
+Lead Search Index
+Indexed substring and full-text search for the admin lead search box.
+
+SQLite: an FTS5 table with the trigram tokenizer (substring matching),
+kept in sync with the lead table by triggers.
+PostgreSQL: pg_trgm and tsvector expression indexes on the lead table,
+which the database keeps in sync on its own.
+
+Usage:
+  python lead_search.py rebuild   - Rebuild the search index from the lead table
+"""
+
+import re
+
+from sqlalchemy import Float, Integer, literal_column
+
+# Trigram matching needs at least three characters; shorter terms use LIKE
+MIN_INDEXED_TERM_LENGTH = 3
+
+# SQLite has no regexp_replace; strip the usual phone punctuation instead
+SQLITE_PHONE_DIGITS = (
+    "replace(replace(replace(replace(replace(replace(replace("
+    "COALESCE({row}.phone, ''), '+', ''), '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '/', '')"
+)
+
+SQLITE_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS lead_search USING fts5("
+    "first_name, last_name, email, phone, phone_digits, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS lead_search_insert AFTER INSERT ON lead BEGIN "
+    "INSERT INTO lead_search (rowid, first_name, last_name, email, phone, phone_digits) "
+    f"VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.email, NEW.phone, {SQLITE_PHONE_DIGITS.format(row='NEW')}); END",
+    "CREATE TRIGGER IF NOT EXISTS lead_search_delete AFTER DELETE ON lead BEGIN "
+    "DELETE FROM lead_search WHERE rowid = OLD.id; END",
+    "CREATE TRIGGER IF NOT EXISTS lead_search_update AFTER UPDATE OF first_name, last_name, email, phone ON lead "
+    "BEGIN DELETE FROM lead_search WHERE rowid = OLD.id; "
+    "INSERT INTO lead_search (rowid, first_name, last_name, email, phone, phone_digits) "
+    f"VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.email, NEW.phone, {SQLITE_PHONE_DIGITS.format(row='NEW')}); END"
+]
+
+# Indexed expressions; queries must use exactly the same text to hit the indexes
+PG_SEARCH_TEXT = (
+    "lower(COALESCE(first_name, '') || ' ' || COALESCE(last_name, '') || ' ' || "
+    "COALESCE(email, '') || ' ' || COALESCE(phone, '') || ' ' || "
+    "regexp_replace(COALESCE(phone, ''), '[^0-9]', '', 'g'))"
+)
+PG_SEARCH_VECTOR = (
+    "to_tsvector('simple', COALESCE(first_name, '') || ' ' || COALESCE(last_name, '') || ' ' || "
+    "COALESCE(email, ''))"
+)
+
+POSTGRESQL_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_lead_search_trgm ON lead USING gin (({PG_SEARCH_TEXT}) gin_trgm_ops)",
+    f"CREATE INDEX IF NOT EXISTS ix_lead_search_tsv ON lead USING gin ({PG_SEARCH_VECTOR})"
+]
+
+# Per-process memo of whether the index exists, keyed by database URL
+_index_available = {}
+
+
+def _dialect(db):
+    return db.session.get_bind().dialect.name
+
+
+def _index_exists(db):
+    if _dialect(db) == 'postgresql':
+        sql = "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_lead_search_trgm'"
+    else:
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lead_search'"
+    return db.session.execute(db.text(sql)).first() is not None
+
+
+def search_index_available(db):
+    key = str(db.session.get_bind().url)
+    if key not in _index_available:
+        try:
+            _index_available[key] = _dialect(db) in ('sqlite', 'postgresql') and _index_exists(db)
+        except Exception:
+            db.session.rollback()
+            _index_available[key] = False
+    return _index_available[key]
+
+
+def install_search_index(db):
+    """Create the search index (and sync triggers); builds it the first time"""
+    dialect = _dialect(db)
+    if dialect not in ('sqlite', 'postgresql'):
+        print(f"⚠️  Lead search index not supported on {dialect}; using LIKE search")
+        return False
+
+    first_install = not _index_exists(db)
+    try:
+        for statement in (POSTGRESQL_STATEMENTS if dialect == 'postgresql' else SQLITE_STATEMENTS):
+            db.session.execute(db.text(statement))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️  Lead search index unavailable ({e}); using LIKE search")
+        return False
+
+    if first_install and dialect == 'sqlite':
+        rows = rebuild_search_index(db)
+        print(f"✅ Lead search index created ({rows} leads indexed)")
+    _index_available.pop(str(db.session.get_bind().url), None)
+    return True
+
+
+def rebuild_search_index(db):
+    """Repopulate (SQLite) or reindex (PostgreSQL) the search index"""
+    if _dialect(db) == 'postgresql':
+        db.session.execute(db.text('REINDEX INDEX ix_lead_search_trgm'))
+        db.session.execute(db.text('REINDEX INDEX ix_lead_search_tsv'))
+        db.session.commit()
+        return db.session.execute(db.text('SELECT COUNT(*) FROM lead')).scalar()
+
+    db.session.execute(db.text('DELETE FROM lead_search'))
+    db.session.execute(db.text(
+        "INSERT INTO lead_search (rowid, first_name, last_name, email, phone, phone_digits) "
+        f"SELECT id, first_name, last_name, email, phone, {SQLITE_PHONE_DIGITS.format(row='lead')} FROM lead"
+    ))
+    db.session.commit()
+    return db.session.execute(db.text('SELECT COUNT(*) FROM lead_search')).scalar()
+
+
+def _like_filter(db, Lead, term):
+    search_filter = f"%{term}%"
+    return db.or_(
+        Lead.first_name.like(search_filter),
+        Lead.last_name.like(search_filter),
+        Lead.email.like(search_filter),
+        Lead.phone.like(search_filter)
+    )
+
+
+def apply_lead_search(db, Lead, query, term):
+    """
+    Restrict query to leads matching term.
+    Returns (query, rank) where rank is an ORDER BY expression (best first),
+    or None when the unindexed LIKE fallback was used.
+    """
+    term = term.strip()
+    digits = re.sub(r'\D', '', term)
+    if len(term) < MIN_INDEXED_TERM_LENGTH or not search_index_available(db):
+        return query.filter(_like_filter(db, Lead, term)), None
+
+    if _dialect(db) == 'postgresql':
+        search_text = literal_column(PG_SEARCH_TEXT)
+        search_vector = literal_column(PG_SEARCH_VECTOR)
+        ts_query = db.func.plainto_tsquery('simple', term)
+        matches = search_text.like(f"%{term.lower()}%") | search_vector.op('@@')(ts_query)
+        if len(digits) >= MIN_INDEXED_TERM_LENGTH and digits != term:
+            matches = matches | search_text.like(f"%{digits}%")
+        rank = db.func.greatest(
+            db.func.similarity(search_text, term.lower()),
+            db.func.ts_rank(search_vector, ts_query)
+        ).desc()
+        return query.filter(matches), rank
+
+    # FTS5 phrase query; the trigram tokenizer matches it as a substring
+    match = '"' + term.replace('"', '""') + '"'
+    if len(digits) >= MIN_INDEXED_TERM_LENGTH and digits != term:
+        match += f' OR phone_digits : "{digits}"'
+    hits = db.text(
+        "SELECT rowid AS lead_id, bm25(lead_search) AS rank FROM lead_search WHERE lead_search MATCH :match"
+    ).bindparams(match=match).columns(lead_id=Integer, rank=Float).subquery('lead_search_hits')
+    query = query.join(hits, hits.c.lead_id == Lead.id)
+    # bm25() is lower for better matches
+    return query, hits.c.rank.asc()
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        from app import app, db
+        with app.app_context():
+            db.create_all()
+            install_search_index(db)
+            rows = rebuild_search_index(db)
+            print(f"✅ Rebuilt lead search index: {rows} leads")
+    else:
+        print("Usage:")
+        print("  python lead_search.py rebuild   - Rebuild the search index from the lead table")
@@ -0,0 +1,377 @@
+"""
+CRM Delivery Outbox
+Durable queue of CRM deliveries, written in the same transaction as the
+lead/contact row and drained by a pool of background workers.
+
+Integrations with a bulk API are micro-batched: their fresh rows wait up to
+CRM_BATCH_WINDOW_MS (or until CRM_BATCH_MAX_SIZE rows are pending) and are
+then delivered together with one deliver_batch call.
+"""
+
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, or_, update
+
+# Worker configuration - Set these in environment variables
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', 2))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 20))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 2.0))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+OUTBOX_BACKOFF_BASE = float(os.getenv('OUTBOX_BACKOFF_BASE', 5.0))
+OUTBOX_BACKOFF_MAX = float(os.getenv('OUTBOX_BACKOFF_MAX', 3600.0))
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', 300))
+CRM_BATCH_WINDOW_MS = int(os.getenv('CRM_BATCH_WINDOW_MS', 250))
+CRM_BATCH_MAX_SIZE = int(os.getenv('CRM_BATCH_MAX_SIZE', 100))
+
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_DELIVERED = 'delivered'
+STATUS_DEAD = 'dead'
+STATUS_CANCELLED = 'cancelled'
+
+
+class DeliveryDeferred(Exception):
+    """
+    Raised by a deliver callable when the target cannot take the message right
+    now (circuit open, rate limited). The row is rescheduled after delay
+    seconds without using up one of its attempts.
+    """
+
+    def __init__(self, message, delay):
+        super().__init__(message)
+        self.delay = max(0.0, float(delay))
+
+
+def enqueue_deliveries(db, Outbox, integrations, entity_type, entity_id):
+    """Add one outbox row per integration to the current session (caller commits)"""
+    now = datetime.utcnow()
+    messages = []
+    for integration in integrations:
+        message = Outbox(
+            integration_id=integration.id,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            status=STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=now
+        )
+        db.session.add(message)
+        messages.append(message)
+    return messages
+
+
+def enqueue_deliveries_bulk(db, Outbox, integrations, entity_type, entity_ids):
+    """Insert outbox rows for many entities in one statement (caller commits)"""
+    now = datetime.utcnow()
+    rows = [
+        {
+            'integration_id': integration.id,
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'status': STATUS_PENDING,
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now,
+            'updated_at': now
+        }
+        for entity_id in entity_ids
+        for integration in integrations
+    ]
+    if rows:
+        db.session.execute(insert(Outbox), rows)
+    return len(rows)
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(OUTBOX_BACKOFF_BASE * (2 ** max(attempts - 1, 0)), OUTBOX_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class OutboxWorkerPool:
+    """
+    Background threads that claim due outbox rows and deliver them.
+
+    deliver(message, integration) delivers one row. For integrations where
+    batchable(integration) is true, deliver_batch(messages, integration) is
+    used instead; it returns {message_id: exception} for the rows that failed
+    (rows missing from the result were delivered), so each row is settled on
+    its own.
+    """
+
+    def __init__(self, app, db, Outbox, Integration, deliver, num_workers=None,
+                 deliver_batch=None, batchable=None):
+        self.app = app
+        self.db = db
+        self.Outbox = Outbox
+        self.Integration = Integration
+        self.deliver = deliver
+        self.deliver_batch = deliver_batch
+        self.batchable = batchable
+        self.num_workers = OUTBOX_WORKERS if num_workers is None else num_workers
+        self._hold_seconds = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def ensure_started(self):
+        """Start the worker threads once per process (safe to call after fork)"""
+        if self.num_workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = []
+            for i in range(self.num_workers):
+                thread = threading.Thread(
+                    target=self._run, name=f'outbox-worker-{i}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            print(f"✅ Outbox workers started: {self.num_workers}")
+
+    def wake(self):
+        """Signal idle workers that new rows were committed"""
+        self.ensure_started()
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def run_forever(self):
+        """Drain the outbox in the foreground (dedicated worker process)"""
+        print("✅ Outbox worker running in foreground")
+        self._run()
+
+    def _run(self):
+        while not self._stop.is_set():
+            processed = 0
+            try:
+                with self.app.app_context():
+                    processed = self.process_due()
+            except Exception as e:
+                print(f"Outbox worker error: {e}")
+            if not processed:
+                # Rows held in an aggregation window become due sooner than the poll interval
+                hold = self._hold_seconds
+                self._wakeup.wait(OUTBOX_POLL_INTERVAL if hold is None else min(hold, OUTBOX_POLL_INTERVAL))
+                self._wakeup.clear()
+
+    def process_due(self):
+        """Claim and deliver one batch of due rows; returns the number processed"""
+        claimed = self._claim_batch()
+        if not claimed:
+            return 0
+
+        batch_ids = set(self._batchable_integration_ids())
+        groups = {}
+        singles = []
+        for message_id, integration_id, entity_type in claimed:
+            if integration_id in batch_ids and entity_type == 'lead':
+                groups.setdefault(integration_id, []).append(message_id)
+            else:
+                singles.append(message_id)
+
+        for integration_id, message_ids in groups.items():
+            for start in range(0, len(message_ids), CRM_BATCH_MAX_SIZE):
+                self._process_batch(integration_id, message_ids[start:start + CRM_BATCH_MAX_SIZE])
+        for message_id in singles:
+            self._process(message_id)
+        return len(claimed)
+
+    def _batchable_integration_ids(self):
+        if self.deliver_batch is None or self.batchable is None:
+            return []
+        integrations = self.db.session.query(self.Integration).filter_by(is_active=True).all()
+        return [integration.id for integration in integrations if self.batchable(integration)]
+
+    def _claim_batch(self):
+        db, Outbox = self.db, self.Outbox
+        now = datetime.utcnow()
+        due = or_(
+            Outbox.status == STATUS_PENDING,
+            Outbox.status == STATUS_PROCESSING  # lease expired: worker died mid-delivery
+        )
+        eligible = due & (Outbox.next_attempt_at <= now)
+        limit = OUTBOX_BATCH_SIZE
+
+        self._hold_seconds = None
+        batch_ids = self._batchable_integration_ids()
+        if batch_ids and CRM_BATCH_WINDOW_MS > 0:
+            # Room for a full batch per bulk integration
+            limit = max(OUTBOX_BATCH_SIZE, CRM_BATCH_MAX_SIZE * len(batch_ids))
+            # First attempts for bulk integrations wait for their window to fill,
+            # unless a full batch is already pending
+            window_start = now - timedelta(milliseconds=CRM_BATCH_WINDOW_MS)
+            fresh = eligible & (Outbox.attempts == 0) & Outbox.integration_id.in_(batch_ids)
+            pending = db.session.query(
+                Outbox.integration_id, func.count(Outbox.id), func.min(Outbox.created_at)
+            ).filter(fresh).group_by(Outbox.integration_id).all()
+            holding = []
+            for integration_id, count, oldest in pending:
+                if count < CRM_BATCH_MAX_SIZE and oldest > window_start:
+                    holding.append(integration_id)
+                    hold = (oldest - window_start).total_seconds()
+                    self._hold_seconds = hold if self._hold_seconds is None else min(self._hold_seconds, hold)
+            if holding:
+                eligible = eligible & ~(
+                    Outbox.integration_id.in_(holding) & (Outbox.attempts == 0) & (Outbox.created_at > window_start)
+                )
+
+        candidates = [
+            message_id for (message_id,) in db.session.query(Outbox.id).filter(eligible)
+            .order_by(Outbox.next_attempt_at).limit(limit).all()
+        ]
+        if not candidates:
+            db.session.commit()
+            return []
+
+        # One conditional update so concurrent workers never claim the same row
+        lease_until = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        claimed = db.session.execute(
+            update(Outbox)
+            .where(Outbox.id.in_(candidates), due, Outbox.next_attempt_at <= now)
+            .values(status=STATUS_PROCESSING, next_attempt_at=lease_until, updated_at=now)
+            .returning(Outbox.id, Outbox.integration_id, Outbox.entity_type)
+        ).all()
+        db.session.commit()
+        position = {message_id: i for i, message_id in enumerate(candidates)}
+        return sorted(claimed, key=lambda row: position[row[0]])
+
+    def _process_batch(self, integration_id, message_ids):
+        db = self.db
+        integration = db.session.get(self.Integration, integration_id)
+        messages = db.session.query(self.Outbox).filter(self.Outbox.id.in_(message_ids)).all()
+        if integration is None or not integration.is_active:
+            for message in messages:
+                message.status = STATUS_CANCELLED
+                message.last_error = 'Integration removed or inactive'
+                message.updated_at = datetime.utcnow()
+            db.session.commit()
+            return
+
+        try:
+            outcomes = self.deliver_batch(messages, integration)
+        except Exception as e:
+            outcomes = {message_id: e for message_id in message_ids}
+        db.session.rollback()
+
+        delivered = []
+        for message_id in message_ids:
+            error = outcomes.get(message_id)
+            if isinstance(error, DeliveryDeferred):
+                self.defer(message_id, error)
+            elif error is not None:
+                self.record_failure(message_id, error)
+            else:
+                delivered.append(message_id)
+        if delivered:
+            now = datetime.utcnow()
+            db.session.execute(
+                update(self.Outbox)
+                .where(self.Outbox.id.in_(delivered))
+                .values(status=STATUS_DELIVERED, delivered_at=now, updated_at=now, last_error=None)
+            )
+            db.session.commit()
+
+    def _process(self, message_id):
+        db = self.db
+        message = db.session.get(self.Outbox, message_id)
+        if message is None:
+            return
+        integration = db.session.get(self.Integration, message.integration_id)
+        if integration is None or not integration.is_active:
+            message.status = STATUS_CANCELLED
+            message.last_error = 'Integration removed or inactive'
+            message.updated_at = datetime.utcnow()
+            db.session.commit()
+            return
+
+        try:
+            self.deliver(message, integration)
+        except DeliveryDeferred as e:
+            db.session.rollback()
+            self.defer(message_id, e)
+            return
+        except Exception as e:
+            db.session.rollback()
+            self.record_failure(message_id, e)
+            return
+
+        message.status = STATUS_DELIVERED
+        message.delivered_at = datetime.utcnow()
+        message.updated_at = message.delivered_at
+        message.last_error = None
+        db.session.commit()
+
+    def defer(self, message_id, deferral):
+        """Put a row back to pending after deferral.delay, keeping its attempt count"""
+        db = self.db
+        message = db.session.get(self.Outbox, message_id)
+        now = datetime.utcnow()
+        message.status = STATUS_PENDING
+        message.next_attempt_at = now + timedelta(seconds=deferral.delay)
+        message.last_error = str(deferral)[:2000]
+        message.updated_at = now
+        db.session.commit()
+
+    def record_failure(self, message_id, error):
+        """Reschedule a failed row with backoff, or dead-letter it"""
+        db = self.db
+        message = db.session.get(self.Outbox, message_id)
+        now = datetime.utcnow()
+        message.attempts = (message.attempts or 0) + 1
+        message.last_error = str(error)[:2000]
+        message.updated_at = now
+        if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+            message.status = STATUS_DEAD
+            print(f"❌ Outbox message {message.id} dead-lettered after {message.attempts} attempts: {error}")
+        else:
+            message.status = STATUS_PENDING
+            message.next_attempt_at = now + timedelta(seconds=backoff_delay(message.attempts))
+            print(f"⚠️  Outbox message {message.id} attempt {message.attempts} failed: {error}")
+        db.session.commit()
+
+
+def get_outbox_stats(db, Outbox):
+    """Row counts per status plus the age of the oldest pending row"""
+    counts = dict(
+        db.session.query(Outbox.status, func.count(Outbox.id)).group_by(Outbox.status).all()
+    )
+    oldest_pending = db.session.query(func.min(Outbox.created_at)).filter(
+        Outbox.status.in_([STATUS_PENDING, STATUS_PROCESSING])
+    ).scalar()
+    return {
+        'status': counts,
+        'oldest_pending_seconds': round((datetime.utcnow() - oldest_pending).total_seconds(), 1)
+        if oldest_pending else 0,
+        'workers': OUTBOX_WORKERS,
+        'max_attempts': OUTBOX_MAX_ATTEMPTS
+    }
+
+
+def retry_dead_letters(db, Outbox):
+    """Move dead-lettered rows back to pending; returns the number requeued"""
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(Outbox)
+        .where(Outbox.status == STATUS_DEAD)
+        .values(status=STATUS_PENDING, attempts=0, next_attempt_at=now, updated_at=now)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+if __name__ == '__main__':
+    # Dedicated worker process: OUTBOX_WORKERS=0 on the web service,
+    # then run `python outbox.py` as a separate worker service.
+    from app import outbox_pool
+    outbox_pool.run_forever()
@@ -0,0 +1,44 @@
+"""
+Keyset Pagination Helpers
+Opaque cursors for paging through large result sets without OFFSET
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+
+LEADS_DEFAULT_PER_PAGE = int(os.getenv('LEADS_DEFAULT_PER_PAGE', 50))
+LEADS_MAX_PER_PAGE = int(os.getenv('LEADS_MAX_PER_PAGE', 200))
+
+
+def clamp_per_page(per_page, default=LEADS_DEFAULT_PER_PAGE, maximum=LEADS_MAX_PER_PAGE):
+    """Bound a client-supplied page size to [1, maximum]"""
+    if per_page is None:
+        return default
+    return max(1, min(per_page, maximum))
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque token for the position (created_at, id)"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; raises ValueError for malformed tokens"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def after_cursor_desc(created_column, id_column, cursor):
+    """Rows strictly after cursor when ordered by (created_at DESC, id DESC)"""
+    created_at, row_id = cursor
+    # The leading range predicate lets the (created_at, id) index bound the scan
+    return (created_column <= created_at) & (
+        (created_column < created_at) | (id_column < row_id)
+    )
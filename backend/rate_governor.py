@@ -0,0 +1,242 @@
+"""
+CRM Rate Governor
+Token bucket per CRM integration that paces outbound calls to the rate the
+CRM allows instead of bursting into 429s. Limits come from the integration's
+settings JSON, falling back to per-CRM defaults:
+
+    {"rate_limit": {"per_second": 10, "burst": 10, "max_wait_seconds": 5}}
+
+Responses feed back into the bucket: rate-limit headers cap the tokens to
+the CRM's remaining budget, and a 429 (or an exhausted budget) pauses the
+integration until the CRM's reset time. A call that would have to wait
+longer than max_wait_seconds raises RateLimited, which the outbox turns
+into a reschedule that does not use up a delivery attempt.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from outbox import DeliveryDeferred
+
+CRM_RATE_MAX_WAIT_SECONDS = float(os.getenv('CRM_RATE_MAX_WAIT_SECONDS', 5))
+CRM_RATE_MAX_PAUSE_SECONDS = float(os.getenv('CRM_RATE_MAX_PAUSE_SECONDS', 3600))
+# Used for integrations without their own limit or a CRM default (0 = unlimited)
+CRM_RATE_DEFAULT_PER_SECOND = float(os.getenv('CRM_RATE_DEFAULT_PER_SECOND', 0))
+
+# Published limits, kept a little under the documented ceilings
+CRM_RATE_DEFAULTS = {
+    'hubspot': {'per_second': 9, 'burst': 10},     # 100 requests / 10 s
+    'pipedrive': {'per_second': 20, 'burst': 40},  # 80 requests / 2 s
+    'salesforce': {'per_second': 20, 'burst': 25}  # 25 concurrent long-running calls
+}
+
+
+class RateLimited(DeliveryDeferred):
+    """The integration's rate budget is spent for longer than a caller may wait"""
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def limits_for(integration):
+    """(per_second, burst, max_wait_seconds) for an integration; per_second 0 means unlimited"""
+    try:
+        settings = json.loads(integration.settings or '{}')
+    except ValueError:
+        settings = {}
+    limit = settings.get('rate_limit') if isinstance(settings, dict) else None
+    if not isinstance(limit, dict):
+        limit = CRM_RATE_DEFAULTS.get((integration.name or '').lower(), {})
+
+    per_second = _number(limit.get('per_second'))
+    if per_second is None or per_second < 0:
+        per_second = CRM_RATE_DEFAULT_PER_SECOND
+    burst = _number(limit.get('burst'))
+    if burst is None or burst < 1:
+        burst = max(1.0, per_second)
+    max_wait = _number(limit.get('max_wait_seconds'))
+    if max_wait is None or max_wait < 0:
+        max_wait = CRM_RATE_MAX_WAIT_SECONDS
+    return per_second, burst, max_wait
+
+
+def _reset_seconds(value, now=None):
+    """Seconds until a reset header value: delta seconds, epoch seconds or an HTTP date"""
+    if value is None:
+        return None
+    seconds = _number(value)
+    if seconds is None:
+        try:
+            reset_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if reset_at.tzinfo is None:
+            reset_at = reset_at.replace(tzinfo=timezone.utc)
+        seconds = (reset_at - datetime.now(timezone.utc)).total_seconds()
+    elif seconds > 1e9:
+        seconds -= now if now is not None else time.time()
+    return max(0.0, min(seconds, CRM_RATE_MAX_PAUSE_SECONDS))
+
+
+def read_rate_headers(headers):
+    """
+    (remaining, reset_seconds) from the rate-limit headers the CRMs send
+    (HubSpot X-HubSpot-RateLimit-*, Pipedrive X-RateLimit-*, IETF RateLimit-*);
+    either may be None
+    """
+    remaining = None
+    reset = None
+    secondly = _number(headers.get('X-HubSpot-RateLimit-Secondly-Remaining'))
+    if secondly is not None and secondly <= 0:
+        remaining, reset = 0, 1.0
+    for name in ('X-HubSpot-RateLimit-Remaining', 'X-RateLimit-Remaining', 'RateLimit-Remaining'):
+        value = _number(headers.get(name))
+        if value is not None:
+            remaining = value if remaining is None else min(remaining, value)
+            break
+    if reset is None:
+        reset = _reset_seconds(headers.get('X-RateLimit-Reset') or headers.get('RateLimit-Reset'))
+    if reset is None:
+        interval = _number(headers.get('X-HubSpot-RateLimit-Interval-Milliseconds'))
+        if interval is not None:
+            # HubSpot only reports the window length; waiting one window is always enough
+            reset = min(interval / 1000.0, CRM_RATE_MAX_PAUSE_SECONDS)
+    return remaining, reset
+
+
+class TokenBucket:
+    """
+    Tokens refill at per_second up to burst; each call takes one. Reservations
+    may drive the balance negative, which queues later callers behind them
+    """
+
+    def __init__(self, name, per_second, burst, max_wait):
+        self.name = name
+        self.counters = {'calls': 0, 'delayed': 0, 'deferred': 0, 'throttled': 0}
+        self.waited_seconds = 0.0
+        self.server_remaining = None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.configure(per_second, burst, max_wait)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+
+    def configure(self, per_second, burst, max_wait):
+        self.per_second = per_second
+        self.burst = burst
+        self.max_wait = max_wait
+
+    def _refill(self, now):
+        if now > self._updated:
+            if self.per_second:
+                self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.per_second)
+            self._updated = now
+
+    def reserve(self):
+        """Take a token and return how long to sleep before using it; raises RateLimited"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self._paused_until - now)
+            if self.per_second:
+                # Refill resumes at the end of a pause (_updated is moved there)
+                start = max(now, self._updated)
+                wait = max(wait, start - now + max(0.0, 1 - self.tokens) / self.per_second)
+            if wait > self.max_wait:
+                self.counters['deferred'] += 1
+                raise RateLimited(f'Rate limit for {self.name}: next slot in {wait:.1f}s', delay=wait)
+            if self.per_second:
+                self.tokens -= 1
+            self.counters['calls'] += 1
+            if wait > 0:
+                self.counters['delayed'] += 1
+                self.waited_seconds += wait
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every call for seconds (the CRM told us its budget is spent)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self.tokens = min(self.tokens, 0.0)
+                self._updated = max(self._updated, until)
+
+    def observe(self, response):
+        """Adapt to the response's rate-limit headers; raises RateLimited on 429"""
+        remaining, reset = read_rate_headers(response.headers)
+        if remaining is not None:
+            self.server_remaining = remaining
+        if response.status_code == 429:
+            with self._lock:
+                self.counters['throttled'] += 1
+            retry_after = _reset_seconds(response.headers.get('Retry-After'))
+            delay = retry_after if retry_after is not None else reset
+            if delay is None:
+                delay = 1.0 / self.per_second if self.per_second else 1.0
+            self.pause(delay)
+            print(f"⏳ {self.name} rate limited (429); pausing {delay:.1f}s")
+            raise RateLimited(f'{self.name} returned 429 Too Many Requests', delay=delay)
+        if remaining is not None:
+            if remaining <= 0:
+                self.pause(reset if reset is not None else 1.0)
+            else:
+                with self._lock:
+                    self.tokens = min(self.tokens, remaining)
+        return response
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return dict(
+                self.counters,
+                per_second=self.per_second or None,
+                burst=self.burst,
+                max_wait_seconds=self.max_wait,
+                tokens=round(self.tokens, 2) if self.per_second else None,
+                paused_for_seconds=round(max(0.0, self._paused_until - now), 1),
+                waited_seconds=round(self.waited_seconds, 1),
+                server_remaining=self.server_remaining
+            )
+
+
+class RateGovernor:
+    """Token bucket per CRM integration id (per process)"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get(self, integration):
+        """Bucket for the integration, reconfigured if its settings changed"""
+        limits = limits_for(integration)
+        bucket = self._buckets.get(integration.id)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(
+                    integration.id, TokenBucket(f'{integration.name} #{integration.id}', *limits)
+                )
+        if (bucket.per_second, bucket.burst, bucket.max_wait) != limits:
+            with bucket._lock:
+                bucket.configure(*limits)
+        return bucket
+
+    def snapshot(self, integration_id):
+        bucket = self._buckets.get(integration_id)
+        return bucket.snapshot() if bucket else None
@@ -0,0 +1,183 @@
+"""
+Salesforce Client
+OAuth access tokens cached per integration (fetched once, reused by every
+worker thread, refreshed before they age out or when Salesforce answers 401)
+and record creation or upsert through the sObject Collections API, 200
+records per call.
+
+An integration is configured with its connected app credentials
+(api_key = consumer key, api_secret = consumer secret) and settings:
+
+    {"login_url": "https://yourdomain.my.salesforce.com",
+     "username": "...", "password": "...",   # optional: password flow
+     "api_version": "v59.0", "company": "Individual",
+     "investment_field": "Investment_Amount__c",
+     "external_id_field": "TradeGPT_Lead_Id__c"}
+
+Without username/password the client credentials flow is used, which needs
+the org's My Domain URL as login_url.
+
+external_id_field names an External ID field on Lead that holds our lead
+id. With it, leads are upserted on that field, so resending a lead (an
+update, or a redelivery after a lost response) updates the Salesforce
+record instead of creating a second one. Without it, leads can only be
+inserted and updates are not sent to Salesforce.
+"""
+
+import json
+import os
+import threading
+import time
+
+SALESFORCE_LOGIN_URL = os.getenv('SALESFORCE_LOGIN_URL', 'https://login.salesforce.com')
+SALESFORCE_API_VERSION = os.getenv('SALESFORCE_API_VERSION', 'v59.0')
+# Salesforce does not return expires_in; refresh ahead of the default 2 hour session timeout
+SALESFORCE_TOKEN_TTL_SECONDS = int(os.getenv('SALESFORCE_TOKEN_TTL_SECONDS', 5400))
+SALESFORCE_HTTP_TIMEOUT = float(os.getenv('SALESFORCE_HTTP_TIMEOUT', 10))
+
+SALESFORCE_COLLECTION_SIZE = 200  # sObject Collections limit per request
+
+
+class SalesforceAuthError(Exception):
+    """The token endpoint rejected the integration's credentials"""
+
+
+def salesforce_config(integration):
+    try:
+        settings = json.loads(integration.settings or '{}')
+    except ValueError:
+        settings = {}
+    if not isinstance(settings, dict):
+        settings = {}
+    return {
+        'login_url': (settings.get('login_url') or SALESFORCE_LOGIN_URL).rstrip('/'),
+        'api_version': settings.get('api_version') or SALESFORCE_API_VERSION,
+        'username': settings.get('username'),
+        'password': settings.get('password'),
+        'company': settings.get('company') or 'Individual',
+        'investment_field': settings.get('investment_field'),
+        'external_id_field': settings.get('external_id_field')
+    }
+
+
+class SalesforceTokenCache:
+    """Access token and instance URL per integration, shared across threads"""
+
+    def __init__(self, http, ttl_seconds=SALESFORCE_TOKEN_TTL_SECONDS):
+        self.http = http
+        self.ttl_seconds = ttl_seconds
+        self._tokens = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def _key(self, integration):
+        # Changing the credentials invalidates the cached token
+        return (integration.id, integration.api_key, integration.api_secret, integration.settings)
+
+    def get(self, integration):
+        """(access_token, instance_url), fetching a new token if none is cached"""
+        key = self._key(integration)
+        cached = self._tokens.get(key)
+        if cached and cached['expires_at'] > time.monotonic():
+            return cached['access_token'], cached['instance_url']
+
+        with self._lock:
+            lock = self._locks.setdefault(integration.id, threading.Lock())
+        with lock:
+            # Another thread may have refreshed while we waited
+            cached = self._tokens.get(key)
+            if cached and cached['expires_at'] > time.monotonic():
+                return cached['access_token'], cached['instance_url']
+            token = self._fetch(integration)
+            for stale in [k for k in self._tokens if k[0] == integration.id]:
+                del self._tokens[stale]
+            self._tokens[key] = token
+            return token['access_token'], token['instance_url']
+
+    def invalidate(self, integration, access_token):
+        """Drop the cached token if it is still the one Salesforce rejected"""
+        key = self._key(integration)
+        cached = self._tokens.get(key)
+        if cached and cached['access_token'] == access_token:
+            self._tokens.pop(key, None)
+
+    def _fetch(self, integration):
+        config = salesforce_config(integration)
+        data = {'client_id': integration.api_key, 'client_secret': integration.api_secret}
+        if config['username']:
+            data.update(grant_type='password', username=config['username'], password=config['password'] or '')
+        else:
+            data['grant_type'] = 'client_credentials'
+
+        response = self.http.post(
+            f"{config['login_url']}/services/oauth2/token", data=data, timeout=SALESFORCE_HTTP_TIMEOUT
+        )
+        if response.status_code != 200:
+            try:
+                detail = response.json().get('error_description') or response.text
+            except ValueError:
+                detail = response.text
+            if response.status_code >= 500:
+                response.raise_for_status()
+            raise SalesforceAuthError(f'Salesforce authentication failed ({response.status_code}): {detail[:200]}')
+
+        body = response.json()
+        self.fetches += 1
+        print(f"🔑 Salesforce token issued for integration #{integration.id}")
+        return {
+            'access_token': body['access_token'],
+            'instance_url': body.get('instance_url', config['login_url']).rstrip('/'),
+            'expires_at': time.monotonic() + self.ttl_seconds
+        }
+
+
+def create_records(post, tokens, integration, sobject, records):
+    """
+    Create records with the sObject Collections API (allOrNone false), in
+    requests of up to 200. post(integration, url, **kwargs) performs the HTTP
+    call and raises for error statuses. Returns one result per record, in
+    order: {'success': bool, 'id': ..., 'errors': [...]}.
+    """
+    return _send_collections(post, tokens, integration, sobject, records, '')
+
+
+def upsert_records(patch, tokens, integration, sobject, external_id_field, records):
+    """
+    Insert or update records matched on external_id_field, which each record
+    must carry, with PATCH .../composite/sobjects/<sobject>/<field>. patch
+    works like post for create_records; results additionally carry
+    'created' (False when an existing record was updated).
+    """
+    return _send_collections(patch, tokens, integration, sobject, records, f'/{sobject}/{external_id_field}')
+
+
+def _send_collections(send, tokens, integration, sobject, records, path):
+    import requests
+
+    config = salesforce_config(integration)
+    results = []
+    for start in range(0, len(records), SALESFORCE_COLLECTION_SIZE):
+        chunk = records[start:start + SALESFORCE_COLLECTION_SIZE]
+        data = {
+            'allOrNone': False,
+            'records': [dict(record, attributes={'type': sobject}) for record in chunk]
+        }
+        for attempt in (1, 2):
+            access_token, instance_url = tokens.get(integration)
+            try:
+                response = send(
+                    integration,
+                    f"{instance_url}/services/data/{config['api_version']}/composite/sobjects{path}",
+                    headers={'Authorization': f'Bearer {access_token}'},
+                    json=data
+                )
+                break
+            except requests.HTTPError as e:
+                # Expired or revoked session: get a new token and retry once
+                if attempt == 1 and e.response is not None and e.response.status_code == 401:
+                    tokens.invalidate(integration, access_token)
+                    continue
+                raise
+        results.extend(response.json())
+    return results
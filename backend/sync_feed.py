@@ -0,0 +1,177 @@
+"""
+Delta Sync Feed
+Change feed for downstream mirrors (BI, CRM): leads and contact submissions
+whose updated_at is past a client watermark, plus tombstones for deleted
+rows, merged into one ordered, page-bounded stream.
+
+Every change has a position (timestamp, source rank, id). The watermark
+handed back to the client is the position of the last change returned, so
+the next call resumes exactly after it.
+"""
+
+import base64
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+
+SYNC_DEFAULT_LIMIT = int(os.getenv('SYNC_DEFAULT_LIMIT', 500))
+SYNC_MAX_LIMIT = int(os.getenv('SYNC_MAX_LIMIT', 5000))
+# Changes newer than the safety lag are held back: a transaction that stamped
+# updated_at earlier but commits later must not land behind a watermark.
+# Default: the database's lock wait limit plus the margin (see safety_lag)
+SYNC_SAFETY_LAG_SECONDS = os.getenv('SYNC_SAFETY_LAG_SECONDS')
+SYNC_LAG_MARGIN_SECONDS = float(os.getenv('SYNC_LAG_MARGIN_SECONDS', 5))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+class WatermarkExpired(Exception):
+    """The watermark predates tombstone retention; the client must resync"""
+
+
+def safety_lag(max_lock_wait=0.0):
+    """
+    Seconds to hold changes back. Writers stamp updated_at after checking
+    out their connection, so what can pass before the commit is lock waits
+    (max_lock_wait, None if unlimited) and the statements themselves
+    (SYNC_LAG_MARGIN_SECONDS). A SYNC_SAFETY_LAG_SECONDS below that is raised.
+    """
+    if max_lock_wait is None:
+        print("⚠️  Database writes can wait for locks without limit; the sync feed can miss "
+              "late commits (set DB_LOCK_TIMEOUT_MS)")
+        max_lock_wait = 0.0
+    required = max_lock_wait + SYNC_LAG_MARGIN_SECONDS
+    if not SYNC_SAFETY_LAG_SECONDS:
+        return required
+    configured = float(SYNC_SAFETY_LAG_SECONDS)
+    if configured < required:
+        print(f"⚠️  SYNC_SAFETY_LAG_SECONDS={configured:g} is shorter than the lock wait limit "
+              f"({max_lock_wait:g}s) plus SYNC_LAG_MARGIN_SECONDS; using {required:g}s")
+        return required
+    return configured
+
+
+def encode_watermark(timestamp, rank, row_id):
+    """Opaque token for the feed position (timestamp, rank, id)"""
+    payload = json.dumps([timestamp.isoformat(), rank, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_watermark(token):
+    """Inverse of encode_watermark; raises ValueError for malformed tokens"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        timestamp, rank, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(rank), int(row_id)
+    except Exception:
+        raise ValueError('Invalid watermark')
+
+
+def _after(ts_column, id_column, rank, watermark):
+    """Rows of the source with this rank that sort after watermark"""
+    timestamp, watermark_rank, row_id = watermark
+    if rank > watermark_rank:
+        return ts_column >= timestamp
+    if rank < watermark_rank:
+        return ts_column > timestamp
+    # The leading range predicate lets the (ts, id) index bound the scan
+    return (ts_column >= timestamp) & ((ts_column > timestamp) | (id_column > row_id))
+
+
+def _source_changes(db, Model, entity_type, rank, watermark, upper, limit):
+    query = db.session.query(Model).filter(Model.updated_at <= upper)
+    if watermark is not None:
+        query = query.filter(_after(Model.updated_at, Model.id, rank, watermark))
+    rows = query.order_by(Model.updated_at, Model.id).limit(limit).all()
+    return [
+        ((row.updated_at, rank, row.id), {
+            'type': entity_type,
+            'op': 'upsert',
+            'id': row.id,
+            'updated_at': row.updated_at.isoformat(),
+            'data': row.to_dict()
+        })
+        for row in rows
+    ]
+
+
+def _tombstone_changes(db, Tombstone, entity_types, rank, watermark, upper, limit):
+    query = db.session.query(Tombstone).filter(
+        Tombstone.deleted_at <= upper, Tombstone.entity_type.in_(entity_types)
+    )
+    if watermark is not None:
+        query = query.filter(_after(Tombstone.deleted_at, Tombstone.id, rank, watermark))
+    rows = query.order_by(Tombstone.deleted_at, Tombstone.id).limit(limit).all()
+    return [
+        ((row.deleted_at, rank, row.id), {
+            'type': row.entity_type,
+            'op': 'delete',
+            'id': row.entity_id,
+            'updated_at': row.deleted_at.isoformat()
+        })
+        for row in rows
+    ]
+
+
+def get_changes(db, sources, Tombstone, since=None, limit=SYNC_DEFAULT_LIMIT, types=None, now=None, lag=None):
+    """
+    One page of changes after the since watermark, optionally restricted to
+    the entity types in types. sources is a list of (entity_type, Model);
+    the list position is the source rank, so it must stay stable between
+    calls (tombstones rank last). lag defaults to safety_lag() without lock
+    waits; callers pass the one computed for their database.
+    """
+    now = now or datetime.utcnow()
+    lag = safety_lag() if lag is None else lag
+    watermark = decode_watermark(since) if since else None
+    if watermark is not None and SYNC_TOMBSTONE_RETENTION_DAYS > 0:
+        if watermark[0] < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS):
+            raise WatermarkExpired('Watermark is older than tombstone retention; full resync required')
+
+    limit = max(1, min(limit, SYNC_MAX_LIMIT))
+    upper = now - timedelta(seconds=lag)
+
+    # Each stream is already ordered; fetching limit + 1 per source is
+    # enough to find the first limit + 1 changes overall
+    selected = [entity_type for entity_type, _ in sources if types is None or entity_type in types]
+    streams = [
+        _source_changes(db, Model, entity_type, rank, watermark, upper, limit + 1)
+        for rank, (entity_type, Model) in enumerate(sources)
+        if entity_type in selected
+    ]
+    streams.append(_tombstone_changes(db, Tombstone, selected, len(sources), watermark, upper, limit + 1))
+    merged = list(heapq.merge(*streams, key=lambda change: change[0]))
+
+    page = merged[:limit]
+    has_more = len(merged) > limit
+    if has_more:
+        next_since = encode_watermark(*page[-1][0])
+    else:
+        # Caught up: everything up to upper has been seen. A rank past the
+        # last source puts the watermark after every change stamped at upper,
+        # and keeps it fresh for quiet tables (tombstone retention check)
+        next_since = encode_watermark(upper, len(sources) + 1, 0)
+    return {
+        'changes': [change for _, change in page],
+        'count': len(page),
+        'has_more': has_more,
+        'next_since': next_since,
+        'until': upper.isoformat()
+    }
+
+
+def record_tombstone(db, Tombstone, entity_type, entity_id):
+    """Add a delete marker to the current session (caller commits with the delete)"""
+    tombstone = Tombstone(entity_type=entity_type, entity_id=entity_id, deleted_at=datetime.utcnow())
+    db.session.add(tombstone)
+    return tombstone
+
+
+def purge_tombstones(db, Tombstone, now=None):
+    """Drop tombstones older than the retention window"""
+    if SYNC_TOMBSTONE_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted = db.session.query(Tombstone).filter(Tombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
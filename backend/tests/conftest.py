@@ -0,0 +1,45 @@
+"""
+Test setup: app.py reads its configuration at import, so point it at a
+throwaway SQLite file without background workers before it is imported.
+Each test gets an empty database file.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='tradegpt-tests-'), 'test.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['OUTBOX_WORKERS'] = '0'
+os.environ['JOB_WORKERS'] = '0'
+
+
+def remove_database(app_module):
+    with app_module.app.app_context():
+        app_module.db.session.remove()
+        app_module.db.engine.dispose()
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+
+
+@pytest.fixture
+def app_module():
+    """app.py on an empty database file (not bootstrapped)"""
+    import app as app_module
+
+    app_module.EMAIL_ENABLED = False
+    remove_database(app_module)
+    yield app_module
+    remove_database(app_module)
+
+
+@pytest.fixture
+def bootstrapped(app_module):
+    app_module.bootstrap_database()
+    return app_module
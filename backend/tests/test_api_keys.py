@@ -0,0 +1,43 @@
+"""X-API-Key access to endpoints that also accept an admin session"""
+
+import pytest
+
+BATCH = [{'firstName': 'Jane', 'lastName': 'Doe', 'email': 'jane@example.com', 'phone': '+15550001111'}]
+
+
+@pytest.mark.parametrize('configured, provided, status', [
+    (None, None, 401),
+    (None, '', 401),
+    ('', '', 401),
+    ('partner-key', None, 401),
+    ('partner-key', 'wrong-key', 401),
+    ('partner-key', 'partner-key-but-longer', 401),
+    ('partner-key', 'pärtner-key', 401),
+    ('partner-key', 'partner-key', 200)
+])
+def test_lead_batch_api_key(bootstrapped, monkeypatch, configured, provided, status):
+    if configured is None:
+        monkeypatch.delenv('LEAD_BATCH_API_KEY', raising=False)
+    else:
+        monkeypatch.setenv('LEAD_BATCH_API_KEY', configured)
+    headers = {} if provided is None else {'X-API-Key': provided}
+
+    response = bootstrapped.app.test_client().post('/api/leads/batch', json=BATCH, headers=headers)
+    assert response.status_code == status
+
+
+@pytest.mark.parametrize('configured, provided, status', [
+    (None, None, 401),
+    ('', '', 401),
+    ('sync-key', 'wrong-key', 401),
+    ('sync-key', 'sync-key', 200)
+])
+def test_sync_feed_api_key(bootstrapped, monkeypatch, configured, provided, status):
+    if configured is None:
+        monkeypatch.delenv('SYNC_API_KEY', raising=False)
+    else:
+        monkeypatch.setenv('SYNC_API_KEY', configured)
+    headers = {} if provided is None else {'X-API-Key': provided}
+
+    response = bootstrapped.app.test_client().get('/api/sync/changes', headers=headers)
+    assert response.status_code == status
@@ -0,0 +1,54 @@
+"""bootstrap_database() records the schema version only when every step succeeded"""
+
+import pytest
+
+import bootstrap
+
+
+def schema_version(app_module):
+    with app_module.app.app_context():
+        return app_module.get_schema_version()
+
+
+def test_bootstrap_records_schema_version(app_module):
+    report = app_module.bootstrap_database()
+
+    assert report['status'] == f'schema v0 -> v{app_module.SCHEMA_VERSION}'
+    assert schema_version(app_module) == app_module.SCHEMA_VERSION
+    assert app_module.bootstrap_database()['status'] == f'schema v{app_module.SCHEMA_VERSION} up to date'
+
+
+def test_failed_step_does_not_record_schema_version(app_module, monkeypatch):
+    def broken_upgrade():
+        raise RuntimeError('index creation failed')
+
+    monkeypatch.setattr(app_module, 'upgrade_schema', broken_upgrade)
+    with pytest.raises(app_module.BootstrapError, match='upgrade_schema'):
+        app_module.bootstrap_database()
+    assert schema_version(app_module) is None
+
+    # The next deploy runs every step again
+    monkeypatch.undo()
+    app_module.bootstrap_database()
+    assert schema_version(app_module) == app_module.SCHEMA_VERSION
+
+
+def test_unavailable_search_index_still_records_schema_version(app_module, monkeypatch):
+    # install_search_index returns False when FTS5 trigram or pg_trgm is missing (LIKE search fallback)
+    monkeypatch.setattr(app_module, 'install_search_index', lambda db: False)
+
+    report = app_module.bootstrap_database()
+
+    assert report['status'] == f'schema v0 -> v{app_module.SCHEMA_VERSION}'
+    assert schema_version(app_module) == app_module.SCHEMA_VERSION
+
+
+def test_bootstrap_script_exits_non_zero_on_failure(app_module, monkeypatch):
+    def broken_rollups(db):
+        raise RuntimeError('trigger creation failed')
+
+    monkeypatch.setattr(app_module, 'install_rollups', broken_rollups)
+    monkeypatch.setattr('sys.argv', ['bootstrap.py'])
+
+    assert bootstrap.main() == 1
+    assert schema_version(app_module) is None
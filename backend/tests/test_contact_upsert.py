@@ -0,0 +1,103 @@
+"""Contact submissions on databases created before contact_submission.email was unique"""
+
+import sqlite3
+
+from conftest import DB_PATH
+
+# contact_submission as created before the unique constraint on email
+LEGACY_CONTACT_TABLE = """
+CREATE TABLE contact_submission (
+    id INTEGER PRIMARY KEY,
+    full_name VARCHAR(200) NOT NULL,
+    email VARCHAR(200) NOT NULL,
+    phone VARCHAR(20) NOT NULL,
+    country VARCHAR(100) NOT NULL,
+    experience VARCHAR(50),
+    message TEXT,
+    source VARCHAR(100),
+    status VARCHAR(50),
+    notes TEXT,
+    created_at DATETIME,
+    updated_at DATETIME
+)
+"""
+
+
+def create_legacy_contacts(rows):
+    """rows: (id, email, updated_at)"""
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(LEGACY_CONTACT_TABLE)
+        conn.executemany(
+            "INSERT INTO contact_submission (id, full_name, email, phone, country, source, status, created_at, updated_at)"
+            " VALUES (?, 'Jane Doe', ?, '+15550001111', 'US', 'education-page', 'new', ?, ?)",
+            [(row_id, email, updated_at, updated_at) for row_id, email, updated_at in rows]
+        )
+    conn.close()
+
+
+def post_contact(app_module, email):
+    return app_module.app.test_client().post('/api/contact', json={
+        'fullName': 'Jane Doe',
+        'email': email,
+        'phone': '+15550002222',
+        'country': 'US'
+    })
+
+
+def contact_rows(app_module):
+    with app_module.app.app_context():
+        return sorted(
+            (row.id, row.email) for row in app_module.db.session.query(app_module.ContactSubmission).all()
+        )
+
+
+def test_bootstrap_keeps_newest_duplicate_and_adds_unique_index(app_module):
+    create_legacy_contacts([
+        (1, 'dup@example.com', '2024-03-01 10:00:00.000000'),
+        (2, 'dup@example.com', '2024-01-01 10:00:00.000000'),
+        (3, 'other@example.com', '2024-02-01 10:00:00.000000'),
+        (4, 'dup@example.com', '2024-02-01 10:00:00.000000')
+    ])
+
+    app_module.bootstrap_database()
+
+    assert contact_rows(app_module) == [(1, 'dup@example.com'), (3, 'other@example.com')]
+    with app_module.app.app_context():
+        assert app_module.has_unique_email('contact_submission')
+        tombstones = app_module.SyncTombstone.query.filter_by(entity_type='contact').all()
+        assert sorted(t.entity_id for t in tombstones) == [2, 4]
+        assert app_module.get_schema_version() == app_module.SCHEMA_VERSION
+
+
+def test_contact_post_after_bootstrap_on_duplicates(app_module):
+    create_legacy_contacts([
+        (1, 'dup@example.com', '2024-01-01 10:00:00.000000'),
+        (2, 'dup@example.com', '2024-02-01 10:00:00.000000')
+    ])
+    app_module.bootstrap_database()
+
+    response = post_contact(app_module, 'new@example.com')
+    assert response.status_code == 201, response.get_json()
+
+    response = post_contact(app_module, 'dup@example.com')
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['submission']['id'] == 2
+    assert response.get_json()['submission']['phone'] == '+15550002222'
+
+
+def test_contact_post_without_unique_index_uses_lookup(app_module):
+    create_legacy_contacts([
+        (1, 'dup@example.com', '2024-01-01 10:00:00.000000'),
+        (2, 'dup@example.com', '2024-02-01 10:00:00.000000')
+    ])
+    with app_module.app.app_context():
+        app_module.db.create_all()  # schema without upgrade_schema()
+    app_module._contact_upsert_ready = None
+
+    response = post_contact(app_module, 'new@example.com')
+    assert response.status_code == 201, response.get_json()
+
+    response = post_contact(app_module, 'dup@example.com')
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['submission']['id'] == 2
+    assert contact_rows(app_module) == [(1, 'dup@example.com'), (2, 'dup@example.com'), (3, 'new@example.com')]
@@ -0,0 +1,69 @@
+"""CRM calls: circuit breaker, rate governor and the shared session pool"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from http_pool import CircuitBreaker, CircuitOpenError, HTTPSessionPool, call_with_breaker
+
+
+def open_breaker(breaker):
+    breaker.failure_threshold = 1
+    breaker.before_call()
+    breaker.record_failure(0.1, 'HTTP 503')
+
+
+def test_open_breaker_fails_before_waiting():
+    breaker = CircuitBreaker('test', reset_seconds=60)
+    open_breaker(breaker)
+    waited = []
+
+    with pytest.raises(CircuitOpenError):
+        call_with_breaker(breaker, lambda: pytest.fail('request sent'), wait=lambda: waited.append(True))
+    assert waited == []
+
+
+def test_crm_post_with_open_circuit_takes_no_rate_token(app_module):
+    integration = app_module.CRMIntegration(
+        id=9001, name='HubSpot', is_active=True,
+        settings=json.dumps({'rate_limit': {'per_second': 1, 'burst': 1, 'max_wait_seconds': 5}})
+    )
+    bucket = app_module.crm_rate_limits.get(integration)
+    bucket.reserve()  # bucket empty: the next call would wait a second
+    open_breaker(app_module.crm_breakers.get(integration))
+
+    started = time.monotonic()
+    for _ in range(3):
+        with pytest.raises(CircuitOpenError):
+            app_module.crm_post(integration, 'http://127.0.0.1:9/unreachable', json={})
+    assert time.monotonic() - started < 0.5
+    assert bucket.counters['calls'] == 1
+
+
+
+
+class YieldingCounts(dict):
+    """Request counters that let another thread run between reading and writing a count"""
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        time.sleep(0)
+        return value
+
+
+def test_session_pool_counts_every_request_across_threads():
+    pool = HTTPSessionPool()
+    pool.session_for('http://crm.example.com/warm')  # the session exists; threads only count
+    pool._requests = YieldingCounts(pool._requests)
+    threads = [
+        threading.Thread(target=lambda: [pool.session_for('http://crm.example.com/a') for _ in range(500)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool.stats()['hosts'] == [{'host': 'http://crm.example.com', 'requests': 4001}]
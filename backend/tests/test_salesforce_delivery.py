@@ -0,0 +1,89 @@
+"""Resubmitting a lead must not create a second Salesforce record"""
+
+import json
+import threading
+
+import pytest
+import requests
+from werkzeug.serving import make_server
+
+import outbox
+from crm_emulator import create_app as create_emulator
+
+
+@pytest.fixture
+def emulator_url():
+    server = make_server('127.0.0.1', 0, create_emulator(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+@pytest.fixture
+def crm_app(bootstrapped, monkeypatch):
+    # Deliver bulk rows as soon as they are claimed
+    monkeypatch.setattr(outbox, 'CRM_BATCH_WINDOW_MS', 0)
+    return bootstrapped
+
+
+def add_salesforce(app_module, emulator_url, **settings):
+    with app_module.app.app_context():
+        integration = app_module.CRMIntegration(
+            name='Salesforce', api_key='consumer-key', api_secret='consumer-secret', is_active=True,
+            settings=json.dumps(dict(settings, login_url=emulator_url))
+        )
+        app_module.db.session.add(integration)
+        app_module.db.session.commit()
+
+
+def submit_lead(client, phone):
+    return client.post('/api/leads', json={
+        'firstName': 'Jane',
+        'lastName': 'Doe',
+        'email': 'jane@example.com',
+        'phone': phone
+    })
+
+
+def deliver_outbox(app_module):
+    with app_module.app.app_context():
+        while app_module.outbox_pool.process_due():
+            pass
+        return sorted(message.status for message in app_module.CRMOutbox.query.all())
+
+
+def emulator_stats(emulator_url):
+    return requests.get(f'{emulator_url}/_stats', timeout=5).json()
+
+
+def test_resubmitted_lead_is_upserted_on_external_id(crm_app, emulator_url):
+    add_salesforce(crm_app, emulator_url, external_id_field='TradeGPT_Lead_Id__c')
+    client = crm_app.app.test_client()
+
+    assert submit_lead(client, '+15550001111').status_code == 201
+    assert deliver_outbox(crm_app) == ['delivered']
+    assert submit_lead(client, '+15550002222').status_code == 200
+    assert deliver_outbox(crm_app) == ['delivered', 'delivered']
+
+    stats = emulator_stats(emulator_url)
+    assert stats['records'] == {'salesforce': 1}
+    assert stats['requests']['salesforce_updates'] == 1
+
+
+def test_resubmitted_lead_is_not_resent_without_external_id(crm_app, emulator_url):
+    add_salesforce(crm_app, emulator_url)
+    client = crm_app.app.test_client()
+
+    assert submit_lead(client, '+15550001111').status_code == 201
+    assert deliver_outbox(crm_app) == ['delivered']
+    assert submit_lead(client, '+15550002222').status_code == 200
+
+    client.post('/api/login', json={'username': 'tradeadmin', 'password': 'adm1234'})
+    response = client.post('/api/leads/batch', json=[
+        {'firstName': 'Jane', 'lastName': 'Doe', 'email': 'jane@example.com', 'phone': '+15550003333'},
+        {'firstName': 'John', 'lastName': 'Roe', 'email': 'john@example.com', 'phone': '+15550004444'}
+    ])
+    assert [row['status'] for row in response.get_json()['results']] == ['updated', 'created']
+    assert deliver_outbox(crm_app) == ['delivered', 'delivered']
+
+    assert emulator_stats(emulator_url)['records'] == {'salesforce': 2}
@@ -0,0 +1,36 @@
+"""Cold start: time to first response within budget, rarely used subsystems loaded on first use"""
+
+import os
+import statistics
+import sys
+
+import pytest
+
+from conftest import BACKEND_DIR
+
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+import bench_startup  # noqa: E402
+
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', 1500))
+RUNS = 3
+
+
+@pytest.fixture(scope='module')
+def startup_samples(tmp_path_factory):
+    """First GET / from fresh interpreters against a bootstrapped database"""
+    database_url = f"sqlite:///{tmp_path_factory.mktemp('startup') / 'startup.db'}"
+    env = bench_startup.child_env(database_url)
+    bench_startup.bootstrap(env)
+    return [bench_startup.first_response(env, '/') for _ in range(RUNS)]
+
+
+def test_first_response_within_budget(startup_samples):
+    assert [sample['status'] for sample in startup_samples] == [200] * RUNS
+    median = statistics.median(sample['total_ms'] for sample in startup_samples)
+    assert median <= STARTUP_BUDGET_MS, f'time to first response {median:.1f}ms is over {STARTUP_BUDGET_MS:.0f}ms'
+
+
+def test_lazy_modules_not_imported_at_startup(startup_samples):
+    assert {'email_notifications', 'exports', 'xlsx_writer', 'requests'} <= set(bench_startup.LAZY_MODULES)
+    eager = sorted({name for sample in startup_samples for name in sample['eager']})
+    assert eager == []
@@ -0,0 +1,112 @@
+"""Delta sync feed: no change lands behind a watermark handed out earlier"""
+
+import threading
+import time
+
+import db_pool
+import lead_ingest
+import sync_feed
+
+LAG = 0.2
+
+
+def lead_payload(i):
+    return {
+        'firstName': 'Batch',
+        'lastName': f'Lead{i}',
+        'email': f'batch{i}@example.com',
+        'phone': f'+1555{i:07d}'
+    }
+
+
+def poll(app_module, since=None):
+    """Follow the feed until caught up; returns (lead ids seen, next watermark)"""
+    seen = set()
+    with app_module.app.app_context():
+        while True:
+            page = sync_feed.get_changes(
+                app_module.db, app_module.SYNC_SOURCES, app_module.SyncTombstone, since=since, lag=LAG
+            )
+            seen.update(change['id'] for change in page['changes'] if change['type'] == 'lead')
+            since = page['next_since']
+            if not page['has_more']:
+                return seen, since
+
+
+def test_feed_sees_batch_chunks_committed_after_a_poll(bootstrapped, monkeypatch):
+    app_module = bootstrapped
+    monkeypatch.setattr(lead_ingest, 'LEAD_BATCH_CHUNK_SIZE', 10)
+    payloads = [lead_payload(i) for i in range(30)]
+    third_chunk_started = threading.Event()
+    release = threading.Event()
+
+    def score_lead(data):
+        # Hold the batch between its second and third chunk
+        if data is payloads[20]:
+            third_chunk_started.set()
+            release.wait(10)
+        return 50
+
+    results = []
+
+    def ingest():
+        with app_module.app.app_context():
+            results.extend(lead_ingest.ingest_lead_batch(app_module.db, app_module.Lead, payloads, score_lead))
+            app_module.db.session.remove()
+
+    thread = threading.Thread(target=ingest)
+    thread.start()
+    try:
+        assert third_chunk_started.wait(10)
+        # The first two chunks are committed and older than the lag
+        time.sleep(LAG * 2)
+        seen, since = poll(app_module)
+        assert len(seen) == 20
+    finally:
+        release.set()
+        thread.join(10)
+
+    assert [result['status'] for result in results] == ['created'] * 30
+    time.sleep(LAG * 2)
+    later, _ = poll(app_module, since)
+    assert seen | later == {result['id'] for result in results}
+
+
+def test_safety_lag_covers_lock_wait(monkeypatch):
+    monkeypatch.setattr(sync_feed, 'SYNC_SAFETY_LAG_SECONDS', None)
+    monkeypatch.setattr(sync_feed, 'SYNC_LAG_MARGIN_SECONDS', 5.0)
+    assert sync_feed.safety_lag(10.0) == 15.0
+
+    # An explicit lag shorter than the lock wait is raised
+    monkeypatch.setattr(sync_feed, 'SYNC_SAFETY_LAG_SECONDS', '5')
+    assert sync_feed.safety_lag(10.0) == 15.0
+    monkeypatch.setattr(sync_feed, 'SYNC_SAFETY_LAG_SECONDS', '60')
+    assert sync_feed.safety_lag(10.0) == 60.0
+
+
+def test_sqlite_lock_wait_follows_busy_timeout(monkeypatch):
+    monkeypatch.setattr(db_pool, 'SQLITE_BUSY_TIMEOUT_MS', '10000')
+    monkeypatch.setattr(db_pool, 'SQLITE_JOURNAL_MODE', 'WAL')
+    assert db_pool.max_lock_wait('sqlite:///leads.db') == 10.0
+
+    # Without WAL the commit waits for readers too
+    monkeypatch.setattr(db_pool, 'SQLITE_JOURNAL_MODE', 'DELETE')
+    assert db_pool.max_lock_wait('sqlite:///leads.db') == 20.0
+
+    # pysqlite's own default timeout
+    monkeypatch.setattr(db_pool, 'SQLITE_BUSY_TIMEOUT_MS', '')
+    assert db_pool.max_lock_wait('sqlite:///leads.db') == 10.0
+
+
+def test_postgresql_lock_timeout(monkeypatch):
+    monkeypatch.setattr(db_pool, 'DB_LOCK_TIMEOUT_MS', 8000)
+    assert db_pool.max_lock_wait('postgresql://db/leads') == 8.0
+    options = db_pool.engine_options('postgresql://db/leads', db_pool.PoolMetrics())
+    assert options['connect_args'] == {'options': '-c lock_timeout=8000'}
+
+    monkeypatch.setattr(db_pool, 'DB_LOCK_TIMEOUT_MS', 0)
+    assert db_pool.max_lock_wait('postgresql://db/leads') is None
+
+
+def test_app_lag_exceeds_configured_lock_wait(app_module):
+    assert app_module.SYNC_LAG_SECONDS >= db_pool.max_lock_wait(app_module.app.config['SQLALCHEMY_DATABASE_URI'])
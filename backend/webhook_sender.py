@@ -0,0 +1,186 @@
+"""
+Bulk Webhook Sender
+Sends leads to an admin-supplied webhook in fixed-size batches: leads are
+paged by id (never loaded all at once), batches are posted by a bounded
+thread pool, and each batch is retried with backoff on network errors,
+429 and 5xx responses. Returns a per-batch report.
+"""
+
+import json
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', 500))
+WEBHOOK_MAX_BATCH_SIZE = int(os.getenv('WEBHOOK_MAX_BATCH_SIZE', 5000))
+WEBHOOK_CONCURRENCY = int(os.getenv('WEBHOOK_CONCURRENCY', 4))
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv('WEBHOOK_MAX_CONCURRENCY', 16))
+WEBHOOK_MAX_RETRIES = int(os.getenv('WEBHOOK_MAX_RETRIES', 3))
+WEBHOOK_BACKOFF_BASE = float(os.getenv('WEBHOOK_BACKOFF_BASE', 1.0))
+WEBHOOK_BACKOFF_MAX = float(os.getenv('WEBHOOK_BACKOFF_MAX', 30.0))
+WEBHOOK_TIMEOUT = float(os.getenv('WEBHOOK_TIMEOUT', 30))
+
+WEBHOOK_JOB_KIND = 'lead_webhook'
+
+
+def iter_lead_batches(db, Lead, lead_ids=None, batch_size=WEBHOOK_BATCH_SIZE):
+    """Yield lists of serialized leads in id order, one short read per batch"""
+    last_id = 0
+    while True:
+        query = db.session.query(Lead).filter(Lead.id > last_id)
+        if lead_ids:
+            query = query.filter(Lead.id.in_(lead_ids))
+        batch = [lead.to_dict() for lead in query.order_by(Lead.id).limit(batch_size)]
+        db.session.commit()  # end the read transaction between batches
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1]['id']
+
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After')
+    try:
+        return min(float(value), WEBHOOK_BACKOFF_MAX) if value is not None else None
+    except ValueError:
+        return None
+
+
+def post_batch(http, url, payload, max_retries=WEBHOOK_MAX_RETRIES, timeout=WEBHOOK_TIMEOUT):
+    """POST one batch, retrying transient failures; returns an outcome dict"""
+    import requests
+
+    attempts = 0
+    while True:
+        attempts += 1
+        status_code = None
+        retry_after = None
+        try:
+            response = http.post(url, json=payload, timeout=timeout)
+            status_code = response.status_code
+            if 200 <= status_code < 300:
+                return {'ok': True, 'status_code': status_code, 'attempts': attempts}
+            error = f'Webhook returned status code {status_code}: {response.text[:200]}'
+            retryable = status_code == 429 or status_code >= 500
+            retry_after = _retry_after(response)
+        except requests.RequestException as e:
+            error = str(e)
+            retryable = True
+
+        if not retryable or attempts > max_retries:
+            return {'ok': False, 'status_code': status_code, 'attempts': attempts, 'error': error}
+        delay = retry_after
+        if delay is None:
+            delay = min(WEBHOOK_BACKOFF_BASE * (2 ** (attempts - 1)), WEBHOOK_BACKOFF_MAX)
+            delay *= random.uniform(0.5, 1.0)
+        time.sleep(delay)
+
+
+def send_leads_in_batches(db, Lead, webhook_url, lead_ids=None, batch_size=None, concurrency=None,
+                          progress=None):
+    """
+    Deliver the selected leads (all leads when lead_ids is empty) to
+    webhook_url. progress(leads_done, leads_total) is called from the calling
+    thread as batches finish.
+    """
+    batch_size = max(1, min(int(batch_size or WEBHOOK_BATCH_SIZE), WEBHOOK_MAX_BATCH_SIZE))
+    concurrency = max(1, min(int(concurrency or WEBHOOK_CONCURRENCY), WEBHOOK_MAX_CONCURRENCY))
+    started = time.monotonic()
+
+    count_query = db.session.query(db.func.count(Lead.id))
+    if lead_ids:
+        count_query = count_query.filter(Lead.id.in_(lead_ids))
+    total = count_query.scalar()
+    db.session.commit()
+    total_batches = -(-total // batch_size)
+    report = {
+        'total': total,
+        'sent': 0,
+        'failed': 0,
+        'batches': total_batches,
+        'batch_size': batch_size,
+        'concurrency': concurrency,
+        'failed_batches': []
+    }
+    if progress:
+        progress(0, total)
+    if not total:
+        report['duration_seconds'] = 0
+        return report
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    http.mount('http://', adapter)
+    http.mount('https://', adapter)
+
+    def record(future):
+        index, leads = in_flight.pop(future)
+        outcome = future.result()
+        if outcome['ok']:
+            report['sent'] += len(leads)
+        else:
+            report['failed'] += len(leads)
+            report['failed_batches'].append({
+                'batch': index,
+                'count': len(leads),
+                'first_id': leads[0]['id'],
+                'last_id': leads[-1]['id'],
+                'status_code': outcome['status_code'],
+                'attempts': outcome['attempts'],
+                'error': outcome['error']
+            })
+        if progress:
+            progress(report['sent'] + report['failed'], total)
+
+    in_flight = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='webhook-sender') as pool:
+            for index, leads in enumerate(iter_lead_batches(db, Lead, lead_ids, batch_size), start=1):
+                payload = {
+                    'event': 'leads_export',
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'batch': index,
+                    'batches': total_batches,
+                    'total': total,
+                    'count': len(leads),
+                    'leads': leads
+                }
+                in_flight[pool.submit(post_batch, http, webhook_url, payload)] = (index, leads)
+                # Bound memory: never read further ahead than the pool can send
+                while len(in_flight) >= concurrency * 2:
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(future)
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future)
+    finally:
+        http.close()
+
+    report['failed_batches'].sort(key=lambda batch: batch['batch'])
+    report['duration_seconds'] = round(time.monotonic() - started, 3)
+    return report
+
+
+def make_webhook_handler(db, Lead):
+    """Background job handler for POST /api/leads/send-webhook with async=true"""
+
+    def run_webhook(job, progress):
+        params = json.loads(job.params or '{}')
+        report = send_leads_in_batches(
+            db, Lead, params['webhook_url'],
+            lead_ids=params.get('lead_ids'),
+            batch_size=params.get('batch_size'),
+            concurrency=params.get('concurrency'),
+            progress=progress
+        )
+        return dict(report, rows_done=report['sent'] + report['failed'])
+
+    return run_webhook
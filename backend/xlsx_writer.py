@@ -0,0 +1,235 @@
+"""
+Streaming XLSX Writer
+Dependency-free .xlsx (Office Open XML) writer built on zipfile. Rows are
+written straight into the compressed worksheet stream, so memory stays
+bounded no matter how many rows are exported. Repeated strings go into the
+shared-string table until it reaches max_shared_strings; after that new
+strings are written inline.
+"""
+
+import re
+import zipfile
+from datetime import date, datetime
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Characters that are not allowed in XML 1.0 documents
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f￾￿]')
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Style indexes defined in STYLES_XML
+STYLE_DEFAULT = 0
+STYLE_HEADER = 1
+STYLE_DATETIME = 2
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '<Relationship Id="rId3" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+    'Target="sharedStrings.xml"/>'
+    '</Relationships>'
+)
+
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _escape(text):
+    text = _ILLEGAL_XML_CHARS.sub('', text)
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class StreamingXLSXWriter:
+    """Write a single-sheet workbook row by row into fileobj (seekable or not)"""
+
+    def __init__(self, fileobj, sheet_name='Sheet1', column_widths=None,
+                 max_shared_strings=100000, zip64=False):
+        self.sheet_name = sheet_name
+        self.max_shared_strings = max_shared_strings
+        self._shared = {}
+        self._shared_refs = 0
+        self._row_number = 0
+        self._columns = []
+
+        self._zip = zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+        self._zip.writestr('_rels/.rels', ROOT_RELS_XML)
+        self._zip.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS_XML)
+        self._zip.writestr('xl/styles.xml', STYLES_XML)
+        self._zip.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{_escape(sheet_name)[:31]}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+
+        self._sheet = self._zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=zip64)
+        header = [
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        ]
+        if column_widths:
+            header.append('<cols>')
+            for i, width in enumerate(column_widths, start=1):
+                header.append(f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>')
+            header.append('</cols>')
+        header.append('<sheetData>')
+        self._sheet.write(''.join(header).encode('utf-8'))
+
+    @property
+    def rows_written(self):
+        return self._row_number
+
+    def _shared_index(self, text):
+        index = self._shared.get(text)
+        if index is None:
+            if len(self._shared) >= self.max_shared_strings:
+                return None
+            index = self._shared[text] = len(self._shared)
+        self._shared_refs += 1
+        return index
+
+    def _cell(self, ref, value, style):
+        style_attr = f' s="{style}"' if style else ''
+        if value is None or value == '':
+            return f'<c r="{ref}"{style_attr}/>' if style else ''
+        if isinstance(value, bool):
+            return f'<c r="{ref}" t="b"{style_attr}><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float)):
+            return f'<c r="{ref}"{style_attr}><v>{value}</v></c>'
+        if isinstance(value, datetime):
+            serial = (value - _EXCEL_EPOCH).total_seconds() / 86400
+            return f'<c r="{ref}" s="{STYLE_DATETIME}"><v>{serial:.10f}</v></c>'
+        if isinstance(value, date):
+            serial = (value - _EXCEL_EPOCH.date()).days
+            return f'<c r="{ref}" s="{STYLE_DATETIME}"><v>{serial}</v></c>'
+
+        text = str(value)
+        index = self._shared_index(text)
+        if index is not None:
+            return f'<c r="{ref}" t="s"{style_attr}><v>{index}</v></c>'
+        return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{_escape(text)}</t></is></c>'
+
+    def write_row(self, values, style=STYLE_DEFAULT):
+        self._row_number += 1
+        row = self._row_number
+        while len(self._columns) < len(values):
+            self._columns.append(column_letter(len(self._columns)))
+        cells = ''.join(
+            self._cell(f'{self._columns[i]}{row}', value, style)
+            for i, value in enumerate(values)
+        )
+        self._sheet.write(f'<row r="{row}">{cells}</row>'.encode('utf-8'))
+
+    def close(self):
+        self._sheet.write(b'</sheetData></worksheet>')
+        self._sheet.close()
+
+        with self._zip.open('xl/sharedStrings.xml', 'w') as strings:
+            strings.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                f'count="{self._shared_refs}" uniqueCount="{len(self._shared)}">'
+            ).encode('utf-8'))
+            batch = []
+            for text in self._shared:  # dicts keep insertion order == index order
+                batch.append(f'<si><t xml:space="preserve">{_escape(text)}</t></si>')
+                if len(batch) >= 1000:
+                    strings.write(''.join(batch).encode('utf-8'))
+                    batch = []
+            strings.write((''.join(batch) + '</sst>').encode('utf-8'))
+        self._zip.close()
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes for a streaming response"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_xlsx(headers, rows, sheet_name='Sheet1', column_widths=None, max_shared_strings=100000,
+                zip64=False, flush_every=500):
+    """Yield the bytes of a workbook as rows are consumed from the iterator"""
+    sink = _ChunkSink()
+    writer = StreamingXLSXWriter(sink, sheet_name, column_widths, max_shared_strings, zip64)
+    writer.write_row(headers, style=STYLE_HEADER)
+    for count, row in enumerate(rows, start=1):
+        writer.write_row(row)
+        if count % flush_every == 0:
+            data = sink.drain()
+            if data:
+                yield data
+    writer.close()
+    yield sink.drain()
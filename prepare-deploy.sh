@@ -36,7 +36,7 @@ fi
 # Check if Procfile exists
 if [ ! -f "backend/Procfile" ]; then
     echo "⚠️  Creating Procfile..."
-    echo "web: python app.py" > backend/Procfile
+    printf 'release: python bootstrap.py\nweb: gunicorn app:app -c gunicorn.conf.py\n' > backend/Procfile
     echo "✅ Procfile created"
 else
     echo "✅ Procfile exists"